@@ -0,0 +1,189 @@
+"""
+按观测延迟自适应的后端并发上限
+固定的连接数/工作线程数要么太小（查询很快时浪费数据库能力），要么太大（学生跑大量 dump 时把数据库压垮）。
+ADAPTIVE_LIMIT=1 时，每个后端有一个并发上限。查询延迟按 ADAPTIVE_WINDOW_MS 的窗口汇总，每个窗口结束时调整一次上限：
+    gradient  （默认）比较窗口平均延迟和无排队时的基线延迟。窗口延迟没有明显超过基线时上限按 sqrt(limit) 增长，
+              延迟升高说明数据库开始排队，上限按 基线/窗口延迟 的比例收缩（每次最多减半）。
+              基线只用没有排队时的样本更新，过载期间不会被拉高；上限已经降到最小值时的样本一定没有排队，
+              也用来更新基线，所以数据库本身变慢（例如表变大）后基线会跟着上升。
+    aimd      窗口平均延迟超过 ADAPTIVE_AIMD_THRESHOLD_MS 或窗口内有查询超时时上限乘以 0.9，否则加 1。
+只有窗口内的并发达到过上限的一半时才会增长，空闲时上限不会无限上涨。
+达到上限的查询最多等待 ADAPTIVE_MAX_WAIT_MS，仍然没有名额则返回 503。
+
+时间盲注载荷（scheduler.is_slow）同样占用名额，但它们的延迟是故意的，不作为调整上限的样本。
+/admin/metrics 的 concurrency_limits 给出每个后端当前的上限、延迟估计和上限的历史（每秒最多记一个点，保留 ADAPTIVE_HISTORY 个）。
+"""
+
+import collections
+import math
+import os
+import threading
+import time
+
+import scheduler
+
+ADAPTIVE_LIMIT = os.environ.get('ADAPTIVE_LIMIT', '0') == '1'
+ADAPTIVE_ALGORITHM = os.environ.get('ADAPTIVE_ALGORITHM', 'gradient')
+ADAPTIVE_INITIAL = int(os.environ.get('ADAPTIVE_INITIAL', '8'))
+ADAPTIVE_MIN = int(os.environ.get('ADAPTIVE_MIN', '2'))
+ADAPTIVE_MAX = int(os.environ.get('ADAPTIVE_MAX', '200'))
+ADAPTIVE_MAX_WAIT = float(os.environ.get('ADAPTIVE_MAX_WAIT_MS', '1000')) / 1000.0
+# gradient: 短期延迟超过基线多少倍以内不算排队
+ADAPTIVE_TOLERANCE = float(os.environ.get('ADAPTIVE_TOLERANCE', '1.5'))
+# aimd: 超过这个延迟的查询视为过载信号
+ADAPTIVE_AIMD_THRESHOLD = float(os.environ.get('ADAPTIVE_AIMD_THRESHOLD_MS', '200')) / 1000.0
+ADAPTIVE_WINDOW = float(os.environ.get('ADAPTIVE_WINDOW_MS', '200')) / 1000.0
+# 样本太少的窗口延迟不可靠，顺延到下一个窗口
+ADAPTIVE_WINDOW_SAMPLES = 5
+ADAPTIVE_HISTORY = int(os.environ.get('ADAPTIVE_HISTORY', '300'))
+
+
+class LimitExceeded(Exception):
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class GradientLimit:
+    """Gradient 风格：新上限 = 上限 * clamp(容忍度 * 基线延迟 / 窗口延迟, 0.5, 1) + sqrt(上限)，再做平滑。"""
+
+    def __init__(self, tolerance=ADAPTIVE_TOLERANCE, long_window=50, smoothing=0.2, min_limit=ADAPTIVE_MIN):
+        self.tolerance = tolerance
+        self.min_limit = min_limit
+        self.long_alpha = 1.0 / long_window
+        self.smoothing = smoothing
+        self.short_rtt = None
+        self.long_rtt = None
+
+    def update(self, limit, rtt, inflight, dropped):
+        self.short_rtt = rtt
+        if self.long_rtt is None:
+            self.long_rtt = rtt
+            return limit
+        if rtt <= self.tolerance * self.long_rtt or limit <= self.min_limit:
+            self.long_rtt += (rtt - self.long_rtt) * self.long_alpha
+        # 基线明显偏高（例如启动时的第一个样本很慢），让它较快回落
+        if self.long_rtt > self.short_rtt * 2:
+            self.long_rtt *= 0.95
+        if dropped:
+            return limit * 0.9
+        if inflight < limit / 2:
+            return limit
+        gradient = max(0.5, min(1.0, self.tolerance * self.long_rtt / self.short_rtt))
+        new_limit = limit * gradient + math.sqrt(limit)
+        return limit * (1 - self.smoothing) + new_limit * self.smoothing
+
+    def stats(self):
+        return {'short_rtt_ms': round((self.short_rtt or 0) * 1000, 3),
+                'long_rtt_ms': round((self.long_rtt or 0) * 1000, 3)}
+
+
+class AimdLimit:
+    def __init__(self, threshold=ADAPTIVE_AIMD_THRESHOLD, backoff=0.9):
+        self.threshold = threshold
+        self.backoff = backoff
+
+    def update(self, limit, rtt, inflight, dropped):
+        if dropped or rtt > self.threshold:
+            return limit * self.backoff
+        if inflight < limit / 2:
+            return limit
+        return limit + 1
+
+    def stats(self):
+        return {'threshold_ms': self.threshold * 1000}
+
+
+ALGORITHMS = {
+    'gradient': GradientLimit,
+    'aimd': AimdLimit,
+}
+
+
+class _BackendLimit:
+    def __init__(self, algorithm):
+        self.algorithm = ALGORITHMS[algorithm]()
+        self.limit = float(ADAPTIVE_INITIAL)
+        self.inflight = 0
+        self.cond = threading.Condition()
+        self.history = collections.deque(maxlen=ADAPTIVE_HISTORY)
+        self.history_at = 0.0
+        self.counters = {'admitted': 0, 'waited': 0, 'rejected': 0, 'dropped': 0}
+        self._new_window(time.monotonic())
+
+    def _new_window(self, now):
+        self.window_end = now + ADAPTIVE_WINDOW
+        self.window_rtt = 0.0
+        self.window_samples = 0
+        self.window_inflight = 0
+        self.window_dropped = False
+
+    def sample(self, rtt, dropped):
+        """记录一个样本，窗口结束时调整上限。调用方持有 cond。"""
+        self.window_rtt += rtt
+        self.window_samples += 1
+        self.window_inflight = max(self.window_inflight, self.inflight)
+        self.window_dropped = self.window_dropped or dropped
+        now = time.monotonic()
+        if now < self.window_end or self.window_samples < ADAPTIVE_WINDOW_SAMPLES:
+            return
+        limit = self.algorithm.update(self.limit, self.window_rtt / self.window_samples,
+                                      self.window_inflight, self.window_dropped)
+        self.limit = min(float(ADAPTIVE_MAX), max(float(ADAPTIVE_MIN), limit))
+        self._new_window(now)
+        wall = time.time()
+        if wall - self.history_at >= 1:
+            self.history.append((round(wall, 3), round(self.limit, 2)))
+            self.history_at = wall
+
+    def allowed(self):
+        return self.inflight < max(ADAPTIVE_MIN, int(self.limit))
+
+
+class AdaptiveLimiter:
+    def __init__(self, backend_names, algorithm=ADAPTIVE_ALGORITHM):
+        self._limits = {name: _BackendLimit(algorithm) for name in backend_names}
+
+    def _acquire(self, backend, state):
+        with state.cond:
+            if not state.allowed():
+                state.counters['waited'] += 1
+                if not state.cond.wait_for(state.allowed, ADAPTIVE_MAX_WAIT):
+                    state.counters['rejected'] += 1
+                    raise LimitExceeded(f"{backend.label} 当前并发已达上限 {int(state.limit)}，请稍后重试",
+                                        max(1, math.ceil(ADAPTIVE_MAX_WAIT)))
+            state.inflight += 1
+            state.counters['admitted'] += 1
+
+    def _release(self, state, rtt, sample, dropped):
+        with state.cond:
+            if sample:
+                if dropped:
+                    state.counters['dropped'] += 1
+                state.sample(rtt, dropped)
+            state.inflight -= 1
+            # 上限可能刚刚变大，一次放进多个等待者
+            state.cond.notify(max(1, int(state.limit) - state.inflight))
+
+    def run(self, backend, query, work):
+        """在该后端的并发上限内执行 work()，返回它的结果；等不到名额时抛出 LimitExceeded。"""
+        state = self._limits[backend.name]
+        self._acquire(backend, state)
+        start = time.perf_counter()
+        dropped = False
+        try:
+            return work()
+        except Exception:
+            # 只有超时算过载信号，SQL 语法错误之类的失败是正常样本
+            dropped = backend.timeout_ms > 0 and (time.perf_counter() - start) * 1000 >= backend.timeout_ms
+            raise
+        finally:
+            self._release(state, time.perf_counter() - start, not scheduler.is_slow(query), dropped)
+
+    def stats(self):
+        stats = {}
+        for name, state in self._limits.items():
+            with state.cond:
+                stats[name] = dict(state.counters, limit=round(state.limit, 2), inflight=state.inflight,
+                                   history=list(state.history), **state.algorithm.stats())
+        return stats
@@ -0,0 +1,118 @@
+"""
+全局准入控制和过载丢弃
+限制同时处理的数据库请求数，超出的请求进入有界 FIFO 队列等待。
+队列延迟按 CoDel 的思路判断过载：如果一个观测周期内的最小排队时间都超过目标值，
+说明队列是"站着的"而不是突发，此时排队超时缩短为目标值，尽快返回 503 让客户端稍后重试。
+"""
+
+import collections
+import math
+import os
+import threading
+import time
+
+ADMISSION_MAX_INFLIGHT = int(os.environ.get('ADMISSION_MAX_INFLIGHT', '0'))
+ADMISSION_QUEUE = int(os.environ.get('ADMISSION_QUEUE', '64'))
+ADMISSION_MAX_WAIT = float(os.environ.get('ADMISSION_MAX_WAIT_MS', '2000')) / 1000.0
+CODEL_TARGET = float(os.environ.get('CODEL_TARGET_MS', '50')) / 1000.0
+CODEL_INTERVAL = float(os.environ.get('CODEL_INTERVAL_MS', '500')) / 1000.0
+
+
+class Rejected(Exception):
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ('event', 'admitted', 'enqueued')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.admitted = False
+        self.enqueued = time.monotonic()
+
+
+class AdmissionController:
+    def __init__(self, max_inflight=ADMISSION_MAX_INFLIGHT, queue_size=ADMISSION_QUEUE,
+                 max_wait=ADMISSION_MAX_WAIT, target=CODEL_TARGET, interval=CODEL_INTERVAL):
+        self.max_inflight = max_inflight
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.target = target
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._waiters = collections.deque()
+        self.inflight = 0
+        # CoDel 状态：当前周期内观测到的最小排队时间
+        self._interval_end = time.monotonic() + interval
+        self._interval_min = None
+        self.overloaded = False
+        # 平均服务时间（EWMA），用于估算 Retry-After
+        self._service_time = 0.05
+        self.counters = {'admitted': 0, 'queued': 0, 'rejected_full': 0, 'shed': 0}
+
+    def _observe_delay(self, delay, now):
+        if self._interval_min is None or delay < self._interval_min:
+            self._interval_min = delay
+        if now >= self._interval_end:
+            self.overloaded = self._interval_min > self.target
+            self._interval_min = None
+            self._interval_end = now + self.interval
+
+    def _retry_after(self):
+        backlog = len(self._waiters) + self.inflight
+        return max(1, math.ceil(backlog * self._service_time / max(1, self.max_inflight)))
+
+    def acquire(self):
+        """返回排队等待的秒数；无法准入时抛出 Rejected。"""
+        with self._lock:
+            now = time.monotonic()
+            if self.inflight < self.max_inflight and not self._waiters:
+                self.inflight += 1
+                self.counters['admitted'] += 1
+                self._observe_delay(0.0, now)
+                return 0.0
+            if len(self._waiters) >= self.queue_size:
+                self.counters['rejected_full'] += 1
+                raise Rejected('queue full', self._retry_after())
+            waiter = _Waiter()
+            self._waiters.append(waiter)
+            self.counters['queued'] += 1
+            timeout = self.target if self.overloaded else self.max_wait
+        waiter.event.wait(timeout)
+        with self._lock:
+            now = time.monotonic()
+            delay = now - waiter.enqueued
+            if not waiter.admitted:
+                # 超时：从队列中移除自己
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+                self._observe_delay(delay, now)
+                self.counters['shed'] += 1
+                raise Rejected('queue timeout', self._retry_after())
+            self._observe_delay(delay, now)
+            return delay
+
+    def release(self, service_time=None):
+        with self._lock:
+            if service_time is not None:
+                self._service_time = self._service_time * 0.9 + service_time * 0.1
+            if self._waiters:
+                # 名额直接交给队首，inflight 不变
+                waiter = self._waiters.popleft()
+                waiter.admitted = True
+                self.counters['admitted'] += 1
+                waiter.event.set()
+            else:
+                self.inflight -= 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats.update(inflight=self.inflight, waiting=len(self._waiters), max_inflight=self.max_inflight,
+                         overloaded=self.overloaded, service_time_ms=round(self._service_time * 1000, 2))
+        return stats
@@ -1,9 +1,33 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, g, send_from_directory
+import functools
+import os
 import urllib.parse
-import json
 import db
+import backends
 import time
 import sys
+import threading
+import uuid
+import drift
+import sandbox
+import journal
+import lablog
+import profiler
+import memtrack
+import admission
+import ratelimit
+import waf
+import limits
+import explain
+import querystats
+import workers
+import scheduler
+import singleflight
+import passthrough
+import adaptive
+import tracing
+import dashboard
+from werkzeug.exceptions import RequestEntityTooLarge
 
 app = Flask(__name__)
 
@@ -24,13 +48,356 @@ print("正在初始化数据库...")
 initialize_dbs()
 
 
+# --- Foreground activity tracking (后台任务据此避让前台请求) ---
+_inflight_lock = threading.Lock()
+_inflight = 0
+
+@app.before_request
+def _track_request_start():
+    global _inflight
+    with _inflight_lock:
+        _inflight += 1
+
+@app.teardown_request
+def _track_request_end(exc):
+    global _inflight
+    with _inflight_lock:
+        _inflight -= 1
+
+def foreground_busy():
+    return _inflight > 0
+
+
+if drift.DRIFT_WATCH:
+    drift_watcher = drift.DriftWatcher(foreground_busy)
+    drift_watcher.start()
+    print("实验表漂移检测已启动")
+
+
+# --- Admin routes are limited to a server-side allowlist ---
+ADMIN_ALLOWLIST = {ip.strip() for ip in os.environ.get('ADMIN_ALLOWLIST', '127.0.0.1,::1').split(',') if ip.strip()}
+
+def admin_only(view):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.remote_addr not in ADMIN_ALLOWLIST:
+            return jsonify({"error": "Forbidden"}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+
+# --- Optional process isolation of backend drivers (见 workers.py) ---
+if workers.ISOLATE_DRIVERS:
+    worker_pools = {name: workers.isolate(backends.REGISTRY[name]) for name in workers.ISOLATE_BACKENDS if name in backends.REGISTRY}
+    print(f"驱动进程隔离已开启: {', '.join(worker_pools)}，每个后端 {workers.WORKERS_PER_BACKEND} 个工作进程")
+
+
+# 接口路径 -> 后端名，由注册表生成
+DB_ROUTES = {f'/{b.name}/{shape.name}': b.name for b in backends.REGISTRY.values() for shape in b.shapes}
+
+def route_backend():
+    """返回当前请求对应的数据库名，非数据库接口返回 None。"""
+    return DB_ROUTES.get(request.path)
+
+
+# --- Live per-route dashboard on the homepage (见 dashboard.py) ---
+live_dashboard = dashboard.Dashboard(backends.REGISTRY).start() if dashboard.DASHBOARD else None
+if live_dashboard is not None:
+    print(f"实时面板已开启，统计最近 {dashboard.DASHBOARD_WINDOW} 秒")
+
+    @app.before_request
+    def _dashboard_start():
+        if route_backend() is not None:
+            g.dashboard_start = time.perf_counter()
+
+    @app.after_request
+    def _dashboard_record(response):
+        start = g.pop('dashboard_start', None)
+        if start is not None:
+            live_dashboard.record(request.path, (time.perf_counter() - start) * 1000, response.status_code)
+        return response
+
+
+# --- Server-Timing 响应头：数据库接口的服务端处理时间，replay.py 用它和 journal 里的 total_ms 对比 ---
+@app.before_request
+def _server_timing_start():
+    if route_backend() is not None:
+        g.server_timing_start = time.perf_counter()
+
+@app.after_request
+def _server_timing(response):
+    start = g.pop('server_timing_start', None)
+    if start is not None:
+        response.headers['Server-Timing'] = f"app;dur={(time.perf_counter() - start) * 1000:.3f}"
+    return response
+
+
+# --- Request tracing with head-based sampling (见 tracing.py) ---
+tracer = None
+if tracing.TRACE_SAMPLE > 0:
+    if tracing.TRACE_FILE or tracing.TRACE_OTLP_URL:
+        tracer = tracing.Tracer().start()
+        print(f"请求追踪已开启，采样比例 {tracing.TRACE_SAMPLE}，导出到 {tracing.TRACE_FILE or tracing.TRACE_OTLP_URL}")
+    else:
+        print("警告: 设置了 TRACE_SAMPLE 但没有 TRACE_FILE / TRACE_OTLP_URL，请求追踪未开启")
+
+if tracer is not None:
+    @app.before_request
+    def _trace_start():
+        backend_name = route_backend()
+        if backend_name is None:
+            return None
+        span = tracer.start_request(f"{request.method} {request.path}", request.headers.get('traceparent'),
+                                    **{'http.method': request.method, 'http.route': request.path, 'lab.backend': backend_name})
+        if span.sampled:
+            g.trace_span = span
+
+    @app.after_request
+    def _trace_status(response):
+        span = g.get('trace_span')
+        if span is not None:
+            span.set('http.status_code', response.status_code)
+            response.headers['traceparent'] = span.traceparent()
+        return response
+
+    @app.teardown_request
+    def _trace_end(exc):
+        span = g.pop('trace_span', None)
+        if span is not None:
+            span.end(exc)
+
+
+# --- Per-client fair-share rate limiting (见 ratelimit.py) ---
+if ratelimit.RATE_LIMIT:
+    rate_limiter = ratelimit.RateLimiter()
+    print("按客户端限流已开启")
+    if ratelimit.RATE_LIMIT_KEY == 'session' and sandbox.SANDBOX_POOL_SIZE <= 0:
+        print("警告: RATE_LIMIT_KEY=session 需要开启 SANDBOX_POOL_SIZE，否则不会签发会话 Cookie，实际按 IP 限流")
+
+    def _client_key():
+        if ratelimit.RATE_LIMIT_KEY == 'session':
+            # 只认服务端签发的会话；客户端随意换 Cookie 不会得到新的令牌桶
+            session_id = sandbox.verify_session(request.cookies.get(sandbox.SANDBOX_COOKIE))
+            if session_id:
+                return session_id
+        return request.remote_addr
+
+    @app.before_request
+    def _rate_limit():
+        if route_backend() is None:
+            return None
+        try:
+            g.rate_limit_key = rate_limiter.acquire(_client_key(), request.path)
+        except ratelimit.Limited as e:
+            response = jsonify({"error": "请求过于频繁，请稍后重试", "reason": e.reason})
+            response.status_code = 429
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response
+
+    def _take_slow_slot(query):
+        # 并发额度只约束慢查询，SQL 拼好之后才知道是不是
+        key = g.get('rate_limit_key')
+        if key is not None and scheduler.is_slow(query):
+            rate_limiter.acquire_slow(key)
+            g.rate_limit_slot = key
+
+    @app.teardown_request
+    def _rate_limit_release(exc):
+        key = g.pop('rate_limit_slot', None)
+        if key is not None:
+            rate_limiter.release(key)
+
+
+# --- Admission control (数据库接口限流排队，首页/health 等轻量接口不受影响) ---
+if admission.ADMISSION_MAX_INFLIGHT > 0:
+    admission_controller = admission.AdmissionController()
+    print(f"准入控制已开启，最多同时处理 {admission.ADMISSION_MAX_INFLIGHT} 个数据库请求")
+
+    @app.before_request
+    def _admit():
+        if route_backend() is None:
+            return None
+        try:
+            wait = admission_controller.acquire()
+        except admission.Rejected as e:
+            response = jsonify({"error": "服务器繁忙，请稍后重试", "reason": e.reason})
+            response.status_code = 503
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response
+        g.admitted_at = time.perf_counter()
+        # 排队时间记在请求的 trace 上，方便区分是排队慢还是查询慢
+        g.get('trace_span', tracing.NOOP).set('lab.admission_wait_ms', round(wait * 1000, 3))
+
+    @app.teardown_request
+    def _admission_release(exc):
+        admitted_at = g.pop('admitted_at', None)
+        if admitted_at is not None:
+            admission_controller.release(time.perf_counter() - admitted_at)
+
+
+# --- Per-session sandboxes (路由在 db.py 连接层完成，接口函数不需要改动) ---
+if sandbox.SANDBOX_POOL_SIZE > 0:
+    sandbox_pool = sandbox.SandboxPool()
+    # debug=True 时 reloader 的父进程也会执行到这里，它不处理请求，不能和子进程同时重建同名沙箱
+    if __name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        sandbox_pool.start()
+        print(f"沙箱池已启动，容量 {sandbox.SANDBOX_POOL_SIZE}")
+
+    @app.before_request
+    def _sandbox_session():
+        # 只有实验接口才需要会话；首页、/health、/admin 和探活请求不发 Cookie
+        if route_backend() is None:
+            return None
+        session_id = sandbox.verify_session(request.cookies.get(sandbox.SANDBOX_COOKIE))
+        if session_id is None:
+            # 没有 Cookie 或 Cookie 不是本服务签发的，当作新会话
+            session_id, g.new_sandbox_cookie = sandbox.new_session()
+        g.sandbox_session = session_id
+
+    def _bind_sandbox():
+        # 第一次真正执行查询时才租用沙箱，缺参数、被限流的请求不占用
+        db.set_sandbox(sandbox_pool.acquire(g.sandbox_session, request.remote_addr))
+
+    @app.after_request
+    def _set_sandbox_cookie(response):
+        cookie = g.get('new_sandbox_cookie')
+        # 新会话在这个请求里没有查库就不发 Cookie
+        if cookie and 'final_query' in g:
+            response.set_cookie(sandbox.SANDBOX_COOKIE, cookie, max_age=int(sandbox.SANDBOX_TTL), httponly=True)
+        return response
+
+    @app.teardown_request
+    def _reset_sandbox(exc):
+        db.set_sandbox(None)
+
+
+# --- Request journal (写入在后台线程完成，见 journal.py / replay.py) ---
+if journal.JOURNAL_DIR:
+    request_journal = journal.Journal(journal.JOURNAL_DIR)
+    request_journal.start()
+    print(f"请求日志写入 {journal.JOURNAL_DIR}")
+
+    @app.before_request
+    def _journal_start():
+        g.journal_start = time.perf_counter()
+        # 记录请求到达的时刻，replay.py 按这个间隔回放
+        g.journal_ts = time.time()
+        # 先缓存原始请求体，之后表单解析会复用这份缓存
+        request.get_data(cache=True)
+
+    @app.after_request
+    def _journal_record(response):
+        request_journal.record(
+            ts=g.get('journal_ts', time.time()),
+            route=request.path,
+            method=request.method,
+            input_method=g.get('input_method', ''),
+            query_string=request.query_string,
+            content_type=request.content_type or '',
+            body=request.get_data(cache=True),
+            query=g.get('final_query', ''),
+            status=response.status_code,
+            total_ms=(time.perf_counter() - g.get('journal_start', time.perf_counter())) * 1000,
+            db_ms=g.get('db_ms', 0.0),
+        )
+        return response
+
+
+# --- Opt-in per-request profiler (见 profiler.py) ---
+@app.before_request
+def _profile_start():
+    if profiler.should_profile(request.remote_addr, request.headers):
+        g.profiler = profiler.StackSampler(threading.get_ident()).start()
+
+@app.after_request
+def _profile_stop(response):
+    sampler = g.pop('profiler', None)
+    if sampler is not None:
+        name = sampler.stop().write(request.path)
+        response.headers['X-Lab-Profile-File'] = name
+    return response
+
+# 前面的 after_request 抛出异常时 _profile_stop 不会执行，teardown 一定会执行，保证采样线程被停止
+@app.teardown_request
+def _profile_teardown(exc):
+    sampler = g.pop('profiler', None)
+    if sampler is not None:
+        sampler.stop().write(request.path)
+
+
+# --- Per-route memory accounting (见 memtrack.py) ---
+if memtrack.MEMTRACK:
+    memtrack.start()
+    print("tracemalloc 内存统计已开启")
+
+    @app.before_request
+    def _memtrack_start():
+        g.mem_baseline = memtrack.begin_request()
+
+    # teardown 一定会执行，异常的请求也会释放请求锁
+    @app.teardown_request
+    def _memtrack_end(exc):
+        baseline = g.pop('mem_baseline', None)
+        if baseline is not None:
+            memtrack.end_request(baseline, request.path, request.path.split('/')[1])
+
+
+# --- Bounded request bodies (见 limits.py) ---
+limits.configure(app)
+
+@app.errorhandler(RequestEntityTooLarge)
+def _too_large(e):
+    lablog.log('input.too_large', e.description, level='warning', route=request.path)
+    return jsonify({"error": "Request too large", "detail": e.description}), 413
+
+
+# --- WAF emulation between get_input() and the query templates (见 waf.py) ---
+waf_engine = waf.Waf.from_file(waf.WAF_RULES) if waf.WAF_RULES else None
+if waf_engine:
+    print(f"WAF 规则已加载: {waf.WAF_RULES}")
+
+@app.errorhandler(waf.Blocked)
+def _waf_blocked(e):
+    return jsonify({"error": "请求被 WAF 拦截", "param": e.param, "rule": e.rule}), 403
+
+
+# --- Latency-class scheduling of slow payloads (见 scheduler.py) ---
+latency_scheduler = scheduler.LatencyScheduler(backends.REGISTRY) if scheduler.LATENCY_CLASSES else None
+
+
+# --- Adaptive per-backend concurrency limits (见 adaptive.py) ---
+concurrency_limiter = adaptive.AdaptiveLimiter(backends.REGISTRY) if adaptive.ADAPTIVE_LIMIT else None
+if concurrency_limiter is not None:
+    print(f"自适应并发上限已开启 ({adaptive.ADAPTIVE_ALGORITHM})，初始上限 {adaptive.ADAPTIVE_INITIAL}")
+
+
+# --- Coalescing of identical concurrent read-only queries (见 singleflight.py) ---
+query_coalescer = singleflight.SingleFlight() if singleflight.COALESCE_QUERIES else None
+
+
+# --- Zero-decode passthrough of ClickHouse / PostgreSQL output (见 passthrough.py) ---
+if passthrough.PASSTHROUGH:
+    print(f"结果直通已开启: {', '.join(sorted(passthrough.PASSTHROUGH & set(passthrough.STREAMERS)))}")
+
+
+# --- Query fingerprint statistics (见 querystats.py) ---
+query_stats = querystats.QueryStats() if querystats.QUERY_STATS else None
+
+
 # --- Helper to extract input ---
 def get_input(param_name):
+    value = _extract_input(param_name)
+    if waf_engine is not None and value is not None:
+        value = waf_engine.filter(request.path, param_name, value)
+    return value
+
+def _extract_input(param_name):
     # 1. GET
     if request.method == 'GET':
         # 处理普通GET参数如?id=1
         value = request.args.get(param_name)
         if value is not None:
+            g.input_method = 'get'
             return value
         # 处理GET请求中的URL编码JSON参数如?data=%7B%22id%22%3A%221%22%7D
         data_param = request.args.get('data')
@@ -38,15 +405,19 @@ def get_input(param_name):
             try:
                 # 首先尝试解码URL编码的参数
                 decoded_data = urllib.parse.unquote(data_param)
-                data = json.loads(decoded_data)
+                data = limits.loads(decoded_data)
                 if param_name in data:
+                    g.input_method = 'get-urlencoded'
                     return data[param_name]
+            except RequestEntityTooLarge:
+                raise
             except Exception as e:
-                print(f"Error parsing GET URL encoded JSON: {e}") # Log error
+                lablog.log('input.parse', f"Error parsing GET URL encoded JSON: {e}", level='warning', route=request.path)
                 pass
     
     # 2. POST Form
     if request.form.get(param_name):
+        g.input_method = 'form'
         return request.form.get(param_name)
     
     # 3. JSON
@@ -54,18 +425,23 @@ def get_input(param_name):
         data = request.get_json()
         # 处理嵌套 {"data": {"id": "1"}} - data是对象
         if 'data' in data and isinstance(data['data'], dict) and param_name in data['data']:
+            g.input_method = 'nested'
             return data['data'][param_name]
         # 处理嵌套 {"data": "{\"id\":\"1\"}"} - data是JSON字符串
         if 'data' in data and isinstance(data['data'], str):
             try:
-                nested_data = json.loads(data['data'])
+                nested_data = limits.loads(data['data'])
                 if param_name in nested_data:
+                    g.input_method = 'nested-string'
                     return nested_data[param_name]
+            except RequestEntityTooLarge:
+                raise
             except Exception as e:
-                print(f"Error parsing nested JSON string: {e}") # Log error
+                lablog.log('input.parse', f"Error parsing nested JSON string: {e}", level='warning', route=request.path)
                 pass
         # 处理普通JSON {"id": "1"}
         if param_name in data:
+            g.input_method = 'json'
             return data[param_name]
             
     # 4. POST URL Encoded JSON (data=%7B%22id%22%3A%221%22%7D)
@@ -73,303 +449,314 @@ def get_input(param_name):
         try:
             # Decode if it looks like JSON string
             json_str = request.form.get('data')
-            data = json.loads(json_str)
+            data = limits.loads(json_str)
             if param_name in data:
+                g.input_method = 'urlencoded'
                 return data[param_name]
+        except RequestEntityTooLarge:
+            raise
         except Exception as e:
-            print(f"Error parsing URL encoded JSON: {e}") # Log error
+            lablog.log('input.parse', f"Error parsing URL encoded JSON: {e}", level='warning', route=request.path)
             pass
             
     return None
 
 # --- Generic helper for DB queries ---
-def execute_query(get_conn_func, query_template, params_dict, db_type_name):
+class _NoConnection(Exception):
+    pass
+
+def _run_query(backend, query, timing, span=tracing.NOOP):
+    """取连接、执行查询、归还连接。可能在请求线程里执行，也可能在慢查询线程里执行（见 scheduler.py），不能访问 g。"""
+    with span.child('db.checkout'):
+        conn = backend.connect()
+    if conn is None:
+        raise _NoConnection()
+    try:
+        db_start = time.perf_counter()
+        try:
+            return backend.fetch(conn, tracing.sql_comment(span) + query, span)
+        finally:
+            timing['db_ms'] = (time.perf_counter() - db_start) * 1000
+    finally:
+        # 关闭资源（连接池中的连接在这里归还）
+        try:
+            if hasattr(conn, 'close'):
+               conn.close()
+        except Exception as e:
+            lablog.log('query.close_error', f"关闭 {backend.label} 连接时出错: {e}", backend=backend.label)
+
+def _guarded(backend, query, work):
+    """给占用数据库的 work 套上自适应并发上限和慢查询调度（都开启时调度在外层）。"""
+    if concurrency_limiter is not None:
+        # 只包住真正占用数据库的部分，排队时间不计入延迟样本
+        work = functools.partial(concurrency_limiter.run, backend, query, work)
+    if latency_scheduler is not None:
+        work = functools.partial(latency_scheduler.run, backend, query, work)
+    return work
+
+def execute_query(backend, query_template, params_dict):
     """
     Executes a query against a database.
     
     Args:
-        get_conn_func: Function to get database connection (e.g., db.get_mysql_connection).
-        query_template: String template for the SQL query (e.g., "SELECT * FROM users WHERE id = {uid}").
+        backend: backends.Backend from the registry; provides connect(), fetch() and the display label.
+        query_template: String template for the SQL query (e.g., "SELECT * FROM users WHERE id = {id}").
                           Assumes placeholders are replaced using format().
         params_dict: Dictionary containing parameters extracted via get_input.
-        db_type_name: Name of the database type for error messages (e.g., "MySQL").
 
     Returns:
         Tuple (success: bool, response_data: dict, status_code: int)
     """
-    # 尝试获取连接
+    db_type_name = backend.label
+    # 格式化查询（假设故意存在漏洞用于实验）
+    # 注意：实际应用应该使用参数化查询！
+    query = query_template.format(**params_dict)
+    span = g.get('trace_span', tracing.NOOP)
     try:
-        conn = get_conn_func()
-        if conn is None:
-            error_msg = f"无法连接到 {db_type_name} 数据库"
-            print(error_msg)
-            query = query_template.format(**params_dict)
-            return False, {"query": query, "error": error_msg}, 500
-
-        cursor = None
+        if sandbox.SANDBOX_POOL_SIZE > 0:
+            _bind_sandbox()
+        if ratelimit.RATE_LIMIT:
+            _take_slow_slot(query)
+        g.final_query = query
+        if span.sampled:
+            span.set('db.query.fingerprint', querystats.fingerprint(query))
+        timing = {'db_ms': 0.0}
+        query_span = span.child('query', kind='client', **{'db.system': backend.dialect})
+        work = _guarded(backend, query, functools.partial(_run_query, backend, query, timing, query_span))
+        failed = True
         try:
-            # 格式化查询（假设故意存在漏洞用于实验）
-            # 注意：实际应用应该使用参数化查询！
-            query = query_template.format(**params_dict)
-            
-            if db_type_name.lower() in ['mysql', 'postgres', 'postgresql', 'oracle']:
-                 cursor = conn.cursor()
-                 cursor.execute(query)
-                 result = cursor.fetchall()
-            elif db_type_name.lower() == 'clickhouse':
-                # 假设ClickHouse客户端execute直接返回结果
-                result = conn.execute(query)
+            if query_coalescer is not None and singleflight.coalescable(query):
+                # 不同沙箱里的同一条 SQL 结果不同，不能合并
+                wait_start = time.perf_counter()
+                result, shared = query_coalescer.do((backend.name, (db.get_sandbox() or {}).get(backend.name), query), work)
+                query_span.set('lab.coalesced', shared)
+                if shared:
+                    timing['db_ms'] = (time.perf_counter() - wait_start) * 1000
             else:
-                 raise ValueError(f"不支持的数据库类型: {db_type_name}")
-
-            return True, {"query": query, "result": result}, 200
-
-        except Exception as e:
-            error_msg = f"数据库查询失败: {str(e)}"
-            print(f"{db_type_name} 错误: {error_msg}")
-            query = query_template.format(**params_dict)
-            return False, {"query": query, "error": error_msg}, 500
+                if query_coalescer is not None:
+                    query_coalescer.skip()
+                result = work()
+            failed = False
         finally:
-            # 关闭资源
-            if cursor:
-                try:
-                    cursor.close()
-                except:
-                    pass
-            if conn:
-                try:
-                    if hasattr(conn, 'close'):
-                       conn.close()
-                except Exception as e:
-                    print(f"关闭 {db_type_name} 连接时出错: {e}")
+            query_span.end(sys.exc_info()[1])
+            g.db_ms = timing['db_ms']
+            if query_stats is not None:
+                query_stats.record(db_type_name, query, g.db_ms, failed)
+
+        memtrack.check()
+
+        span.set('lab.rows', len(result))
+        data = {"query": query, "result": result}
+        if explain.requested(request):
+            # 计划查询会再执行一遍 SQL，和正常查询一样经过并发上限和慢查询调度
+            capture = functools.partial(explain.capture, backend.connect, backend.dialect, query, result)
+            try:
+                data["explain"] = _guarded(backend, query, capture)()
+            except (adaptive.LimitExceeded, scheduler.QueueFull) as e:
+                data["explain"] = {"error": str(e)}
+        return True, data, 200
+
+    except (_NoConnection, workers.WorkerNoConnection):
+        # 隔离模式下连不上数据库由工作进程报告，响应和非隔离模式一致
+        error_msg = f"无法连接到 {db_type_name} 数据库"
+        lablog.log('query.no_connection', error_msg, backend=db_type_name)
+        return False, {"query": query, "error": error_msg}, 500
+
+    except ratelimit.Limited as e:
+        g.retry_after = e.retry_after
+        return False, {"query": query, "error": "慢查询并发过多，请稍后重试", "reason": e.reason}, 429
+
+    except (adaptive.LimitExceeded, scheduler.QueueFull) as e:
+        lablog.log('query.limited', str(e), level='warning', backend=db_type_name, route=request.path)
+        # 由视图函数写进 Retry-After 响应头
+        g.retry_after = e.retry_after
+        return False, {"query": query, "error": str(e)}, 503
+
+    except memtrack.MemoryCeilingExceeded as e:
+        lablog.log('memory.ceiling', str(e), backend=db_type_name, route=request.path)
+        return False, {"query": query, "error": str(e), "memory_bytes": e.used}, 500
+
     except Exception as e:
-        # 捕获所有异常，确保应用不会崩溃
-        print(f"查询过程中发生异常: {e}")
-        query = query_template.format(**params_dict)
-        return False, {"query": query, "error": str(e)}, 500
+        error_msg = f"数据库查询失败: {str(e)}"
+        lablog.log('query.error', error_msg, backend=db_type_name, route=request.path)
+        return False, {"query": query, "error": error_msg}, 500
 
 
-# --- MySQL Endpoints ---
+def stream_query(backend, open_stream, query_template, params_dict):
+    """
+    直通模式（见 passthrough.py）：数据库输出的 JSON 行原样流式写进响应，不经过 Python 解码。
+    返回值可以直接作为视图函数的返回值。
+    """
+    db_type_name = backend.label
+    query = query_template.format(**params_dict)
+    if sandbox.SANDBOX_POOL_SIZE > 0:
+        _bind_sandbox()
+    if ratelimit.RATE_LIMIT:
+        try:
+            _take_slow_slot(query)
+        except ratelimit.Limited as e:
+            response = jsonify({"query": query, "error": "慢查询并发过多，请稍后重试", "reason": e.reason})
+            response.status_code = 429
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response
+    g.final_query = query
+    failed = True
+    db_start = time.perf_counter()
+    try:
+        # 只计到第一块数据返回为止，之后的时间花在传输上
+        source = open_stream(query, backend.timeout_ms)
+        failed = False
+    except Exception as e:
+        error_msg = f"数据库查询失败: {str(e)}"
+        lablog.log('query.error', error_msg, backend=db_type_name, route=request.path)
+        return jsonify({"query": query, "error": error_msg}), 500
+    finally:
+        g.db_ms = (time.perf_counter() - db_start) * 1000
+        if query_stats is not None:
+            query_stats.record(db_type_name, query, g.db_ms, failed)
+    # teardown 在响应体写出之前就执行了；把准入和限流名额从 g 里取走，等流结束时再释放
+    admitted_at = g.pop('admitted_at', None)
+    rate_limit_slot = g.pop('rate_limit_slot', None)
+
+    def close():
+        try:
+            source.close()
+        finally:
+            if admitted_at is not None:
+                admission_controller.release(time.perf_counter() - admitted_at)
+            if rate_limit_slot is not None:
+                rate_limiter.release(rate_limit_slot)
+
+    response = Response(passthrough.stream(query, source.chunks), mimetype='application/json')
+    response.call_on_close(close)
+    return response
+
+
+# --- Database endpoints, generated from the backend registry (见 backends.py) ---
+def _make_endpoint(backend, shape):
+    # 模板、错误响应和是否直通在启动时确定
+    template = backend.template(shape)
+    param = shape.param
+    missing = {"error": f"Missing {param} parameter"}
+    open_stream = passthrough.STREAMERS.get(backend.name) if backend.name in passthrough.PASSTHROUGH else None
+
+    def endpoint():
+        span = g.get('trace_span', tracing.NOOP)
+        with span.child('input'):
+            value = get_input(param)
+        span.set('lab.input_method', g.get('input_method', ''))
+        if not value: return jsonify(missing), 400
+
+        if open_stream is not None:
+            return stream_query(backend, open_stream, template, {param: value}) # Intentionally vulnerable
+        success, data, status_code = execute_query(backend, template, {param: value}) # Intentionally vulnerable
+        with span.child('serialize'):
+            response = jsonify(data)
+        if 'retry_after' in g:
+            response.headers['Retry-After'] = str(g.retry_after)
+        return response, status_code
+    return endpoint
+
+for _backend in backends.REGISTRY.values():
+    for _shape in _backend.shapes:
+        app.add_url_rule(f'/{_backend.name}/{_shape.name}', f'{_backend.name}_{_shape.name}',
+                         _make_endpoint(_backend, _shape), methods=['GET', 'POST'])
+
+
+# --- Live dashboard stream (见 dashboard.py) ---
+@app.route('/dashboard/stream')
+def dashboard_stream():
+    frames = live_dashboard.subscribe() if live_dashboard is not None else None
+    if frames is None:
+        return jsonify({"error": "实时面板未开启或观看人数已满"}), 503
+    response = Response(frames, mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.call_on_close(live_dashboard.unsubscribe)
+    return response
 
-@app.route('/mysql/char', methods=['GET', 'POST'])
-def mysql_char():
-    uid = get_input('id')
-    if not uid: return jsonify({"error": "Missing id parameter"}), 400
-    
-    success, data, status_code = execute_query(
-        db.get_mysql_connection,
-        "SELECT * FROM users WHERE id = '{uid}'", # Intentionally vulnerable
-        {'uid': uid},
-        "MySQL"
-    )
-    return jsonify(data), status_code
-
-@app.route('/mysql/int', methods=['GET', 'POST'])
-def mysql_int():
-    uid = get_input('id')
-    if not uid: return jsonify({"error": "Missing id parameter"}), 400
-    
-    success, data, status_code = execute_query(
-        db.get_mysql_connection,
-        "SELECT * FROM users WHERE id = {uid}", # Intentionally vulnerable
-        {'uid': uid},
-        "MySQL"
-    )
-    return jsonify(data), status_code
-
-@app.route('/mysql/like', methods=['GET', 'POST'])
-def mysql_like():
-    username = get_input('username')
-    if not username: return jsonify({"error": "Missing username parameter"}), 400
-    
-    success, data, status_code = execute_query(
-        db.get_mysql_connection,
-        "SELECT * FROM users WHERE username LIKE '%{username}%'", # Intentionally vulnerable
-        {'username': username},
-        "MySQL"
-    )
-    return jsonify(data), status_code
-
-@app.route('/mysql/orderby', methods=['GET', 'POST'])
-def mysql_orderby():
-    col = get_input('col')
-    if not col: return jsonify({"error": "Missing col parameter"}), 400
-    
-    success, data, status_code = execute_query(
-        db.get_mysql_connection,
-        "SELECT * FROM users ORDER BY {col}", # Intentionally vulnerable
-        {'col': col},
-        "MySQL"
-    )
-    return jsonify(data), status_code
-
-# --- PostgreSQL Endpoints ---
-
-@app.route('/postgres/char', methods=['GET', 'POST'])
-def postgres_char():
-    uid = get_input('id') # Using 'id' for consistency with instructions, though comment suggested username
-    if not uid: return jsonify({"error": "Missing id parameter"}), 400
-    
-    success, data, status_code = execute_query(
-        db.get_postgres_connection,
-        "SELECT * FROM users WHERE id = '{uid}'", # Intentionally vulnerable - using username for char example
-        {'uid': uid}, # Note: uid used in template as username value
-        "PostgreSQL"
-    )
-    return jsonify(data), status_code
-
-@app.route('/postgres/int', methods=['GET', 'POST'])
-def postgres_int():
-    uid = get_input('id')
-    if not uid: return jsonify({"error": "Missing id parameter"}), 400
-    
-    success, data, status_code = execute_query(
-        db.get_postgres_connection,
-        "SELECT * FROM users WHERE id = {uid}", # Intentionally vulnerable
-        {'uid': uid},
-        "PostgreSQL"
-    )
-    return jsonify(data), status_code
-
-@app.route('/postgres/like', methods=['GET', 'POST'])
-def postgres_like():
-    username = get_input('username')
-    if not username: return jsonify({"error": "Missing username parameter"}), 400
-    
-    success, data, status_code = execute_query(
-        db.get_postgres_connection,
-        "SELECT * FROM users WHERE username LIKE '%{username}%'", # Intentionally vulnerable
-        {'username': username},
-        "PostgreSQL"
-    )
-    return jsonify(data), status_code
-
-@app.route('/postgres/orderby', methods=['GET', 'POST'])
-def postgres_orderby():
-    col = get_input('col')
-    if not col: return jsonify({"error": "Missing col parameter"}), 400
-    
-    success, data, status_code = execute_query(
-        db.get_postgres_connection,
-        "SELECT * FROM users ORDER BY {col}", # Intentionally vulnerable
-        {'col': col},
-        "PostgreSQL"
-    )
-    return jsonify(data), status_code
-
-# --- ClickHouse Endpoints ---
-
-@app.route('/clickhouse/int', methods=['GET', 'POST'])
-def clickhouse_int():
-    uid = get_input('id')
-    if not uid: return jsonify({"error": "Missing id parameter"}), 400
-    
-    success, data, status_code = execute_query(
-        db.get_clickhouse_connection,
-        "SELECT * FROM sqli_lab.users WHERE id = {uid}", # Intentionally vulnerable
-        {'uid': uid},
-        "ClickHouse"
-    )
-    return jsonify(data), status_code
-
-@app.route('/clickhouse/char', methods=['GET', 'POST'])
-def clickhouse_char():
-     # Using 'id' param as per table structure implied
-    uid = get_input('id')
-    if not uid: return jsonify({"error": "Missing id parameter"}), 400
-    
-    success, data, status_code = execute_query(
-        db.get_clickhouse_connection,
-        "SELECT * FROM sqli_lab.users WHERE id = '{uid}'", # Intentionally vulnerable
-        {'uid': uid},
-        "ClickHouse"
-    )
-    return jsonify(data), status_code
-
-@app.route('/clickhouse/like', methods=['GET', 'POST'])
-def clickhouse_like():
-    username = get_input('username')
-    if not username: return jsonify({"error": "Missing username parameter"}), 400
-    
-    success, data, status_code = execute_query(
-        db.get_clickhouse_connection,
-        "SELECT * FROM sqli_lab.users WHERE username LIKE '%{username}%'", # Intentionally vulnerable
-        {'username': username},
-        "ClickHouse"
-    )
-    return jsonify(data), status_code
-
-@app.route('/clickhouse/orderby', methods=['GET', 'POST'])
-def clickhouse_orderby():
-    col = get_input('col')
-    if not col: return jsonify({"error": "Missing col parameter"}), 400
-    
-    success, data, status_code = execute_query(
-        db.get_clickhouse_connection,
-        "SELECT * FROM sqli_lab.users ORDER BY {col}", # Intentionally vulnerable
-        {'col': col},
-        "ClickHouse"
-    )
-    return jsonify(data), status_code
-
-# --- Oracle Endpoints ---
-
-@app.route('/oracle/char', methods=['GET', 'POST'])
-def oracle_char():
-    uid = get_input('id')
-    if not uid: return jsonify({"error": "Missing id parameter"}), 400
-    
-    success, data, status_code = execute_query(
-        db.get_oracle_connection,
-        "SELECT * FROM users WHERE id = '{uid}'", # Intentionally vulnerable
-        {'uid': uid},
-        "Oracle"
-    )
-    return jsonify(data), status_code
-
-@app.route('/oracle/int', methods=['GET', 'POST'])
-def oracle_int():
-    uid = get_input('id')
-    if not uid: return jsonify({"error": "Missing id parameter"}), 400
-    
-    success, data, status_code = execute_query(
-        db.get_oracle_connection,
-        "SELECT * FROM users WHERE id = {uid}", # Intentionally vulnerable
-        {'uid': uid},
-        "Oracle"
-    )
-    return jsonify(data), status_code
-
-@app.route('/oracle/like', methods=['GET', 'POST'])
-def oracle_like():
-    username = get_input('username')
-    if not username: return jsonify({"error": "Missing username parameter"}), 400
-    
-    success, data, status_code = execute_query(
-        db.get_oracle_connection,
-        "SELECT * FROM users WHERE username LIKE '%{username}%'", # Intentionally vulnerable
-        {'username': username},
-        "Oracle"
-    )
-    return jsonify(data), status_code
-
-@app.route('/oracle/orderby', methods=['GET', 'POST'])
-def oracle_orderby():
-    col = get_input('col')
-    if not col: return jsonify({"error": "Missing col parameter"}), 400
-    
-    success, data, status_code = execute_query(
-        db.get_oracle_connection,
-        "SELECT * FROM users ORDER BY {col}", # Intentionally vulnerable
-        {'col': col},
-        "Oracle"
-    )
-    return jsonify(data), status_code
 
 # --- Homepage Route ---
-@app.route('/')
-def index():
-    return """<!DOCTYPE html>
+_DASHBOARD_PANEL = """    <div class="card" id="dashboard">
+        <h2>📈 实时状态 <small id="dashboard-summary" style="font-size: 0.6em; color: #7f8c8d;">连接中...</small></h2>
+        <div id="dashboard-backends"></div>
+        <table>
+            <tr><th>接口</th><th>请求/秒</th><th>p50 ms</th><th>p95 ms</th><th>p99 ms</th><th>错误率</th></tr>
+            <tbody id="dashboard-routes"></tbody>
+        </table>
+    </div>
+    <script>
+        (function () {
+            var source = new EventSource('/dashboard/stream');
+            function cell(text) { var td = document.createElement('td'); td.textContent = text; return td; }
+            function row(name, s) {
+                var tr = document.createElement('tr');
+                [name, s.rps, s.p50_ms, s.p95_ms, s.p99_ms, (s.error_rate * 100).toFixed(1) + '%'].forEach(function (v) { tr.appendChild(cell(v)); });
+                if (s.error_rate > 0.05) tr.style.color = '#c0392b';
+                return tr;
+            }
+            source.onmessage = function (event) {
+                var frame = JSON.parse(event.data);
+                document.getElementById('dashboard-summary').textContent =
+                    '最近 ' + frame.window_s + ' 秒 · ' + frame.total.rps + ' 请求/秒 · ' + frame.viewers + ' 人在看';
+                var backends = document.getElementById('dashboard-backends');
+                backends.textContent = '';
+                Object.keys(frame.backends).forEach(function (name) {
+                    var b = frame.backends[name], span = document.createElement('span');
+                    span.className = 'btn';
+                    span.style.background = b.status === 'up' ? '#27ae60' : '#c0392b';
+                    span.style.marginRight = '5px';
+                    span.title = b.status === 'up' ? b.probe_ms + ' ms' : b.error;
+                    span.textContent = name + (b.status === 'up' ? ' ✓' : ' ✗');
+                    backends.appendChild(span);
+                });
+                var tbody = document.getElementById('dashboard-routes');
+                tbody.textContent = '';
+                Object.keys(frame.routes).forEach(function (route) { tbody.appendChild(row(route, frame.routes[route])); });
+                if (frame.total.count) tbody.appendChild(row('全部', frame.total));
+            };
+            source.onerror = function () {
+                document.getElementById('dashboard-summary').textContent = '连接断开，正在重连...';
+            };
+        })();
+    </script>
+
+"""
+
+_ENDPOINT_TABLE = """    <!-- %(label)s -->
+    <h3>%(label)s</h3>
+    <table>
+        <tr><th>类型</th><th>接口</th><th>参数</th><th>操作</th></tr>
+%(rows)s    </table>
+
+"""
+
+_ENDPOINT_ROW = """        <tr>
+            <td>%(label)s</td>
+            <td><code>%(path)s</code></td>
+            <td>%(param)s</td>
+            <td>
+                <button class="btn btn-run" onclick="runTest('%(path)s', '%(param)s', '%(example)s', 'json')">JSON</button>
+                <button class="btn" onclick="runTest('%(path)s', '%(param)s', '%(example)s', 'form')">表单</button>
+                <button class="btn btn-alt" onclick="runUrlEncodedTest('%(path)s', '%(param)s', '%(example)s')">URL编码</button>
+                <button class="btn" style="background: #f39c12;" onclick="runNestedJsonStringTest('%(path)s', '%(param)s', '%(example)s')">嵌套JSON字符串</button>
+                <button class="btn" style="background: #27ae60;" onclick="runNestedJsonObjectTest('%(path)s', '%(param)s', '%(example)s')">嵌套JSON对象</button>
+                <button class="btn" style="background: #e74c3c;" onclick="runGetTest('%(path)s', '%(param)s', '%(example)s')">GET请求</button>
+                <button class="btn" style="background: #16a085;" onclick="runGetUrlEncodedTest('%(path)s', '%(param)s', '%(example)s')">GET URL编码</button>
+            </td>
+        </tr>
+"""
+
+def _endpoint_tables():
+    tables = []
+    for b in backends.REGISTRY.values():
+        rows = ''.join(_ENDPOINT_ROW % {'label': shape.label, 'path': f'/{b.name}/{shape.name}',
+                                        'param': shape.param, 'example': shape.example} for shape in b.shapes)
+        tables.append(_ENDPOINT_TABLE % {'label': b.label, 'rows': rows})
+    return ''.join(tables)
+
+# 首页在启动时渲染一次
+_INDEX_HTML = """<!DOCTYPE html>
 <html lang="zh-CN">
 <head>
     <meta charset="UTF-8">
@@ -412,9 +799,9 @@ def index():
         <h2>🚀 状态</h2>
         <p>数据库已在启动时完成初始化。</p>
     </div>
-
+<!--DASHBOARD_PANEL-->
     <h2>📚 文档说明</h2>
-    <p>本实验提供了针对 4 种不同数据库的易受攻击的接口。所有接口均返回 JSON 格式的数据。</p>
+    <p>本实验提供了针对 <!--BACKEND_COUNT--> 种不同数据库的易受攻击的接口。所有接口均返回 JSON 格式的数据。</p>
     
     <h3>支持的输入方式</h3>
     <ul>
@@ -430,255 +817,7 @@ def index():
 
     <h2>🎯 接口列表</h2>
 
-    <!-- MySQL -->
-    <h3>MySQL</h3>
-    <table>
-        <tr><th>类型</th><th>接口</th><th>参数</th><th>操作</th></tr>
-        <tr>
-            <td>字符串</td>
-            <td><code>/mysql/char</code></td>
-            <td>id</td>
-            <td>
-                <button class="btn btn-run" onclick="runTest('/mysql/char', 'id', '1', 'json')">JSON</button>
-                <button class="btn" onclick="runTest('/mysql/char', 'id', '1', 'form')">表单</button>
-                <button class="btn btn-alt" onclick="runUrlEncodedTest('/mysql/char', 'id', '1')">URL编码</button>
-                <button class="btn" style="background: #f39c12;" onclick="runNestedJsonStringTest('/mysql/char', 'id', '1')">嵌套JSON字符串</button>
-                <button class="btn" style="background: #27ae60;" onclick="runNestedJsonObjectTest('/mysql/char', 'id', '1')">嵌套JSON对象</button>
-                <button class="btn" style="background: #e74c3c;" onclick="runGetTest('/mysql/char', 'id', '1')">GET请求</button>
-                <button class="btn" style="background: #16a085;" onclick="runGetUrlEncodedTest('/mysql/char', 'id', '1')">GET URL编码</button>
-            </td>
-        </tr>
-        <tr>
-            <td>整数</td>
-            <td><code>/mysql/int</code></td>
-            <td>id</td>
-            <td>
-                <button class="btn btn-run" onclick="runTest('/mysql/int', 'id', '1', 'json')">JSON</button>
-                <button class="btn" onclick="runTest('/mysql/int', 'id', '1', 'form')">表单</button>
-                <button class="btn btn-alt" onclick="runUrlEncodedTest('/mysql/int', 'id', '1')">URL编码</button>
-                <button class="btn" style="background: #f39c12;" onclick="runNestedJsonStringTest('/mysql/int', 'id', '1')">嵌套JSON字符串</button>
-                <button class="btn" style="background: #27ae60;" onclick="runNestedJsonObjectTest('/mysql/int', 'id', '1')">嵌套JSON对象</button>
-                <button class="btn" style="background: #e74c3c;" onclick="runGetTest('/mysql/int', 'id', '1')">GET请求</button>
-                <button class="btn" style="background: #16a085;" onclick="runGetUrlEncodedTest('/mysql/int', 'id', '1')">GET URL编码</button>
-            </td>
-        </tr>
-        <tr>
-            <td>Like</td>
-            <td><code>/mysql/like</code></td>
-            <td>username</td>
-            <td>
-                <button class="btn btn-run" onclick="runTest('/mysql/like', 'username', 'admin', 'json')">JSON</button>
-                <button class="btn" onclick="runTest('/mysql/like', 'username', 'admin', 'form')">表单</button>
-                <button class="btn btn-alt" onclick="runUrlEncodedTest('/mysql/like', 'username', 'admin')">URL编码</button>
-                <button class="btn" style="background: #f39c12;" onclick="runNestedJsonStringTest('/mysql/like', 'username', 'admin')">嵌套JSON字符串</button>
-                <button class="btn" style="background: #27ae60;" onclick="runNestedJsonObjectTest('/mysql/like', 'username', 'admin')">嵌套JSON对象</button>
-                <button class="btn" style="background: #e74c3c;" onclick="runGetTest('/mysql/like', 'username', 'admin')">GET请求</button>
-                <button class="btn" style="background: #16a085;" onclick="runGetUrlEncodedTest('/mysql/like', 'username', 'admin')">GET URL编码</button>
-            </td>
-        </tr>
-        <tr>
-            <td>Order By</td>
-            <td><code>/mysql/orderby</code></td>
-            <td>col</td>
-            <td>
-                <button class="btn btn-run" onclick="runTest('/mysql/orderby', 'col', 'id', 'json')">JSON</button>
-                <button class="btn" onclick="runTest('/mysql/orderby', 'col', 'id', 'form')">表单</button>
-                <button class="btn btn-alt" onclick="runUrlEncodedTest('/mysql/orderby', 'col', 'id')">URL编码</button>
-                <button class="btn" style="background: #f39c12;" onclick="runNestedJsonStringTest('/mysql/orderby', 'col', 'id')">嵌套JSON字符串</button>
-                <button class="btn" style="background: #27ae60;" onclick="runNestedJsonObjectTest('/mysql/orderby', 'col', 'id')">嵌套JSON对象</button>
-                <button class="btn" style="background: #e74c3c;" onclick="runGetTest('/mysql/orderby', 'col', 'id')">GET请求</button>
-                <button class="btn" style="background: #16a085;" onclick="runGetUrlEncodedTest('/mysql/orderby', 'col', 'id')">GET URL编码</button>
-            </td>
-        </tr>
-    </table>
-
-    <!-- PostgreSQL -->
-    <h3>PostgreSQL</h3>
-    <table>
-        <tr><th>类型</th><th>接口</th><th>参数</th><th>操作</th></tr>
-        <tr>
-            <td>字符串</td>
-            <td><code>/postgres/char</code></td>
-            <td>id</td>
-            <td>
-                <button class="btn btn-run" onclick="runTest('/postgres/char', 'id', '1', 'json')">JSON</button>
-                <button class="btn" onclick="runTest('/postgres/char', 'id', '1', 'form')">表单</button>
-                <button class="btn btn-alt" onclick="runUrlEncodedTest('/postgres/char', 'id', '1')">URL编码</button>
-                <button class="btn" style="background: #f39c12;" onclick="runNestedJsonStringTest('/postgres/char', 'id', '1')">嵌套JSON字符串</button>
-                <button class="btn" style="background: #27ae60;" onclick="runNestedJsonObjectTest('/postgres/char', 'id', '1')">嵌套JSON对象</button>
-                <button class="btn" style="background: #e74c3c;" onclick="runGetTest('/postgres/char', 'id', '1')">GET请求</button>
-                <button class="btn" style="background: #16a085;" onclick="runGetUrlEncodedTest('/postgres/char', 'id', '1')">GET URL编码</button>
-            </td>
-        </tr>
-        <tr>
-            <td>整数</td>
-            <td><code>/postgres/int</code></td>
-            <td>id</td>
-            <td>
-                <button class="btn btn-run" onclick="runTest('/postgres/int', 'id', '1', 'json')">JSON</button>
-                <button class="btn" onclick="runTest('/postgres/int', 'id', '1', 'form')">表单</button>
-                <button class="btn btn-alt" onclick="runUrlEncodedTest('/postgres/int', 'id', '1')">URL编码</button>
-                <button class="btn" style="background: #f39c12;" onclick="runNestedJsonStringTest('/postgres/int', 'id', '1')">嵌套JSON字符串</button>
-                <button class="btn" style="background: #27ae60;" onclick="runNestedJsonObjectTest('/postgres/int', 'id', '1')">嵌套JSON对象</button>
-                <button class="btn" style="background: #e74c3c;" onclick="runGetTest('/postgres/int', 'id', '1')">GET请求</button>
-                <button class="btn" style="background: #16a085;" onclick="runGetUrlEncodedTest('/postgres/int', 'id', '1')">GET URL编码</button>
-            </td>
-        </tr>
-        <tr>
-            <td>Like</td>
-            <td><code>/postgres/like</code></td>
-            <td>username</td>
-            <td>
-                <button class="btn btn-run" onclick="runTest('/postgres/like', 'username', 'admin', 'json')">JSON</button>
-                <button class="btn" onclick="runTest('/postgres/like', 'username', 'admin', 'form')">表单</button>
-                <button class="btn btn-alt" onclick="runUrlEncodedTest('/postgres/like', 'username', 'admin')">URL编码</button>
-                <button class="btn" style="background: #f39c12;" onclick="runNestedJsonStringTest('/postgres/like', 'username', 'admin')">嵌套JSON字符串</button>
-                <button class="btn" style="background: #27ae60;" onclick="runNestedJsonObjectTest('/postgres/like', 'username', 'admin')">嵌套JSON对象</button>
-                <button class="btn" style="background: #e74c3c;" onclick="runGetTest('/postgres/like', 'username', 'admin')">GET请求</button>
-                <button class="btn" style="background: #16a085;" onclick="runGetUrlEncodedTest('/postgres/like', 'username', 'admin')">GET URL编码</button>
-            </td>
-        </tr>
-        <tr>
-            <td>Order By</td>
-            <td><code>/postgres/orderby</code></td>
-            <td>col</td>
-            <td>
-                <button class="btn btn-run" onclick="runTest('/postgres/orderby', 'col', 'id', 'json')">JSON</button>
-                <button class="btn" onclick="runTest('/postgres/orderby', 'col', 'id', 'form')">表单</button>
-                <button class="btn btn-alt" onclick="runUrlEncodedTest('/postgres/orderby', 'col', 'id')">URL编码</button>
-                <button class="btn" style="background: #f39c12;" onclick="runNestedJsonStringTest('/postgres/orderby', 'col', 'id')">嵌套JSON字符串</button>
-                <button class="btn" style="background: #27ae60;" onclick="runNestedJsonObjectTest('/postgres/orderby', 'col', 'id')">嵌套JSON对象</button>
-                <button class="btn" style="background: #e74c3c;" onclick="runGetTest('/postgres/orderby', 'col', 'id')">GET请求</button>
-                <button class="btn" style="background: #16a085;" onclick="runGetUrlEncodedTest('/postgres/orderby', 'col', 'id')">GET URL编码</button>
-            </td>
-        </tr>
-    </table>
-
-    <!-- ClickHouse -->
-    <h3>ClickHouse</h3>
-    <table>
-        <tr><th>类型</th><th>接口</th><th>参数</th><th>操作</th></tr>
-        <tr>
-            <td>字符串</td>
-            <td><code>/clickhouse/char</code></td>
-            <td>id</td>
-            <td>
-                <button class="btn btn-run" onclick="runTest('/clickhouse/char', 'id', '1', 'json')">JSON</button>
-                <button class="btn" onclick="runTest('/clickhouse/char', 'id', '1', 'form')">表单</button>
-                <button class="btn btn-alt" onclick="runUrlEncodedTest('/clickhouse/char', 'id', '1')">URL编码</button>
-                <button class="btn" style="background: #f39c12;" onclick="runNestedJsonStringTest('/clickhouse/char', 'id', '1')">嵌套JSON字符串</button>
-                <button class="btn" style="background: #27ae60;" onclick="runNestedJsonObjectTest('/clickhouse/char', 'id', '1')">嵌套JSON对象</button>
-                <button class="btn" style="background: #e74c3c;" onclick="runGetTest('/clickhouse/char', 'id', '1')">GET请求</button>
-                <button class="btn" style="background: #16a085;" onclick="runGetUrlEncodedTest('/clickhouse/char', 'id', '1')">GET URL编码</button>
-            </td>
-        </tr>
-        <tr>
-            <td>整数</td>
-            <td><code>/clickhouse/int</code></td>
-            <td>id</td>
-            <td>
-                <button class="btn btn-run" onclick="runTest('/clickhouse/int', 'id', '1', 'json')">JSON</button>
-                <button class="btn" onclick="runTest('/clickhouse/int', 'id', '1', 'form')">表单</button>
-                <button class="btn btn-alt" onclick="runUrlEncodedTest('/clickhouse/int', 'id', '1')">URL编码</button>
-                <button class="btn" style="background: #f39c12;" onclick="runNestedJsonStringTest('/clickhouse/int', 'id', '1')">嵌套JSON字符串</button>
-                <button class="btn" style="background: #27ae60;" onclick="runNestedJsonObjectTest('/clickhouse/int', 'id', '1')">嵌套JSON对象</button>
-                <button class="btn" style="background: #e74c3c;" onclick="runGetTest('/clickhouse/int', 'id', '1')">GET请求</button>
-                <button class="btn" style="background: #16a085;" onclick="runGetUrlEncodedTest('/clickhouse/int', 'id', '1')">GET URL编码</button>
-            </td>
-        </tr>
-        <tr>
-            <td>Like</td>
-            <td><code>/clickhouse/like</code></td>
-            <td>username</td>
-            <td>
-                <button class="btn btn-run" onclick="runTest('/clickhouse/like', 'username', 'admin', 'json')">JSON</button>
-                <button class="btn" onclick="runTest('/clickhouse/like', 'username', 'admin', 'form')">表单</button>
-                <button class="btn btn-alt" onclick="runUrlEncodedTest('/clickhouse/like', 'username', 'admin')">URL编码</button>
-                <button class="btn" style="background: #f39c12;" onclick="runNestedJsonStringTest('/clickhouse/like', 'username', 'admin')">嵌套JSON字符串</button>
-                <button class="btn" style="background: #27ae60;" onclick="runNestedJsonObjectTest('/clickhouse/like', 'username', 'admin')">嵌套JSON对象</button>
-                <button class="btn" style="background: #e74c3c;" onclick="runGetTest('/clickhouse/like', 'username', 'admin')">GET请求</button>
-                <button class="btn" style="background: #16a085;" onclick="runGetUrlEncodedTest('/clickhouse/like', 'username', 'admin')">GET URL编码</button>
-            </td>
-        </tr>
-        <tr>
-            <td>Order By</td>
-            <td><code>/clickhouse/orderby</code></td>
-            <td>col</td>
-            <td>
-                <button class="btn btn-run" onclick="runTest('/clickhouse/orderby', 'col', 'id', 'json')">JSON</button>
-                <button class="btn" onclick="runTest('/clickhouse/orderby', 'col', 'id', 'form')">表单</button>
-                <button class="btn btn-alt" onclick="runUrlEncodedTest('/clickhouse/orderby', 'col', 'id')">URL编码</button>
-                <button class="btn" style="background: #f39c12;" onclick="runNestedJsonStringTest('/clickhouse/orderby', 'col', 'id')">嵌套JSON字符串</button>
-                <button class="btn" style="background: #27ae60;" onclick="runNestedJsonObjectTest('/clickhouse/orderby', 'col', 'id')">嵌套JSON对象</button>
-                <button class="btn" style="background: #e74c3c;" onclick="runGetTest('/clickhouse/orderby', 'col', 'id')">GET请求</button>
-                <button class="btn" style="background: #16a085;" onclick="runGetUrlEncodedTest('/clickhouse/orderby', 'col', 'id')">GET URL编码</button>
-            </td>
-        </tr>
-    </table>
-
-    <!-- Oracle -->
-    <h3>Oracle</h3>
-    <table>
-        <tr><th>类型</th><th>接口</th><th>参数</th><th>操作</th></tr>
-        <tr>
-            <td>字符串</td>
-            <td><code>/oracle/char</code></td>
-            <td>id</td>
-            <td>
-                <button class="btn btn-run" onclick="runTest('/oracle/char', 'id', '1', 'json')">JSON</button>
-                <button class="btn" onclick="runTest('/oracle/char', 'id', '1', 'form')">表单</button>
-                <button class="btn btn-alt" onclick="runUrlEncodedTest('/oracle/char', 'id', '1')">URL编码</button>
-                <button class="btn" style="background: #f39c12;" onclick="runNestedJsonStringTest('/oracle/char', 'id', '1')">嵌套JSON字符串</button>
-                <button class="btn" style="background: #27ae60;" onclick="runNestedJsonObjectTest('/oracle/char', 'id', '1')">嵌套JSON对象</button>
-                <button class="btn" style="background: #e74c3c;" onclick="runGetTest('/oracle/char', 'id', '1')">GET请求</button>
-                <button class="btn" style="background: #16a085;" onclick="runGetUrlEncodedTest('/oracle/char', 'id', '1')">GET URL编码</button>
-            </td>
-        </tr>
-        <tr>
-            <td>整数</td>
-            <td><code>/oracle/int</code></td>
-            <td>id</td>
-            <td>
-                <button class="btn btn-run" onclick="runTest('/oracle/int', 'id', '1', 'json')">JSON</button>
-                <button class="btn" onclick="runTest('/oracle/int', 'id', '1', 'form')">表单</button>
-                <button class="btn btn-alt" onclick="runUrlEncodedTest('/oracle/int', 'id', '1')">URL编码</button>
-                <button class="btn" style="background: #f39c12;" onclick="runNestedJsonStringTest('/oracle/int', 'id', '1')">嵌套JSON字符串</button>
-                <button class="btn" style="background: #27ae60;" onclick="runNestedJsonObjectTest('/oracle/int', 'id', '1')">嵌套JSON对象</button>
-                <button class="btn" style="background: #e74c3c;" onclick="runGetTest('/oracle/int', 'id', '1')">GET请求</button>
-                <button class="btn" style="background: #16a085;" onclick="runGetUrlEncodedTest('/oracle/int', 'id', '1')">GET URL编码</button>
-            </td>
-        </tr>
-        <tr>
-            <td>Like</td>
-            <td><code>/oracle/like</code></td>
-            <td>username</td>
-            <td>
-                <button class="btn btn-run" onclick="runTest('/oracle/like', 'username', 'admin', 'json')">JSON</button>
-                <button class="btn" onclick="runTest('/oracle/like', 'username', 'admin', 'form')">表单</button>
-                <button class="btn btn-alt" onclick="runUrlEncodedTest('/oracle/like', 'username', 'admin')">URL编码</button>
-                <button class="btn" style="background: #f39c12;" onclick="runNestedJsonStringTest('/oracle/like', 'username', 'admin')">嵌套JSON字符串</button>
-                <button class="btn" style="background: #27ae60;" onclick="runNestedJsonObjectTest('/oracle/like', 'username', 'admin')">嵌套JSON对象</button>
-                <button class="btn" style="background: #e74c3c;" onclick="runGetTest('/oracle/like', 'username', 'admin')">GET请求</button>
-                <button class="btn" style="background: #16a085;" onclick="runGetUrlEncodedTest('/oracle/like', 'username', 'admin')">GET URL编码</button>
-            </td>
-        </tr>
-        <tr>
-            <td>Order By</td>
-            <td><code>/oracle/orderby</code></td>
-            <td>col</td>
-            <td>
-                <button class="btn btn-run" onclick="runTest('/oracle/orderby', 'col', 'id', 'json')">JSON</button>
-                <button class="btn" onclick="runTest('/oracle/orderby', 'col', 'id', 'form')">表单</button>
-                <button class="btn btn-alt" onclick="runUrlEncodedTest('/oracle/orderby', 'col', 'id')">URL编码</button>
-                <button class="btn" style="background: #f39c12;" onclick="runNestedJsonStringTest('/oracle/orderby', 'col', 'id')">嵌套JSON字符串</button>
-                <button class="btn" style="background: #27ae60;" onclick="runNestedJsonObjectTest('/oracle/orderby', 'col', 'id')">嵌套JSON对象</button>
-                <button class="btn" style="background: #e74c3c;" onclick="runGetTest('/oracle/orderby', 'col', 'id')">GET请求</button>
-                <button class="btn" style="background: #16a085;" onclick="runGetUrlEncodedTest('/oracle/orderby', 'col', 'id')">GET URL编码</button>
-            </td>
-        </tr>
-    </table>
-
-    <h2>🛠️ 自定义请求</h2>
+<!--ENDPOINT_TABLES-->    <h2>🛠️ 自定义请求</h2>
     <div class="card">
         <div class="tabs">
             <div class="tab active" onclick="openTab(event, 'tab-json')">JSON</div>
@@ -1205,7 +1344,12 @@ def index():
     </script>
 </body>
 </html>
-    """
+    """.replace('<!--ENDPOINT_TABLES-->', _endpoint_tables()).replace('<!--BACKEND_COUNT-->', str(len(backends.REGISTRY))).replace(
+        '<!--DASHBOARD_PANEL-->', _DASHBOARD_PANEL if live_dashboard is not None else '')
+
+@app.route('/')
+def index():
+    return _INDEX_HTML
 
 # --- Manual Init Route (Optional, kept for completeness) ---
 @app.route('/init')
@@ -1219,6 +1363,83 @@ def init():
         return f"Error initializing databases: {str(e)}", 500
 
 
+# --- Health check (不经过准入控制) ---
+@app.route('/health')
+def health():
+    return jsonify({"status": "ok"})
+
+
+# --- Admin: metrics ---
+@app.route('/admin/metrics')
+@admin_only
+def admin_metrics():
+    metrics = {"inflight": _inflight, "log": lablog.stats()}
+    metrics["backends"] = {name: b.stats() for name, b in backends.REGISTRY.items()}
+    if workers.ISOLATE_DRIVERS:
+        metrics["workers"] = {name: pool.stats() for name, pool in worker_pools.items()}
+    if ratelimit.RATE_LIMIT:
+        metrics["rate_limit"] = rate_limiter.stats()
+    if admission.ADMISSION_MAX_INFLIGHT > 0:
+        metrics["admission"] = admission_controller.stats()
+    if sandbox.SANDBOX_POOL_SIZE > 0:
+        metrics["sandbox"] = sandbox_pool.stats()
+    if journal.JOURNAL_DIR:
+        metrics["journal"] = {"written": request_journal.written, "dropped": request_journal.dropped}
+    if drift.DRIFT_WATCH:
+        metrics["drift_repairs"] = drift_watcher.repairs
+    if query_stats is not None:
+        metrics["query_stats"] = query_stats.stats()
+    if latency_scheduler is not None:
+        metrics["latency_classes"] = latency_scheduler.stats()
+    if query_coalescer is not None:
+        metrics["coalescing"] = query_coalescer.stats()
+    if concurrency_limiter is not None:
+        metrics["concurrency_limits"] = concurrency_limiter.stats()
+    if tracer is not None:
+        metrics["tracing"] = tracer.stats()
+    if live_dashboard is not None:
+        metrics["dashboard"] = live_dashboard.stats()
+    return jsonify(metrics)
+
+
+# --- Admin: saved profiles ---
+@app.route('/admin/profiles')
+@admin_only
+def admin_profiles():
+    return jsonify(profiler.list_profiles())
+
+@app.route('/admin/profiles/<name>')
+@admin_only
+def admin_profile_file(name):
+    return send_from_directory(profiler.PROFILE_DIR, name, mimetype='text/plain')
+
+
+# --- Admin: memory accounting ---
+@app.route('/admin/memory')
+@admin_only
+def admin_memory():
+    if not memtrack.MEMTRACK:
+        return jsonify({"error": "内存统计未开启，请设置 MEMTRACK=1"}), 404
+    limit = request.args.get('limit', 20, type=int)
+    compare = request.args.get('compare') == '1'
+    return jsonify({
+        "routes": memtrack.route_stats(),
+        "allocations": memtrack.top_sites(limit, compare),
+        "ceiling_bytes": memtrack.MEMTRACK_CEILING,
+    })
+
+
+# --- Admin: query fingerprints ---
+@app.route('/admin/queries')
+@admin_only
+def admin_queries():
+    if query_stats is None:
+        return jsonify({"error": "查询指纹统计未开启，请设置 QUERY_STATS=1"}), 404
+    limit = request.args.get('limit', 20, type=int)
+    sort = request.args.get('sort', 'total')
+    return jsonify(query_stats.top(limit, sort))
+
+
 if __name__ == '__main__':
     # The initialization happens above, outside the if __name__ block
     app.run(host='0.0.0.0', port=8888, debug=True) # Debug mode is okay for lab env
\ No newline at end of file
@@ -0,0 +1,138 @@
+"""
+后端注册表
+每个后端在这里声明：路由前缀、显示名、SQL 方言、连接函数、取结果方式、连接池大小、查询超时和支持的注入形状。
+app.py 启动时按这张表生成 /<后端>/<形状> 接口，模板、连接池和取结果函数都在启动时确定，请求路径上不再按名字分发。
+
+连接池大小和超时可以按后端用环境变量调整，例如 MYSQL_POOL_SIZE=16、CLICKHOUSE_TIMEOUT_MS=5000；
+未设置超时的后端使用全局的 QUERY_TIMEOUT_MS。
+"""
+
+import collections
+import os
+
+import db
+import memtrack
+import tracing
+
+# 注入形状：显示名、参数名、首页示例值、查询模板。{table} 在启动时换成后端的表名，{参数名} 在请求时填入用户输入
+Shape = collections.namedtuple('Shape', 'name label param example template')
+
+SHAPES = {
+    'char': Shape('char', '字符串', 'id', '1', "SELECT * FROM {table} WHERE id = '{id}'"),
+    'int': Shape('int', '整数', 'id', '1', "SELECT * FROM {table} WHERE id = {id}"),
+    'like': Shape('like', 'Like', 'username', 'admin', "SELECT * FROM {table} WHERE username LIKE '%{username}%'"),
+    'orderby': Shape('orderby', 'Order By', 'col', 'id', "SELECT * FROM {table} ORDER BY {col}"),
+}
+
+
+def _fetch_cursor(conn, query, span=tracing.NOOP):
+    cursor = conn.cursor()
+    try:
+        with span.child('db.execute'):
+            cursor.execute(query)
+        with span.child('db.fetch') as fetch_span:
+            if memtrack.checking():
+                rows = _fetch_checked(cursor)
+            else:
+                rows = cursor.fetchall()
+            fetch_span.set('db.rows', len(rows))
+        return rows
+    finally:
+        try:
+            cursor.close()
+        except Exception:
+            pass
+
+
+def _fetch_checked(cursor):
+    # MEMTRACK_CEILING_MB 开启时分批取回，超过上限尽早中止
+    rows = []
+    while True:
+        batch = cursor.fetchmany(memtrack.MEMTRACK_FETCH_ROWS)
+        if not batch:
+            return rows
+        rows.extend(batch)
+        memtrack.check()
+
+
+def _fetch_client(conn, query, span=tracing.NOOP):
+    # clickhouse_driver 风格的客户端，execute 直接返回结果行
+    with span.child('db.execute') as execute_span:
+        rows = conn.execute(query)
+        execute_span.set('db.rows', len(rows))
+    return rows
+
+
+FETCH_STRATEGIES = {
+    'cursor': _fetch_cursor,
+    'client': _fetch_client,
+}
+
+
+class Backend:
+    def __init__(self, name, label, dialect, open_func, fetch='cursor', table='users',
+                 pool_size=0, timeout_ms=None, shapes=tuple(SHAPES), reset=None):
+        self.name = name
+        self.label = label
+        self.dialect = dialect
+        self.table = table
+        self.pool_size = int(os.environ.get(f'{name.upper()}_POOL_SIZE', pool_size))
+        timeout_ms = os.environ.get(f'{name.upper()}_TIMEOUT_MS', timeout_ms)
+        self.timeout_ms = db.QUERY_TIMEOUT_MS if timeout_ms is None else int(timeout_ms)
+        self.fetch = FETCH_STRATEGIES[fetch]
+        self.shapes = [SHAPES[shape] for shape in shapes]
+        opener = lambda: open_func(timeout_ms=self.timeout_ms)
+        if self.pool_size > 0:
+            self.pool = db.ConnectionPool(name, opener, self.pool_size,
+                                          reset and (lambda conn: reset(conn, self.timeout_ms)))
+            self.connect = self.pool.get
+        else:
+            self.pool = None
+            self.connect = opener
+
+    def template(self, shape):
+        return shape.template.replace('{table}', self.table)
+
+    def stats(self):
+        stats = {'dialect': self.dialect, 'pool_size': self.pool_size, 'timeout_ms': self.timeout_ms}
+        if self.pool is not None:
+            stats['pool'] = self.pool.stats()
+        return stats
+
+
+# 归还连接前的重置。回滚只丢弃事务，堆叠注入（1; SET statement_timeout=0; COMMIT）留下的会话设置、
+# 用户变量等要靠重置会话清掉；抛出异常时连接池直接关闭连接，不再复用。
+
+def _reset_mysql(conn, timeout_ms):
+    conn.rollback()
+    reset_session = getattr(conn, 'reset_session', None)
+    if reset_session is None:
+        # mysqlclient / PyMySQL 没有 COM_RESET_CONNECTION，无法证明会话干净
+        raise RuntimeError("驱动不支持重置会话")
+    reset_session()
+    # 重置后会话变量回到全局默认值，重新设置查询超时
+    db.set_mysql_timeout(conn, timeout_ms)
+
+
+def _reset_postgres(conn, timeout_ms):
+    conn.rollback()
+    # DISCARD ALL 不能在事务里执行；RESET ALL 让 statement_timeout、search_path 回到建连时 options 给的值
+    conn.autocommit = True
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DISCARD ALL")
+        cursor.close()
+    finally:
+        conn.autocommit = False
+
+
+# 顺序即首页上的展示顺序
+REGISTRY = collections.OrderedDict((b.name, b) for b in [
+    Backend('mysql', 'MySQL', 'mysql', db.get_mysql_connection, pool_size=8, reset=_reset_mysql),
+    Backend('postgres', 'PostgreSQL', 'postgres', db.get_postgres_connection, pool_size=8, reset=_reset_postgres),
+    Backend('clickhouse', 'ClickHouse', 'clickhouse', db.get_clickhouse_connection, fetch='client',
+            table='sqli_lab.users', pool_size=4),
+    # 进程内数据库，连接已经按线程复用
+    Backend('sqlite', 'SQLite', 'sqlite', db.get_sqlite_connection),
+    Backend('oracle', 'Oracle', 'oracle', db.get_oracle_connection),
+])
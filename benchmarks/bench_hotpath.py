@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+请求热路径微基准
+覆盖每个请求都会走到的部分：get_input() 的各种输入方式、execute_query() 的格式化/分发/错误路径、
+取连接，以及不同大小和类型结果集的 JSON 序列化。全部在 Flask 测试环境中运行，数据库使用假驱动。
+
+用法:
+    python benchmarks/bench_hotpath.py            # 运行并和 baseline.json 对比
+    python benchmarks/bench_hotpath.py --save     # 运行并把结果保存为新的基线
+    python benchmarks/bench_hotpath.py -k input   # 只运行名字包含 input 的基准
+"""
+
+import argparse
+import datetime
+import decimal
+import io
+import json
+import os
+import sys
+import time
+import urllib.parse
+
+# 必须在导入 app 之前设置：使用假驱动，日志不输出到终端
+os.environ.setdefault('FAKE_DB', '1')
+os.environ.setdefault('LOG_FILE', os.devnull)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.test import EnvironBuilder  # noqa: E402
+
+import app as lab  # noqa: E402
+import backends  # noqa: E402
+import db  # noqa: E402
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+flask_app = lab.app
+
+
+# --- 测试替身 ---
+
+class _StubCursor:
+    def __init__(self, rows, error):
+        self._rows = rows
+        self._error = error
+
+    def execute(self, query):
+        if self._error:
+            raise RuntimeError(self._error)
+
+    def fetchall(self):
+        return self._rows
+
+    def close(self):
+        pass
+
+
+class _StubConnection:
+    """不做任何 I/O 的连接，只用来测 execute_query 自身的开销。"""
+
+    def __init__(self, rows, error=None):
+        self._rows = rows
+        self._error = error
+
+    def cursor(self):
+        return _StubCursor(self._rows, self._error)
+
+    def execute(self, query):
+        if self._error:
+            raise RuntimeError(self._error)
+        return self._rows
+
+    def close(self):
+        pass
+
+
+ROWS_SMALL = [(1, 'admin', 'admin123'), (2, 'user1', 'pass1')]
+
+
+def _rows(n, kind):
+    if kind == 'int':
+        return [(i, i * 2, i * 3) for i in range(n)]
+    if kind == 'str':
+        return [(i, f'user{i}', 'x' * 32) for i in range(n)]
+    now = datetime.datetime(2024, 1, 1)
+    return [(i, decimal.Decimal('1.25') * i, now) for i in range(n)]
+
+
+# --- 基准定义：名字 -> 返回单次调用函数的工厂 ---
+
+def _environ(method='GET', query_string=None, data=None, json_body=None, content_type=None):
+    builder = EnvironBuilder(path='/mysql/char', method=method, query_string=query_string,
+                             data=data, json=json_body, content_type=content_type)
+    environ = builder.get_environ()
+    body = environ['wsgi.input'].read()
+    return environ, body
+
+
+def bench_input(method='GET', call=True, **kwargs):
+    """call=False 时只压入/弹出请求上下文，作为其它 input.* 基准的参照。"""
+    environ, body = _environ(method, **kwargs)
+
+    def run():
+        env = dict(environ)
+        env['wsgi.input'] = io.BytesIO(body)
+        with flask_app.request_context(env):
+            if call:
+                lab.get_input('id')
+    return run
+
+
+def bench_execute(conn, template="SELECT * FROM users WHERE id = '{id}'", fetch='cursor'):
+    backend = backends.Backend('bench', 'Bench', 'mysql', lambda timeout_ms: conn, fetch=fetch)
+
+    def run():
+        with flask_app.test_request_context('/mysql/char'):
+            lab.execute_query(backend, template, {'id': "1' OR '1'='1"})
+    return run
+
+
+def bench_jsonify(rows):
+    def run():
+        with flask_app.app_context():
+            lab.jsonify({"query": "SELECT * FROM users", "result": rows}).get_data()
+    return run
+
+
+def bench_route(url):
+    client = flask_app.test_client()
+
+    def run():
+        client.get(url)
+    return run
+
+
+BENCHMARKS = {
+    'context.request_push_pop': lambda: bench_input('GET', call=False, query_string={'id': '1'}),
+    'input.get': lambda: bench_input('GET', query_string={'id': '1'}),
+    'input.get_urlencoded_json': lambda: bench_input('GET', query_string={'data': json.dumps({'id': '1'})}),
+    'input.form': lambda: bench_input('POST', data={'id': '1'}),
+    'input.json': lambda: bench_input('POST', json_body={'id': '1'}),
+    'input.nested_object': lambda: bench_input('POST', json_body={'data': {'id': '1'}}),
+    'input.nested_string': lambda: bench_input('POST', json_body={'data': json.dumps({'id': '1'})}),
+    'input.form_urlencoded_json': lambda: bench_input('POST', data=urllib.parse.urlencode({'data': json.dumps({'id': '1'})}),
+                                                      content_type='application/x-www-form-urlencoded'),
+    'input.missing': lambda: bench_input('POST', json_body={'nothing': '1'}),
+    'execute.cursor_ok': lambda: bench_execute(_StubConnection(ROWS_SMALL)),
+    'execute.clickhouse_ok': lambda: bench_execute(_StubConnection(ROWS_SMALL), fetch='client'),
+    'execute.query_error': lambda: bench_execute(_StubConnection(ROWS_SMALL, error='syntax error')),
+    'execute.no_connection': lambda: bench_execute(None),
+    'checkout.fake_mysql': lambda: (lambda: db.get_mysql_connection().close()),
+    'checkout.fake_mysql_pooled': lambda: (lambda: backends.REGISTRY['mysql'].connect().close()),
+    'checkout.sqlite_thread_local': lambda: (lambda: db.get_sqlite_connection().close()),
+    'json.rows10_int': lambda: bench_jsonify(_rows(10, 'int')),
+    'json.rows1000_int': lambda: bench_jsonify(_rows(1000, 'int')),
+    'json.rows1000_str': lambda: bench_jsonify(_rows(1000, 'str')),
+    'json.rows1000_mixed': lambda: bench_jsonify(_rows(1000, 'mixed')),
+    'json.rows10000_str': lambda: bench_jsonify(_rows(10000, 'str')),
+    'route.sqlite_int': lambda: bench_route('/sqlite/int?id=1'),
+    'route.fake_mysql_char': lambda: bench_route('/mysql/char?id=1'),
+}
+
+
+def measure(func, min_time=0.2, repeat=5):
+    """返回每次调用的最短平均耗时（纳秒）。先校准循环次数，再取多轮中的最小值。"""
+    func()
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / repeat or loops >= 1 << 20:
+            break
+        loops *= 2
+    best = elapsed
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        best = min(best, time.perf_counter() - start)
+    return best / loops * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description="请求热路径微基准")
+    parser.add_argument('-k', dest='filter', default='', help="只运行名字包含该字符串的基准")
+    parser.add_argument('--save', action='store_true', help="把本次结果写入基线文件")
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--threshold', type=float, default=15.0, help="比基线慢多少百分比算回归")
+    parser.add_argument('--min-time', type=float, default=0.2, help="每个基准的最短运行时间（秒）")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = {}
+    regressions = []
+    print(f"{'benchmark':<32}{'ns/op':>14}{'baseline':>14}{'delta':>10}")
+    for name, factory in BENCHMARKS.items():
+        if args.filter not in name:
+            continue
+        ns = measure(factory(), args.min_time)
+        results[name] = ns
+        base = baseline.get(name)
+        if base:
+            delta = (ns - base) / base * 100
+            flag = '  REGRESSION' if delta > args.threshold else ''
+            if flag:
+                regressions.append(name)
+            print(f"{name:<32}{ns:>14.0f}{base:>14.0f}{delta:>+9.1f}%{flag}")
+        else:
+            print(f"{name:<32}{ns:>14.0f}{'-':>14}{'-':>10}")
+
+    if args.save:
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"基线已保存到 {args.baseline}")
+    if regressions:
+        print(f"{len(regressions)} 个基准比基线慢 {args.threshold}% 以上: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
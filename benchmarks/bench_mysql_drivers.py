@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+MySQL 驱动实现基准
+对 db.MYSQL_DRIVERS 中每个已安装的实现，分别测量：
+    - 建立连接的耗时；
+    - 小查询（实验接口的 SELECT * FROM users WHERE id = 1）在已有连接上的往返延迟；
+    - 大结果集（递归 CTE 生成 --rows 行）的取回和解码吞吐。
+需要可连接的 MySQL（MYSQL_HOST / MYSQL_USER / MYSQL_PASSWORD，和应用相同），不能使用 FAKE_DB。
+
+用法:
+    python benchmarks/bench_mysql_drivers.py
+    python benchmarks/bench_mysql_drivers.py --rows 500000 --drivers connector,pymysql
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+
+SMALL_QUERY = "SELECT * FROM users WHERE id = 1"
+LARGE_QUERY = ("WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < {rows}) "
+               "SELECT n, CONCAT('user', n), REPEAT('x', 32), n * 1.5 FROM seq")
+
+
+def measure(func, min_time=0.5):
+    """返回每次调用的平均毫秒数。"""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / loops * 1000
+        loops *= 2
+
+
+def query(conn, sql):
+    cursor = conn.cursor()
+    cursor.execute(sql)
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+
+def bench_driver(open_connection, rows):
+    def connect():
+        open_connection(db.SHARED_DATABASE).close()
+    connect_ms = measure(connect)
+
+    conn = open_connection(db.SHARED_DATABASE)
+    try:
+        small_ms = measure(lambda: query(conn, SMALL_QUERY))
+        query(conn, f"SET SESSION cte_max_recursion_depth = {rows + 1}")
+        large = LARGE_QUERY.format(rows=rows)
+        assert len(query(conn, large)) == rows
+        start = time.perf_counter()
+        query(conn, large)
+        large_s = time.perf_counter() - start
+    finally:
+        conn.close()
+    return connect_ms, small_ms, rows / large_s
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200000, help='大结果集的行数')
+    parser.add_argument('--drivers', default=','.join(db.MYSQL_DRIVERS), help='逗号分隔的驱动名')
+    args = parser.parse_args()
+    if db.FAKE_DB:
+        print("FAKE_DB=1 时所有驱动都是同一个假驱动，结果没有意义")
+        return 1
+
+    print(f"{'driver':<16}{'connect ms':>12}{'small query ms':>16}{'large rows/s':>14}")
+    for name in args.drivers.split(','):
+        try:
+            open_connection = db.load_mysql_driver(name)
+        except (ImportError, KeyError) as e:
+            print(f"{name:<16}  跳过: {e!r}")
+            continue
+        try:
+            connect_ms, small_ms, rows_per_s = bench_driver(open_connection, args.rows)
+        except Exception as e:
+            print(f"{name:<16}  失败: {e}")
+            continue
+        print(f"{name:<16}{connect_ms:>12.2f}{small_ms:>16.3f}{rows_per_s:>14,.0f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+数据库传输方式基准
+对每个后端分别经 TCP 和 Unix 套接字执行实验接口的小查询（SELECT * FROM users WHERE id = 1），测量：
+    - 单连接上的查询延迟（p50 / p99）；
+    - --threads 个线程各用一个连接持续查询 --seconds 秒的吞吐。
+ClickHouse 服务端没有 Unix 套接字，只测 TCP 作为参照。
+需要和应用部署在同一台机器上的数据库（见 db.mysql_socket() / db.postgres_socket_dir()），不能使用 FAKE_DB。
+
+用法:
+    python benchmarks/bench_transport.py
+    python benchmarks/bench_transport.py --threads 8 --seconds 5
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+
+SMALL_QUERY = "SELECT * FROM users WHERE id = 1"
+
+
+def _cursor_query(conn):
+    cursor = conn.cursor()
+    cursor.execute(SMALL_QUERY)
+    cursor.fetchall()
+    cursor.close()
+
+
+def transports():
+    """[(后端, 传输方式, 打开连接的函数, 执行一次小查询的函数)]，找不到套接字的组合不列出。"""
+    open_mysql = db.load_mysql_driver(db.MYSQL_DRIVER)
+    cases = [('mysql', 'tcp', lambda: open_mysql(db.SHARED_DATABASE), _cursor_query)]
+    socket_path = db.mysql_socket()
+    if socket_path:
+        cases.append(('mysql', 'unix', lambda: open_mysql(db.SHARED_DATABASE, unix_socket=socket_path), _cursor_query))
+
+    if db.psycopg2 is not None:
+        config = dict(db.DB_CONFIG['postgres'], dbname=db.SHARED_DATABASE, port=db.POSTGRES_PORT)
+        cases.append(('postgres', 'tcp', lambda: db.psycopg2.connect(**config), _cursor_query))
+        socket_dir = db.postgres_socket_dir()
+        if socket_dir:
+            cases.append(('postgres', 'unix', lambda: db.psycopg2.connect(**dict(config, host=socket_dir)), _cursor_query))
+
+    if db.ClickHouseClient is not None:
+        cases.append(('clickhouse', 'tcp', lambda: db.ClickHouseClient(**db.DB_CONFIG['clickhouse']),
+                      lambda client: client.execute(f"SELECT * FROM {db.SHARED_DATABASE}.users WHERE id = 1")))
+    return cases
+
+
+def _close(conn):
+    # clickhouse_driver.Client 用 disconnect()
+    (getattr(conn, 'close', None) or conn.disconnect)()
+
+
+def latency(open_connection, run, samples):
+    conn = open_connection()
+    try:
+        run(conn)
+        times = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            run(conn)
+            times.append((time.perf_counter() - start) * 1000)
+    finally:
+        _close(conn)
+    times.sort()
+    return times[len(times) // 2], times[min(len(times) - 1, int(len(times) * 0.99))]
+
+
+def throughput(open_connection, run, threads, seconds):
+    counts = [0] * threads
+    deadline = time.monotonic() + seconds
+    errors = []
+
+    def loop(i):
+        try:
+            conn = open_connection()
+            try:
+                while time.monotonic() < deadline:
+                    run(conn)
+                    counts[i] += 1
+            finally:
+                _close(conn)
+        except Exception as e:
+            errors.append(e)
+
+    workers = [threading.Thread(target=loop, args=(i,)) for i in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    if errors:
+        raise errors[0]
+    return sum(counts) / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--samples', type=int, default=2000, help='延迟测量的查询次数')
+    parser.add_argument('--threads', type=int, default=4, help='吞吐测量的并发连接数')
+    parser.add_argument('--seconds', type=float, default=3.0, help='吞吐测量的持续时间')
+    args = parser.parse_args()
+    if db.FAKE_DB:
+        print("FAKE_DB=1 时没有真实的网络传输，结果没有意义")
+        return 1
+
+    print(f"{'backend':<12}{'transport':<11}{'p50 ms':>9}{'p99 ms':>9}{'queries/s':>12}")
+    for backend, transport, open_connection, run in transports():
+        try:
+            p50, p99 = latency(open_connection, run, args.samples)
+            qps = throughput(open_connection, run, args.threads, args.seconds)
+        except Exception as e:
+            print(f"{backend:<12}{transport:<11}  失败: {e}")
+            continue
+        print(f"{backend:<12}{transport:<11}{p50:>9.3f}{p99:>9.3f}{qps:>12,.0f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
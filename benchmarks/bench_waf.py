@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+WAF 匹配基准
+对比"逐条正则依次匹配"和 waf.RuleSet（Aho-Corasick 关键字 + 合并正则）在不同规则数量、不同载荷长度下的耗时。
+规则数量增加时，前者线性变慢，后者基本不变。
+
+用法:
+    python benchmarks/bench_waf.py
+"""
+
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import waf  # noqa: E402
+
+SQL_WORDS = ['select', 'union', 'sleep(', 'benchmark(', 'information_schema', 'concat(', 'load_file(',
+             'outfile', 'extractvalue(', 'updatexml(', 'pg_sleep(', 'waitfor delay', 'xp_cmdshell', 'char(']
+
+
+def make_keywords(n, rng):
+    words = list(SQL_WORDS)
+    while len(words) < n:
+        words.append(''.join(rng.choice('abcdefghijklmnopqrstuvwxyz_(') for _ in range(rng.randint(5, 12))))
+    return words[:n]
+
+
+def make_payload(length, rng):
+    # 不命中任何规则的载荷：最坏情况，要扫描完整个输入
+    alphabet = "0123456789 '=-,"
+    return ''.join(rng.choice(alphabet) for _ in range(length))
+
+
+def sequential(keywords):
+    compiled = [re.compile(re.escape(k), re.I) for k in keywords]
+
+    def run(value):
+        for pattern in compiled:
+            if pattern.search(value):
+                return pattern.pattern
+        return None
+    return run
+
+
+def automaton(keywords):
+    rules = waf.RuleSet({'block': keywords})
+
+    def run(value):
+        try:
+            rules.apply('id', value)
+        except waf.Blocked as e:
+            return e.rule
+        return None
+    return run
+
+
+def measure(func, value, min_time=0.1):
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func(value)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / loops * 1e6
+        loops *= 2
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'rules':>6}{'payload':>9}{'sequential us':>16}{'automaton us':>15}{'speedup':>10}")
+    for n_rules in (10, 100, 1000):
+        keywords = make_keywords(n_rules, rng)
+        seq, ac = sequential(keywords), automaton(keywords)
+        for length in (32, 1024, 16384):
+            payload = make_payload(length, rng)
+            assert seq(payload) is None and ac(payload) is None
+            t_seq = measure(seq, payload)
+            t_ac = measure(ac, payload)
+            print(f"{n_rules:>6}{length:>9}{t_seq:>16.1f}{t_ac:>15.1f}{t_seq / t_ac:>9.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
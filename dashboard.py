@@ -0,0 +1,187 @@
+"""
+首页实时面板
+DASHBOARD=1 时，每个数据库接口请求结束后把耗时和状态码记进按秒分桶的环形窗口（每个路由 DASHBOARD_WINDOW 个桶，
+每个桶一个 LogHistogram），不保存单个请求。后台聚合线程每秒合并一次窗口，算出每个路由的吞吐、p50/p95/p99、
+错误率，加上后端健康状态，编码成一帧 SSE 数据。
+
+/dashboard/stream 的所有观看者共享同一帧：每个连接只是等待下一帧的通知并写出已经编码好的字节，
+观看者再多也只有一次聚合。观看者超过 DASHBOARD_MAX_VIEWERS 时新连接返回 503。
+后端健康由单独的探测线程每 DASHBOARD_PROBE_MS 毫秒执行一次 SELECT 1 得到，数据库卡住不会拖慢推送。
+"""
+
+import json
+import os
+import threading
+import time
+
+from stats import LogHistogram
+
+DASHBOARD = os.environ.get('DASHBOARD', '0') == '1'
+DASHBOARD_WINDOW = int(os.environ.get('DASHBOARD_WINDOW', '10'))
+DASHBOARD_MAX_VIEWERS = int(os.environ.get('DASHBOARD_MAX_VIEWERS', '50'))
+DASHBOARD_PROBE_MS = int(os.environ.get('DASHBOARD_PROBE_MS', '5000'))
+# 没有新帧时也定期发一行注释，防止代理断开空闲连接
+_KEEPALIVE = 15
+
+_PROBES = {'oracle': 'SELECT 1 FROM DUAL'}
+
+
+class _Bucket:
+    __slots__ = ('second', 'count', 'errors', 'latency')
+
+    def __init__(self, second):
+        self.second = second
+        self.count = 0
+        self.errors = 0
+        self.latency = LogHistogram()
+
+
+class _RouteWindow:
+    def __init__(self, size):
+        self.buckets = [_Bucket(-1) for _ in range(size)]
+
+    def record(self, second, ms, error):
+        bucket = self.buckets[second % len(self.buckets)]
+        if bucket.second != second:
+            bucket.__init__(second)
+        bucket.count += 1
+        bucket.errors += error
+        bucket.latency.add(ms)
+
+    def merge(self, first, last, into):
+        """把 [first, last] 秒内的桶合并进 into（[请求数, 错误数, LogHistogram]）。"""
+        for bucket in self.buckets:
+            if first <= bucket.second <= last:
+                into[0] += bucket.count
+                into[1] += bucket.errors
+                into[2].merge(bucket.latency)
+
+
+def _summary(count, errors, latency, seconds):
+    return {
+        'rps': round(count / seconds, 2),
+        'count': count,
+        'error_rate': round(errors / count, 4) if count else 0.0,
+        'p50_ms': round(latency.percentile(50), 2),
+        'p95_ms': round(latency.percentile(95), 2),
+        'p99_ms': round(latency.percentile(99), 2),
+    }
+
+
+class Dashboard:
+    def __init__(self, registry, window=DASHBOARD_WINDOW, max_viewers=DASHBOARD_MAX_VIEWERS, probe_ms=DASHBOARD_PROBE_MS):
+        self.registry = registry
+        self.window = window
+        self.max_viewers = max_viewers
+        self.probe_interval = probe_ms / 1000
+        self._lock = threading.Lock()
+        self._routes = {}
+        self._health = {}
+        self._frame_ready = threading.Condition()
+        self._frame = None
+        self._seq = 0
+        self.viewers = 0
+
+    # --- 请求线程 ---
+
+    def record(self, route, ms, status):
+        second = int(time.monotonic())
+        with self._lock:
+            window = self._routes.get(route)
+            if window is None:
+                window = self._routes[route] = _RouteWindow(self.window + 1)
+            window.record(second, ms, status >= 500)
+
+    # --- 后台线程 ---
+
+    def _probe(self):
+        while True:
+            for name, backend in self.registry.items():
+                start = time.perf_counter()
+                try:
+                    conn = backend.connect()
+                    if conn is None:
+                        raise RuntimeError("无法连接")
+                    try:
+                        backend.fetch(conn, _PROBES.get(backend.dialect, 'SELECT 1'))
+                    finally:
+                        if hasattr(conn, 'close'):
+                            conn.close()
+                    health = {'status': 'up', 'probe_ms': round((time.perf_counter() - start) * 1000, 2)}
+                except Exception as e:
+                    health = {'status': 'down', 'error': str(e)[:200]}
+                health['checked_at'] = time.time()
+                self._health[name] = health
+            time.sleep(self.probe_interval)
+
+    def _build_frame(self):
+        # 当前这一秒还没结束，只统计之前的完整 window 秒
+        last = int(time.monotonic()) - 1
+        first = last - self.window + 1
+        routes = {}
+        total = [0, 0, LogHistogram()]
+        with self._lock:
+            windows = list(self._routes.items())
+            for route, window in windows:
+                merged = [0, 0, LogHistogram()]
+                window.merge(first, last, merged)
+                if merged[0]:
+                    routes[route] = merged
+                    total[0] += merged[0]
+                    total[1] += merged[1]
+                    total[2].merge(merged[2])
+        frame = {
+            'ts': time.time(),
+            'window_s': self.window,
+            'total': _summary(*total, self.window),
+            'routes': {route: _summary(*merged, self.window) for route, merged in sorted(routes.items())},
+            'backends': dict(self._health),
+            'viewers': self.viewers,
+        }
+        return f"data: {json.dumps(frame, ensure_ascii=False)}\n\n".encode('utf-8')
+
+    def _aggregate(self):
+        while True:
+            time.sleep(1 - time.time() % 1)
+            try:
+                frame = self._build_frame()
+            except Exception as e:
+                print(f"面板聚合失败: {e}")
+                continue
+            with self._frame_ready:
+                self._frame = frame
+                self._seq += 1
+                self._frame_ready.notify_all()
+
+    def start(self):
+        threading.Thread(target=self._probe, name='dashboard-probe', daemon=True).start()
+        threading.Thread(target=self._aggregate, name='dashboard-aggregator', daemon=True).start()
+        return self
+
+    # --- SSE 连接 ---
+
+    def subscribe(self):
+        """返回这个观看者的帧生成器；观看者已满时返回 None。连接结束时调用方必须调用 unsubscribe()。"""
+        with self._frame_ready:
+            if self.viewers >= self.max_viewers:
+                return None
+            self.viewers += 1
+        return self._stream()
+
+    def unsubscribe(self):
+        with self._frame_ready:
+            self.viewers -= 1
+
+    def _stream(self):
+        seq = 0
+        while True:
+            with self._frame_ready:
+                self._frame_ready.wait_for(lambda: self._seq != seq, _KEEPALIVE)
+                if self._seq == seq:
+                    frame = b': keepalive\n\n'
+                else:
+                    seq, frame = self._seq, self._frame
+            yield frame
+
+    def stats(self):
+        return {'viewers': self.viewers, 'routes': len(self._routes), 'frames': self._seq}
@@ -1,74 +1,465 @@
+import collections
 import os
+import re
+import sqlite3
+import tempfile
+import threading
 import time
-import mysql.connector
+import lablog
 
-# 尝试导入其他数据库驱动，如果失败则设置为None
-try:
-    import psycopg2
-except ImportError:
-    psycopg2 = None
-    print("警告: PostgreSQL驱动未安装，PostgreSQL功能将不可用")
-
-try:
-    from clickhouse_driver import Client as ClickHouseClient
-except ImportError:
-    ClickHouseClient = None
-    print("警告: ClickHouse驱动未安装，ClickHouse功能将不可用")
+# FAKE_DB=1 时使用 fakedb.py 中的进程内假驱动，不需要任何数据库服务
+FAKE_DB = os.environ.get('FAKE_DB', '0') == '1'
 
-try:
-    import oracledb
-except ImportError:
+if FAKE_DB:
+    import fakedb
+    mysql_connector = fakedb.mysql_connector
+    psycopg2 = fakedb.psycopg2
+    ClickHouseClient = fakedb.Client
     oracledb = None
-    print("警告: Oracle驱动未安装，Oracle功能将不可用")
+    print("使用假数据库驱动 (FAKE_DB=1)")
+else:
+    import mysql.connector as mysql_connector
+
+    # 尝试导入其他数据库驱动，如果失败则设置为None
+    try:
+        import psycopg2
+    except ImportError:
+        psycopg2 = None
+        print("警告: PostgreSQL驱动未安装，PostgreSQL功能将不可用")
+
+    try:
+        from clickhouse_driver import Client as ClickHouseClient
+    except ImportError:
+        ClickHouseClient = None
+        print("警告: ClickHouse驱动未安装，ClickHouse功能将不可用")
+
+    try:
+        import oracledb
+    except ImportError:
+        oracledb = None
+        print("警告: Oracle驱动未安装，Oracle功能将不可用")
 
 # Environment variables - All point to localhost since all DBs will run in same container
 MYSQL_HOST = os.environ.get('MYSQL_HOST', 'localhost')
 POSTGRES_HOST = os.environ.get('POSTGRES_HOST', 'localhost')
 CLICKHOUSE_HOST = os.environ.get('CLICKHOUSE_HOST', 'localhost')
 ORACLE_HOST = os.environ.get('ORACLE_HOST', 'localhost')
+# 内嵌 SQLite：默认放在 /dev/shm（内存文件系统）上；设为 :memory: 则使用进程内共享内存库
+SQLITE_PATH = os.environ.get('SQLITE_PATH', os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'sqli_lab.db'))
+SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+# 单条查询的超时（毫秒），0 表示不限制。设置在连接上，因此对实验查询和 EXPLAIN 同样生效
+QUERY_TIMEOUT_MS = int(os.environ.get('QUERY_TIMEOUT_MS', '0'))
+
+# 各后端的连接参数
+DB_CONFIG = {
+    'mysql': {'host': MYSQL_HOST, 'user': os.environ.get('MYSQL_USER', 'root'), 'password': os.environ.get('MYSQL_PASSWORD', 'rootpassword')},
+    'postgres': {'host': POSTGRES_HOST, 'user': os.environ.get('POSTGRES_USER', 'root'), 'password': os.environ.get('POSTGRES_PASSWORD', 'rootpassword')},
+    'clickhouse': {'host': CLICKHOUSE_HOST},
+    'oracle': {'host': ORACLE_HOST},
+}
+
+# --- 沙箱路由 ---
+# 每个请求线程可以被路由到自己的沙箱：{后端名: 库/schema 名}。
+# 未设置的后端使用共享的 sqli_lab。
+SHARED_DATABASE = 'sqli_lab'
+_route = threading.local()
+
+def set_sandbox(targets):
+    """设置当前线程的沙箱路由，传 None 恢复为共享库。"""
+    _route.targets = targets
+
+def get_sandbox():
+    return getattr(_route, 'targets', None)
+
+def _target(backend):
+    targets = getattr(_route, 'targets', None)
+    if targets:
+        return targets.get(backend)
+    return None
+
+_SHARED_REF = re.compile(r'\b' + SHARED_DATABASE + r'\.')
+
+def clickhouse_sandbox_query(query, database):
+    """把查询里写死的 sqli_lab. 改写到沙箱库。"""
+    return _SHARED_REF.sub(database + '.', query)
+
+class _SandboxClickHouse:
+    """把查询里写死的 sqli_lab. 改写到沙箱库的 ClickHouse 客户端包装。"""
+    def __init__(self, client, database):
+        self._client = client
+        self._database = database
 
-def get_mysql_connection():
+    def execute(self, query, *args, **kwargs):
+        return self._client.execute(clickhouse_sandbox_query(query, self._database), *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+# --- MySQL 驱动实现 ---
+# MYSQL_DRIVER 选择 get_mysql_connection() 背后的驱动。它们都是 DB-API 连接，上层代码不用区分：
+#   connector       mysql-connector-python，用 C 扩展解析协议和解码行（默认）；C 扩展不可用时退回纯 Python 并打印警告
+#   connector-pure  mysql-connector-python 的纯 Python 实现
+#   mysqlclient     MySQLdb，基于 libmysqlclient 的 C 扩展
+#   pymysql         PyMySQL，纯 Python
+# 各实现的对比见 benchmarks/bench_mysql_drivers.py。
+MYSQL_DRIVER = os.environ.get('MYSQL_DRIVER', 'connector')
+
+def _connector_opener(use_pure):
+    if not use_pure and not getattr(mysql_connector, 'HAVE_CEXT', True):
+        print("警告: mysql-connector 的 C 扩展不可用，MySQL 使用纯 Python 协议实现")
+        use_pure = True
+    return lambda database, **kwargs: mysql_connector.connect(database=database, use_pure=use_pure, **DB_CONFIG['mysql'], **kwargs)
+
+def _mysqlclient_opener():
+    import MySQLdb
+    return lambda database, **kwargs: MySQLdb.connect(database=database, charset='utf8mb4', **DB_CONFIG['mysql'], **kwargs)
+
+def _pymysql_opener():
+    import pymysql
+    return lambda database, **kwargs: pymysql.connect(database=database, charset='utf8mb4', **DB_CONFIG['mysql'], **kwargs)
+
+MYSQL_DRIVERS = {
+    'connector': lambda: _connector_opener(use_pure=False),
+    'connector-pure': lambda: _connector_opener(use_pure=True),
+    'mysqlclient': _mysqlclient_opener,
+    'pymysql': _pymysql_opener,
+}
+
+def load_mysql_driver(name):
+    """返回 open(database, **额外连接参数) -> 连接。驱动未安装时抛出 ImportError，名字未知时抛出 KeyError。"""
+    opener = MYSQL_DRIVERS[name]
+    if FAKE_DB:
+        return lambda database, **kwargs: mysql_connector.connect(database=database, **DB_CONFIG['mysql'], **kwargs)
+    return opener()
+
+try:
+    _open_mysql = load_mysql_driver(MYSQL_DRIVER)
+except (ImportError, KeyError) as e:
+    print(f"警告: MySQL 驱动 {MYSQL_DRIVER} 不可用 ({e!r})，改用 mysql-connector")
+    _open_mysql = load_mysql_driver('connector')
+
+# --- Unix 套接字 ---
+# 数据库和应用在同一个容器里时，Unix 套接字比回环 TCP 少走一遍网络协议栈。
+# 主机是本机（localhost/127.0.0.1/::1）并且找到了套接字文件时自动使用，每次建连时检查，
+# 数据库晚于应用启动也没关系；套接字连接失败时退回 TCP。
+# MYSQL_SOCKET / POSTGRES_SOCKET_DIR 可以指定路径（指定后不要求主机是本机），设为空字符串则总是用 TCP。
+# ClickHouse 服务端不提供 Unix 套接字，始终使用 TCP。
+_LOCAL_HOSTS = {'localhost', '127.0.0.1', '::1'}
+MYSQL_SOCKET = os.environ.get('MYSQL_SOCKET', 'auto')
+POSTGRES_SOCKET_DIR = os.environ.get('POSTGRES_SOCKET_DIR', 'auto')
+POSTGRES_PORT = int(os.environ.get('POSTGRES_PORT', '5432'))
+_MYSQL_SOCKET_PATHS = ['/var/run/mysqld/mysqld.sock', '/run/mysqld/mysqld.sock', '/tmp/mysql.sock']
+_POSTGRES_SOCKET_DIRS = ['/var/run/postgresql', '/run/postgresql', '/tmp']
+
+def _find_socket(setting, host, candidates, filename=None):
+    if not setting:
+        return None
+    if setting == 'auto':
+        if host not in _LOCAL_HOSTS:
+            return None
+    else:
+        candidates = [setting]
+    for path in candidates:
+        if os.path.exists(os.path.join(path, filename) if filename else path):
+            return path
+    return None
+
+def mysql_socket():
+    """当前可用的 MySQL 套接字路径，没有则返回 None。"""
+    return _find_socket(MYSQL_SOCKET, MYSQL_HOST, _MYSQL_SOCKET_PATHS)
+
+def postgres_socket_dir():
+    """当前可用的 PostgreSQL 套接字目录（libpq 的 host 参数），没有则返回 None。"""
+    return _find_socket(POSTGRES_SOCKET_DIR, POSTGRES_HOST, _POSTGRES_SOCKET_DIRS, f'.s.PGSQL.{POSTGRES_PORT}')
+
+def _connect_via_socket(backend, path, open_func):
     try:
-        return mysql.connector.connect(
-            host=MYSQL_HOST,
-            user='root',
-            password='rootpassword',
-            database='sqli_lab'
-        )
+        return open_func()
     except Exception as e:
-        print(f"MySQL Connection Error: {e}")
+        lablog.log('db.socket', f"经 Unix 套接字 {path} 连接失败，改用 TCP: {e}", level='warning', backend=backend)
         return None
 
-def get_postgres_connection():
+def set_mysql_timeout(conn, timeout_ms):
+    if timeout_ms:
+        # 只对 SELECT 生效，实验接口都是 SELECT
+        cursor = conn.cursor()
+        cursor.execute(f"SET SESSION max_execution_time = {timeout_ms}")
+        cursor.close()
+
+def get_mysql_connection(database=None, timeout_ms=QUERY_TIMEOUT_MS):
+    database = database or _target('mysql') or SHARED_DATABASE
+    try:
+        conn = None
+        socket_path = mysql_socket()
+        if socket_path:
+            conn = _connect_via_socket('mysql', socket_path, lambda: _open_mysql(database, unix_socket=socket_path))
+        if conn is None:
+            conn = _open_mysql(database)
+        set_mysql_timeout(conn, timeout_ms)
+        return conn
+    except Exception as e:
+        lablog.log('db.connect', f"MySQL Connection Error: {e}", backend='mysql')
+        return None
+
+def get_postgres_connection(schema=None, timeout_ms=QUERY_TIMEOUT_MS):
     if psycopg2 is None:
-        print("PostgreSQL驱动未安装，无法连接")
+        lablog.log('db.driver_missing', "PostgreSQL驱动未安装，无法连接", backend='postgres')
         return None
+    schema = schema or _target('postgres')
     try:
+        options = []
+        if schema:
+            # 沙箱是 sqli_lab 库里的独立 schema
+            options.append(f'-c search_path={schema}')
+        if timeout_ms:
+            options.append(f'-c statement_timeout={timeout_ms}')
+        kwargs = {'options': ' '.join(options)} if options else {}
+        socket_dir = postgres_socket_dir()
+        if socket_dir:
+            conn = _connect_via_socket('postgres', socket_dir, lambda: psycopg2.connect(
+                dbname=SHARED_DATABASE, **dict(DB_CONFIG['postgres'], host=socket_dir), port=POSTGRES_PORT, **kwargs))
+            if conn is not None:
+                return conn
         return psycopg2.connect(
-            host=POSTGRES_HOST,
-            user='root',
-            password='rootpassword',
-            dbname='sqli_lab'
+            dbname=SHARED_DATABASE,
+            port=POSTGRES_PORT,
+            **DB_CONFIG['postgres'],
+            **kwargs
         )
     except Exception as e:
-        print(f"Postgres Connection Error: {e}")
+        lablog.log('db.connect', f"Postgres Connection Error: {e}", backend='postgres')
         return None
 
-def get_clickhouse_connection():
+def get_clickhouse_connection(database=None, timeout_ms=QUERY_TIMEOUT_MS):
     if ClickHouseClient is None:
-        print("ClickHouse驱动未安装，无法连接")
+        lablog.log('db.driver_missing', "ClickHouse驱动未安装，无法连接", backend='clickhouse')
         return None
+    database = database or _target('clickhouse')
     try:
-        return ClickHouseClient(host=CLICKHOUSE_HOST)
+        settings = {'max_execution_time': timeout_ms / 1000} if timeout_ms else {}
+        client = ClickHouseClient(settings=settings, **DB_CONFIG['clickhouse'])
+        if database and database != SHARED_DATABASE:
+            return _SandboxClickHouse(client, database)
+        return client
     except Exception as e:
-        print(f"ClickHouse Connection Error: {e}")
+        lablog.log('db.connect', f"ClickHouse Connection Error: {e}", backend='clickhouse')
         return None
 
-def get_oracle_connection():
+def get_oracle_connection(timeout_ms=QUERY_TIMEOUT_MS):
     # Oracle is not available in the single container setup due to licensing restrictions
-    print("Oracle is not available in this single-container setup due to licensing restrictions")
+    lablog.log('db.unavailable', "Oracle is not available in this single-container setup due to licensing restrictions", backend='oracle')
     return None
 
+class _ThreadSQLiteConnection:
+    """每个线程复用的 SQLite 连接，close() 不真正关闭。"""
+    def __init__(self, conn):
+        self._conn = conn
+
+    def close(self):
+        if self._conn.in_transaction:
+            self._conn.rollback()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+_sqlite_local = threading.local()
+# :memory: 模式下必须有一个连接一直存活，否则共享内存库会被释放
+_sqlite_keepalive = None
+
+def _open_sqlite():
+    global _sqlite_keepalive
+    if SQLITE_PATH == ':memory:':
+        conn = sqlite3.connect('file:sqli_lab?mode=memory&cache=shared', uri=True, isolation_level=None)
+        if _sqlite_keepalive is None:
+            _sqlite_keepalive = sqlite3.connect('file:sqli_lab?mode=memory&cache=shared', uri=True, check_same_thread=False)
+    else:
+        conn = sqlite3.connect(SQLITE_PATH, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    # 每执行约一万条虚拟机指令检查一次截止时间，返回非零值时 SQLite 中断查询
+    conn.set_progress_handler(_sqlite_timed_out, 10000)
+    return _ThreadSQLiteConnection(conn)
+
+def _sqlite_timed_out():
+    return time.monotonic() > _sqlite_local.deadline
+
+def get_sqlite_connection(timeout_ms=QUERY_TIMEOUT_MS):
+    conn = getattr(_sqlite_local, 'conn', None)
+    if conn is None:
+        try:
+            conn = _sqlite_local.conn = _open_sqlite()
+        except Exception as e:
+            lablog.log('db.connect', f"SQLite Connection Error: {e}", backend='sqlite')
+            return None
+    # 连接按线程复用，超时从每次取连接时开始计算
+    _sqlite_local.deadline = time.monotonic() + timeout_ms / 1000 if timeout_ms else float('inf')
+    return conn
+
+class _PooledConnection:
+    """从 ConnectionPool 借出的连接，close()/disconnect() 时归还到池中。"""
+    def __init__(self, pool, key, conn):
+        self._pool = pool
+        self._key = key
+        self._conn = conn
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool._put(self._key, conn)
+
+    disconnect = close
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+def _really_close(conn):
+    try:
+        if hasattr(conn, 'disconnect'):
+            conn.disconnect()
+        else:
+            conn.close()
+    except Exception:
+        pass
+
+# 所有 ConnectionPool，沙箱回收时按库名关闭它们的空闲连接
+_POOLS = []
+
+class ConnectionPool:
+    """
+    按沙箱路由分组的空闲连接池（后进先出，最近用过的连接最热）。
+    池里没有空闲连接时直接新建；归还时先调用 reset(conn)，失败则真正关闭。
+    size 是所有分组合计的空闲连接上限，满了以后关闭最久没用过的分组里最旧的连接，
+    沙箱再多，一个后端保持的空闲连接也不会超过 size 个。
+    """
+    def __init__(self, backend, open_func, size, reset=None):
+        self.backend = backend
+        self.open_func = open_func
+        self.size = size
+        self.reset = reset
+        self._lock = threading.Lock()
+        # 沙箱库名（共享库为 None）-> 空闲连接列表，按最近归还的顺序排列
+        self._idle = collections.OrderedDict()
+        self._count = 0
+        self.opened = 0
+        self.reused = 0
+        self.discarded = 0
+        self.evicted = 0
+        _POOLS.append(self)
+
+    def get(self):
+        key = _target(self.backend)
+        conn = None
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                conn = idle.pop()
+                self._count -= 1
+                self.reused += 1
+                if not idle:
+                    del self._idle[key]
+        if conn is None:
+            conn = self.open_func()
+            if conn is None:
+                return None
+            with self._lock:
+                self.opened += 1
+        return _PooledConnection(self, key, conn)
+
+    def _put(self, key, conn):
+        if self.reset is not None:
+            try:
+                self.reset(conn)
+            except Exception:
+                self.discarded += 1
+                _really_close(conn)
+                return
+        victim = None
+        with self._lock:
+            if self._count >= self.size:
+                oldest_key, oldest = next(iter(self._idle.items()))
+                victim = oldest.pop(0)
+                self._count -= 1
+                self.evicted += 1
+                if not oldest:
+                    del self._idle[oldest_key]
+            self._idle.setdefault(key, []).append(conn)
+            self._idle.move_to_end(key)
+            self._count += 1
+        if victim is not None:
+            _really_close(victim)
+
+    def close_idle(self, key):
+        """关闭某个沙箱的全部空闲连接。"""
+        with self._lock:
+            idle = self._idle.pop(key, [])
+            self._count -= len(idle)
+        for conn in idle:
+            _really_close(conn)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'idle': self._count,
+                'keys': len(self._idle),
+                'opened': self.opened,
+                'reused': self.reused,
+                'discarded': self.discarded,
+                'evicted': self.evicted,
+            }
+
+def close_idle(target):
+    """沙箱回收前调用：关闭所有连接池里连到这个沙箱的空闲连接。"""
+    for pool in _POOLS:
+        pool.close_idle(target)
+
+# 实验表的种子数据，初始化和漂移修复共用
+SEED_USERS = [(1, 'admin', 'admin123'), (2, 'user1', 'pass1')]
+
+def _seed_values():
+    return ", ".join(f"('{u}', '{p}')" for _, u, p in SEED_USERS)
+
+def seed_mysql(conn, rebuild=False):
+    """建立 MySQL 的 users 表并写入种子数据。rebuild=True 时先删表，用于修复被改过结构的表。"""
+    cursor = conn.cursor()
+    if rebuild:
+        cursor.execute("DROP TABLE IF EXISTS users")
+    cursor.execute("CREATE TABLE IF NOT EXISTS users (id INT AUTO_INCREMENT PRIMARY KEY, username VARCHAR(255), password VARCHAR(255))")
+    cursor.execute("TRUNCATE TABLE users")
+    cursor.execute(f"INSERT INTO users (username, password) VALUES {_seed_values()}")
+    conn.commit()
+    cursor.close()
+
+def seed_postgres(conn, rebuild=False):
+    """建立 PostgreSQL 的 users 表并写入种子数据。"""
+    conn.autocommit = True
+    cursor = conn.cursor()
+    if rebuild:
+        cursor.execute("DROP TABLE IF EXISTS users")
+    cursor.execute("CREATE TABLE IF NOT EXISTS users (id SERIAL PRIMARY KEY, username VARCHAR(255), password VARCHAR(255))")
+    cursor.execute("TRUNCATE TABLE users RESTART IDENTITY")
+    cursor.execute(f"INSERT INTO users (username, password) VALUES {_seed_values()}")
+    cursor.close()
+
+def seed_clickhouse(client, rebuild=False, database=SHARED_DATABASE):
+    """建立 ClickHouse 的 <database>.users 表并写入种子数据。"""
+    client.execute(f"CREATE DATABASE IF NOT EXISTS {database}")
+    if rebuild:
+        client.execute(f"DROP TABLE IF EXISTS {database}.users")
+    client.execute(f"CREATE TABLE IF NOT EXISTS {database}.users (id UInt32, username String, password String) ENGINE = MergeTree() ORDER BY id")
+    client.execute(f"TRUNCATE TABLE {database}.users")
+    rows = ", ".join(f"({i}, '{u}', '{p}')" for i, u, p in SEED_USERS)
+    client.execute(f"INSERT INTO {database}.users (id, username, password) VALUES {rows}")
+
+def seed_sqlite(conn, rebuild=False):
+    """建立 SQLite 的 users 表并写入种子数据。"""
+    if rebuild:
+        conn.execute("DROP TABLE IF EXISTS users")
+    conn.execute("CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY AUTOINCREMENT, username VARCHAR(255), password VARCHAR(255))")
+    conn.execute("DELETE FROM users")
+    conn.execute("DELETE FROM sqlite_sequence WHERE name = 'users'")
+    conn.execute(f"INSERT INTO users (username, password) VALUES {_seed_values()}")
+
 def init_databases():
     print("Initializing databases... (某些数据库可能不可用，但MySQL应该可以正常工作)")
     
@@ -81,11 +472,7 @@ def init_databases():
         conn = get_mysql_connection()
         if conn:
             try:
-                cursor = conn.cursor()
-                cursor.execute("CREATE TABLE IF NOT EXISTS users (id INT AUTO_INCREMENT PRIMARY KEY, username VARCHAR(255), password VARCHAR(255))")
-                cursor.execute("TRUNCATE TABLE users")
-                cursor.execute("INSERT INTO users (username, password) VALUES ('admin', 'admin123'), ('user1', 'pass1')")
-                conn.commit()
+                seed_mysql(conn)
                 conn.close()
                 print("MySQL Initialized")
                 break
@@ -101,11 +488,7 @@ def init_databases():
             conn = get_postgres_connection()
             if conn:
                 try:
-                    conn.autocommit = True
-                    cursor = conn.cursor()
-                    cursor.execute("CREATE TABLE IF NOT EXISTS users (id SERIAL PRIMARY KEY, username VARCHAR(255), password VARCHAR(255))")
-                    cursor.execute("TRUNCATE TABLE users RESTART IDENTITY")
-                    cursor.execute("INSERT INTO users (username, password) VALUES ('admin', 'admin123'), ('user1', 'pass1')")
+                    seed_postgres(conn)
                     conn.close()
                     print("Postgres Initialized")
                     break
@@ -123,10 +506,7 @@ def init_databases():
             client = get_clickhouse_connection()
             if client:
                 try:
-                    client.execute("CREATE DATABASE IF NOT EXISTS sqli_lab")
-                    client.execute("CREATE TABLE IF NOT EXISTS sqli_lab.users (id UInt32, username String, password String) ENGINE = MergeTree() ORDER BY id")
-                    client.execute("TRUNCATE TABLE sqli_lab.users")
-                    client.execute("INSERT INTO sqli_lab.users (id, username, password) VALUES (1, 'admin', 'admin123'), (2, 'user1', 'pass1')")
+                    seed_clickhouse(client)
                     print("ClickHouse Initialized")
                     break
                 except Exception as e:
@@ -137,6 +517,15 @@ def init_databases():
     else:
         print("跳过ClickHouse初始化 - 驱动未安装")
 
+    # SQLite Init - 进程内数据库，不需要等待
+    conn = get_sqlite_connection()
+    if conn:
+        try:
+            seed_sqlite(conn)
+            print("SQLite Initialized")
+        except Exception as e:
+            print(f"SQLite Init Error: {e}")
+
     # Oracle Init - 只有在驱动可用时才尝试
     if oracledb is not None:
         for i in range(max_retries):
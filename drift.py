@@ -0,0 +1,157 @@
+"""
+实验表漂移检测与增量修复
+后台线程定期计算每个后端 users 表的廉价指纹，发现被学生改动后只重建该表，
+并且只在前台空闲时才动手，避免和正常请求抢数据库。
+"""
+
+import os
+import threading
+import time
+
+import db
+
+DRIFT_WATCH = os.environ.get('DRIFT_WATCH', '0') == '1'
+DRIFT_INTERVAL = float(os.environ.get('DRIFT_INTERVAL', '30'))
+# 同一张表两次修复之间的最短间隔（秒）
+DRIFT_REPAIR_COOLDOWN = float(os.environ.get('DRIFT_REPAIR_COOLDOWN', '60'))
+
+
+def _fingerprint_mysql(conn):
+    cursor = conn.cursor()
+    cursor.execute("CHECKSUM TABLE users")
+    row = cursor.fetchone()
+    cursor.close()
+    # 表不存在时 CHECKSUM 返回 NULL
+    return row[1] if row else None
+
+
+def _fingerprint_postgres(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT count(*), md5(coalesce(string_agg(t::text, '|' ORDER BY t::text), '')) FROM users t")
+    row = cursor.fetchone()
+    cursor.close()
+    return tuple(row)
+
+
+def _fingerprint_clickhouse(client):
+    rows = client.execute("SELECT count(), groupBitXor(cityHash64(*)) FROM sqli_lab.users")
+    return tuple(rows[0])
+
+
+def _fingerprint_sqlite(conn):
+    row = conn.execute("SELECT count(*), group_concat(id || ':' || username || ':' || password, '|') FROM (SELECT * FROM users ORDER BY id)").fetchone()
+    return tuple(row)
+
+
+# 后端名 -> (取连接, 计算指纹, 重建表)
+TABLES = {
+    'mysql': (db.get_mysql_connection, _fingerprint_mysql, db.seed_mysql),
+    'postgres': (db.get_postgres_connection, _fingerprint_postgres, db.seed_postgres),
+    'clickhouse': (db.get_clickhouse_connection, _fingerprint_clickhouse, db.seed_clickhouse),
+    'sqlite': (db.get_sqlite_connection, _fingerprint_sqlite, db.seed_sqlite),
+}
+
+_MISSING = object()
+
+
+class DriftWatcher:
+    def __init__(self, is_busy, interval=DRIFT_INTERVAL, cooldown=DRIFT_REPAIR_COOLDOWN):
+        """is_busy: 返回前台是否有请求在处理的函数，忙时跳过本轮检查。"""
+        self.is_busy = is_busy
+        self.interval = interval
+        self.cooldown = cooldown
+        self.baselines = {}
+        self.last_repair = {}
+        self.repairs = {name: 0 for name in TABLES}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _fingerprint(self, name):
+        get_conn, fingerprint, _ = TABLES[name]
+        conn = get_conn()
+        if conn is None:
+            # 后端不可用不算漂移
+            return _MISSING
+        try:
+            return fingerprint(conn)
+        except Exception:
+            # 连接正常但查询失败，多半是表被删了
+            return None
+        finally:
+            try:
+                if hasattr(conn, 'disconnect'):
+                    conn.disconnect()
+                else:
+                    conn.close()
+            except Exception:
+                pass
+
+    def _repair(self, name):
+        get_conn, _, seed = TABLES[name]
+        conn = get_conn()
+        if conn is None:
+            return False
+        try:
+            seed(conn, rebuild=True)
+            return True
+        except Exception as e:
+            print(f"{name} 表修复失败: {e}")
+            return False
+        finally:
+            try:
+                if hasattr(conn, 'disconnect'):
+                    conn.disconnect()
+                else:
+                    conn.close()
+            except Exception:
+                pass
+
+    def capture_baselines(self):
+        for name in TABLES:
+            value = self._fingerprint(name)
+            if value is not _MISSING and value is not None:
+                self.baselines[name] = value
+
+    def check_once(self):
+        """检查一轮，返回本轮修复过的后端列表。"""
+        repaired = []
+        for name in TABLES:
+            if self.is_busy():
+                break
+            if name not in self.baselines:
+                # 启动时后端还没就绪，补记基线
+                value = self._fingerprint(name)
+                if value is not _MISSING and value is not None:
+                    self.baselines[name] = value
+                continue
+            value = self._fingerprint(name)
+            if value is _MISSING or value == self.baselines[name]:
+                continue
+            if time.monotonic() - self.last_repair.get(name, float('-inf')) < self.cooldown:
+                continue
+            if self.is_busy():
+                break
+            print(f"检测到 {name} 实验表被修改，正在重建...")
+            self.last_repair[name] = time.monotonic()
+            if self._repair(name):
+                self.repairs[name] += 1
+                repaired.append(name)
+                value = self._fingerprint(name)
+                if value is not _MISSING and value is not None:
+                    self.baselines[name] = value
+        return repaired
+
+    def _run(self):
+        self.capture_baselines()
+        while not self._stop.wait(self.interval):
+            try:
+                self.check_once()
+            except Exception as e:
+                print(f"漂移检测出错: {e}")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='drift-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
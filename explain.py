@@ -0,0 +1,133 @@
+"""
+查询计划捕获
+请求带上 _explain=1 参数（或 X-Lab-Explain: 1 请求头）时，execute_query() 在正常查询成功后
+用同一个连接函数再取一个连接，把最终拼好的 SQL 放到后端的计划工具下再执行一次：
+    MySQL       EXPLAIN ANALYZE（8.0.18+），解析顶层节点的估计行数和实际行数
+    PostgreSQL  EXPLAIN (ANALYZE, FORMAT JSON)，在事务中执行并回滚
+    ClickHouse  EXPLAIN ESTIMATE + EXPLAIN PIPELINE，没有实际执行统计，实际行数取正常查询的结果行数
+    SQLite      EXPLAIN QUERY PLAN
+计划查询和正常查询一样经过自适应并发上限和慢查询调度（app._guarded），开启驱动进程隔离时 backend.connect
+返回的是工作进程的连接，计划查询也在工作进程里执行。连接上的 QUERY_TIMEOUT_MS 同样作用于计划查询。注意 ANALYZE 会真正再执行一遍查询，sleep 类载荷耗时翻倍。
+"""
+
+import json
+import re
+import time
+
+EXPLAIN_PARAM = '_explain'
+EXPLAIN_HEADER = 'X-Lab-Explain'
+
+
+def requested(req):
+    return req.values.get(EXPLAIN_PARAM) == '1' or req.headers.get(EXPLAIN_HEADER) == '1'
+
+
+def _close(conn):
+    if hasattr(conn, 'disconnect'):
+        conn.disconnect()
+    else:
+        conn.close()
+
+
+def _fetch(conn, query):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+# -> Filter: (users.id = 1)  (cost=0.35 rows=1) (actual time=0.02..0.02 rows=1 loops=1)
+_MYSQL_ESTIMATE = re.compile(r'\(cost=[\d.e+]+(?:\.\.[\d.e+]+)? rows=([\d.e+]+)\)')
+_MYSQL_ACTUAL = re.compile(r'\(actual time=[\d.]+\.\.([\d.]+) rows=([\d.e+]+) loops=(\d+)\)')
+
+
+def _explain_mysql(conn, query, result):
+    rows = _fetch(conn, f"EXPLAIN ANALYZE {query}")
+    plan = '\n'.join(str(row[0]) for row in rows)
+    top = plan.split('\n', 1)[0]
+    estimate = _MYSQL_ESTIMATE.search(top)
+    actual = _MYSQL_ACTUAL.search(top)
+    return {
+        "plan": plan,
+        "estimated_rows": float(estimate.group(1)) if estimate else None,
+        "actual_rows": float(actual.group(2)) * int(actual.group(3)) if actual else len(result),
+        "server_ms": float(actual.group(1)) if actual else None,
+    }
+
+
+def _explain_postgres(conn, query, result):
+    try:
+        rows = _fetch(conn, f"EXPLAIN (ANALYZE, FORMAT JSON) {query}")
+    finally:
+        # ANALYZE 会真正执行语句，回滚掉可能的写入
+        conn.rollback()
+    doc = rows[0][0]
+    if isinstance(doc, str):
+        doc = json.loads(doc)
+    if not isinstance(doc, list):
+        return {"plan": rows, "estimated_rows": None, "actual_rows": len(result), "server_ms": None}
+    top = doc[0]['Plan']
+    return {
+        "plan": doc,
+        "estimated_rows": top.get('Plan Rows'),
+        "actual_rows": top.get('Actual Rows', 0) * top.get('Actual Loops', 1),
+        "server_ms": doc[0].get('Execution Time'),
+    }
+
+
+def _explain_clickhouse(client, query, result):
+    # EXPLAIN ESTIMATE 每行是 (database, table, parts, rows, marks)
+    estimate = client.execute(f"EXPLAIN ESTIMATE {query}")
+    pipeline = client.execute(f"EXPLAIN PIPELINE {query}")
+    counted = [row[3] for row in estimate if len(row) >= 5]
+    return {
+        "plan": '\n'.join(str(row[0]) for row in pipeline),
+        "estimate": estimate,
+        "estimated_rows": sum(counted) if counted else None,
+        "actual_rows": len(result),
+        "server_ms": None,
+    }
+
+
+def _explain_sqlite(conn, query, result):
+    rows = _fetch(conn, f"EXPLAIN QUERY PLAN {query}")
+    # 每行是 (id, parent, notused, detail)
+    return {
+        "plan": '\n'.join(str(row[-1]) for row in rows),
+        "estimated_rows": None,
+        "actual_rows": len(result),
+        "server_ms": None,
+    }
+
+
+EXPLAINERS = {
+    'mysql': _explain_mysql,
+    'postgres': _explain_postgres,
+    'postgresql': _explain_postgres,
+    'clickhouse': _explain_clickhouse,
+    'sqlite': _explain_sqlite,
+}
+
+
+def capture(get_conn_func, db_type_name, query, result):
+    """返回计划信息字典；不支持的后端或计划查询失败时返回带 error 的字典。"""
+    explainer = EXPLAINERS.get(db_type_name.lower())
+    if explainer is None:
+        return {"error": f"{db_type_name} 不支持 EXPLAIN"}
+    conn = get_conn_func()
+    if conn is None:
+        return {"error": f"无法连接到 {db_type_name} 数据库"}
+    start = time.perf_counter()
+    try:
+        plan = explainer(conn, query, result)
+    except Exception as e:
+        plan = {"error": f"EXPLAIN 失败: {e}"}
+    finally:
+        try:
+            _close(conn)
+        except Exception:
+            pass
+    plan['ms'] = round((time.perf_counter() - start) * 1000, 3)
+    return plan
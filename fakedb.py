@@ -0,0 +1,211 @@
+"""
+进程内的假数据库驱动
+在 API 层面模拟 mysql.connector、psycopg2 和 clickhouse_driver.Client 中被 db.py 用到的部分，
+由 SQLite 内存库或脚本化结果支撑，并可以注入合成延迟。
+用于在没有数据库服务的机器上压测和检查应用层本身的开销：FAKE_DB=1 python3 app.py
+
+环境变量：
+    FAKE_DB_LATENCY_MS  每次 execute 的合成延迟（毫秒）
+    FAKE_DB_JITTER_MS   在延迟上叠加的 [0, N) 毫秒随机抖动
+    FAKE_DB_CONNECT_MS  每次建立连接的合成延迟（毫秒）
+    FAKE_DB_DOWN        逗号分隔的后端名，连接这些后端时直接失败，用于测试错误路径
+    FAKE_DB_SCRIPT      JSON 文件，内容为 [{"match": 正则, "rows": [...], "error": "...", "latency_ms": N}, ...]，
+                        第一个匹配查询的条目决定结果，没有匹配的查询交给 SQLite 执行
+"""
+
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+
+FAKE_DB_LATENCY_MS = float(os.environ.get('FAKE_DB_LATENCY_MS', '0'))
+FAKE_DB_JITTER_MS = float(os.environ.get('FAKE_DB_JITTER_MS', '0'))
+FAKE_DB_CONNECT_MS = float(os.environ.get('FAKE_DB_CONNECT_MS', '0'))
+FAKE_DB_DOWN = {name.strip() for name in os.environ.get('FAKE_DB_DOWN', '').split(',') if name.strip()}
+FAKE_DB_SCRIPT = os.environ.get('FAKE_DB_SCRIPT', '')
+
+
+class Error(Exception):
+    pass
+
+
+def _load_script(path):
+    if not path:
+        return []
+    with open(path, encoding='utf-8') as f:
+        entries = json.load(f)
+    return [(re.compile(e['match'], re.I | re.S), e) for e in entries]
+
+
+_script = _load_script(FAKE_DB_SCRIPT)
+
+# 把各方言的建表/初始化语句改写成 SQLite 能执行的形式
+_NOOP = re.compile(r'^\s*(CREATE|DROP)\s+(DATABASE|SCHEMA)\b|^\s*(SET|USE)\s|^\s*DISCARD\s', re.I)
+_REWRITES = [
+    (re.compile(r'\bsqli_lab\w*\.', re.I), ''),
+    (re.compile(r'\bINT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY', re.I), 'INTEGER PRIMARY KEY AUTOINCREMENT'),
+    (re.compile(r'\bSERIAL\s+PRIMARY\s+KEY', re.I), 'INTEGER PRIMARY KEY AUTOINCREMENT'),
+    (re.compile(r'\bENGINE\s*=\s*\w+\(\)(\s+ORDER\s+BY\s+\w+)?', re.I), ''),
+    (re.compile(r'\bUInt\d+\b'), 'INTEGER'),
+    (re.compile(r'\bString\b'), 'TEXT'),
+    (re.compile(r'^\s*TRUNCATE\s+TABLE\s+(\w+)(\s+RESTART\s+IDENTITY)?', re.I), r'DELETE FROM \1'),
+    (re.compile(r'^\s*CHECKSUM\s+TABLE\s+(\w+)', re.I), r"SELECT '\1', count(*) FROM \1"),
+    # 各方言的 EXPLAIN 一律换成 SQLite 的查询计划
+    (re.compile(r'^\s*EXPLAIN(\s+\([^)]*\)|\s+ANALYZE|\s+ESTIMATE|\s+PIPELINE|\s+QUERY\s+PLAN)?\s', re.I), 'EXPLAIN QUERY PLAN '),
+]
+
+
+def translate(query):
+    """返回改写后的 SQL；对 SQLite 没有意义的语句返回 None。"""
+    if _NOOP.match(query):
+        return None
+    for pattern, replacement in _REWRITES:
+        query = pattern.sub(replacement, query)
+    return query
+
+
+def _sleep(seconds):
+    time.sleep(float(seconds or 0))
+    return 0
+
+
+def _register_functions(conn, dialect):
+    # 常见注入载荷里会用到的函数，让时间盲注等载荷也能跑通
+    conn.create_function('sleep', 1, _sleep)
+    conn.create_function('pg_sleep', 1, _sleep)
+    conn.create_function('version', 0, lambda: f'fake-{dialect}')
+    conn.create_function('database', 0, lambda: 'sqli_lab')
+    conn.create_function('current_database', 0, lambda: 'sqli_lab')
+    conn.create_function('user', 0, lambda: 'root@localhost')
+    conn.create_function('concat', -1, lambda *args: ''.join('' if a is None else str(a) for a in args))
+
+
+_keepalive = {}
+_keepalive_lock = threading.Lock()
+
+
+def _open(dialect):
+    uri = f'file:fake_{dialect}?mode=memory&cache=shared'
+    with _keepalive_lock:
+        # 共享内存库在最后一个连接关闭时会被释放，这里保留一个连接
+        if dialect not in _keepalive:
+            _keepalive[dialect] = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False, isolation_level=None)
+    _register_functions(conn, dialect)
+    return conn
+
+
+def _delay(extra_ms=0.0):
+    ms = FAKE_DB_LATENCY_MS + extra_ms
+    if FAKE_DB_JITTER_MS:
+        ms += random.random() * FAKE_DB_JITTER_MS
+    if ms > 0:
+        time.sleep(ms / 1000.0)
+
+
+def _run(conn, query):
+    """执行一条查询，返回 (行列表, 列描述)。"""
+    for pattern, entry in _script:
+        if pattern.search(query):
+            _delay(entry.get('latency_ms', 0))
+            if 'error' in entry:
+                raise Error(entry['error'])
+            rows = [tuple(row) for row in entry.get('rows', [])]
+            return rows, None
+    _delay()
+    sql = translate(query)
+    if sql is None:
+        return [], None
+    try:
+        cursor = conn.execute(sql)
+    except sqlite3.Error as e:
+        raise Error(str(e))
+    return cursor.fetchall(), cursor.description
+
+
+def _connect(dialect):
+    if dialect in FAKE_DB_DOWN:
+        raise Error(f"fake {dialect} is down")
+    if FAKE_DB_CONNECT_MS:
+        time.sleep(FAKE_DB_CONNECT_MS / 1000.0)
+    return _open(dialect)
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self._conn = conn
+        self._rows = []
+        self.description = None
+        self.rowcount = -1
+
+    def execute(self, query, params=None):
+        self._rows, self.description = _run(self._conn, query)
+        self.rowcount = len(self._rows)
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchmany(self, size=1):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def close(self):
+        self._rows = []
+
+
+class FakeConnection:
+    """mysql.connector / psycopg2 风格的连接。"""
+
+    def __init__(self, dialect, **kwargs):
+        self.dialect = dialect
+        self.autocommit = False
+        self._conn = _connect(dialect)
+
+    def cursor(self):
+        return FakeCursor(self._conn)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def reset_session(self):
+        pass
+
+    def close(self):
+        self._conn.close()
+
+
+class _Driver:
+    def __init__(self, dialect):
+        self.dialect = dialect
+        self.Error = Error
+
+    def connect(self, **kwargs):
+        return FakeConnection(self.dialect, **kwargs)
+
+
+mysql_connector = _Driver('mysql')
+psycopg2 = _Driver('postgres')
+
+
+class Client:
+    """clickhouse_driver.Client 风格的客户端，execute 直接返回行列表。"""
+
+    def __init__(self, host='localhost', **kwargs):
+        self._conn = _connect('clickhouse')
+
+    def execute(self, query, params=None, **kwargs):
+        rows, _ = _run(self._conn, query)
+        return rows
+
+    def disconnect(self):
+        self._conn.close()
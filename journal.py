@@ -0,0 +1,125 @@
+"""
+请求日志（journal）
+把每个请求的接口、输入方式、原始参数、最终 SQL、状态码和耗时以紧凑的二进制格式追加写入文件，
+写入在后台线程完成，按大小轮转；replay.py 读取这些文件回放流量。
+
+文件格式：文件头 MAGIC，之后每条记录为 4 字节长度 + 记录体。
+记录体：<dHff (时间戳, 状态码, 总耗时ms, 数据库耗时ms)，随后是若干 4 字节长度前缀的字节串，顺序见 FIELDS。
+"""
+
+import glob
+import os
+import queue
+import struct
+import threading
+import time
+
+JOURNAL_DIR = os.environ.get('JOURNAL_DIR', '')
+JOURNAL_MAX_BYTES = int(os.environ.get('JOURNAL_MAX_BYTES', str(64 * 1024 * 1024)))
+JOURNAL_KEEP = int(os.environ.get('JOURNAL_KEEP', '10'))
+JOURNAL_QUEUE_SIZE = int(os.environ.get('JOURNAL_QUEUE_SIZE', '10000'))
+
+MAGIC = b'SQLJ1\n'
+_HEADER = struct.Struct('<dHff')
+_LEN = struct.Struct('<I')
+FIELDS = ('route', 'method', 'input_method', 'query_string', 'content_type', 'body', 'query')
+
+
+def encode_record(record):
+    parts = [_HEADER.pack(record['ts'], record['status'], record['total_ms'], record['db_ms'])]
+    for field in FIELDS:
+        value = record.get(field) or b''
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        parts.append(_LEN.pack(len(value)))
+        parts.append(value)
+    body = b''.join(parts)
+    return _LEN.pack(len(body)) + body
+
+
+def decode_record(body):
+    ts, status, total_ms, db_ms = _HEADER.unpack_from(body, 0)
+    record = {'ts': ts, 'status': status, 'total_ms': total_ms, 'db_ms': db_ms}
+    offset = _HEADER.size
+    for field in FIELDS:
+        (length,) = _LEN.unpack_from(body, offset)
+        offset += _LEN.size
+        value = body[offset:offset + length]
+        offset += length
+        # 请求体保持原始字节，其它字段解码为文本
+        record[field] = value if field == 'body' else value.decode('utf-8', 'replace')
+    return record
+
+
+def read_journal(path):
+    """逐条读取一个 journal 文件，末尾不完整的记录会被忽略。"""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"不是 journal 文件: {path}")
+        while True:
+            head = f.read(_LEN.size)
+            if len(head) < _LEN.size:
+                return
+            (length,) = _LEN.unpack(head)
+            body = f.read(length)
+            if len(body) < length:
+                return
+            yield decode_record(body)
+
+
+class Journal:
+    def __init__(self, directory, max_bytes=JOURNAL_MAX_BYTES, keep=JOURNAL_KEEP, queue_size=JOURNAL_QUEUE_SIZE):
+        if keep < 1:
+            # 保留的文件数包括正在写入的文件，files[:-0] 会变成一个都不删
+            raise ValueError(f"JOURNAL_KEEP 至少为 1，当前为 {keep}")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.keep = keep
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._file = None
+        self._size = 0
+        self._seq = 0
+        self.written = 0
+        self.dropped = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def record(self, **record):
+        """请求线程调用；队列满时直接丢弃，绝不阻塞请求。"""
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _rotate(self):
+        if self._file:
+            self._file.close()
+        self._seq += 1
+        name = time.strftime('journal-%Y%m%d-%H%M%S') + f'-{os.getpid()}-{self._seq}.bin'
+        self._file = open(os.path.join(self.directory, name), 'wb')
+        self._file.write(MAGIC)
+        self._size = len(MAGIC)
+        files = sorted(glob.glob(os.path.join(self.directory, 'journal-*.bin')), key=os.path.getmtime)
+        for old in files[:-self.keep]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+    def _run(self):
+        while True:
+            record = self._queue.get()
+            try:
+                data = encode_record(record)
+                if self._file is None or self._size + len(data) > self.max_bytes:
+                    self._rotate()
+                self._file.write(data)
+                self._size += len(data)
+                self.written += 1
+                # 队列空了再落盘，批量写入
+                if self._queue.empty():
+                    self._file.flush()
+            except Exception as e:
+                print(f"journal 写入失败: {e}")
+
+    def start(self):
+        threading.Thread(target=self._run, name='journal-writer', daemon=True).start()
@@ -0,0 +1,118 @@
+"""
+非阻塞结构化日志
+请求线程只做限流判断和入队，JSON lines 由后台线程写出。
+每种消息按类型限流和采样，被压掉的消息由后台线程每秒汇总成一行带计数的日志。
+"""
+
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+LOG_FILE = os.environ.get('LOG_FILE', '')
+# 每种消息每秒最多输出几条，以及允许的突发条数
+LOG_RATE = float(os.environ.get('LOG_RATE', '5'))
+LOG_BURST = float(os.environ.get('LOG_BURST', '10'))
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', '10000'))
+
+
+def _parse_sampling(spec):
+    """LOG_SAMPLE 形如 "input.parse=0.1,query.error=0.5"，未列出的类型全量保留。"""
+    rates = {}
+    for item in spec.split(','):
+        if '=' in item:
+            kind, rate = item.split('=', 1)
+            rates[kind.strip()] = float(rate)
+    return rates
+
+
+LOG_SAMPLE = _parse_sampling(os.environ.get('LOG_SAMPLE', ''))
+
+
+class _Limiter:
+    __slots__ = ('tokens', 'updated', 'suppressed', 'last_msg')
+
+    def __init__(self):
+        self.tokens = LOG_BURST
+        self.updated = time.monotonic()
+        self.suppressed = 0
+        self.last_msg = ''
+
+
+_limiters = {}
+_lock = threading.Lock()
+_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+_stats = {'emitted': 0, 'suppressed': 0, 'sampled_out': 0, 'dropped': 0}
+
+
+def log(kind, msg, level='error', **fields):
+    """记录一条日志。同一 kind（以及同一 backend）的消息共享限流额度。"""
+    rate = LOG_SAMPLE.get(kind)
+    if rate is not None and random.random() >= rate:
+        _stats['sampled_out'] += 1
+        return
+    key = (kind, fields.get('backend'))
+    now = time.monotonic()
+    with _lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = _Limiter()
+        limiter.tokens = min(LOG_BURST, limiter.tokens + (now - limiter.updated) * LOG_RATE)
+        limiter.updated = now
+        if limiter.tokens < 1:
+            limiter.suppressed += 1
+            limiter.last_msg = msg
+            _stats['suppressed'] += 1
+            return
+        limiter.tokens -= 1
+    record = {'ts': time.time(), 'level': level, 'kind': kind, 'msg': msg}
+    record.update(fields)
+    _enqueue(record)
+
+
+def _enqueue(record):
+    try:
+        _queue.put_nowait(record)
+    except queue.Full:
+        _stats['dropped'] += 1
+
+
+def stats():
+    return dict(_stats)
+
+
+def _flush_suppressed():
+    with _lock:
+        pending = [(key, l.suppressed, l.last_msg) for key, l in _limiters.items() if l.suppressed]
+        for key, _, _ in pending:
+            _limiters[key].suppressed = 0
+    for (kind, backend), count, msg in pending:
+        record = {'ts': time.time(), 'level': 'warning', 'kind': kind, 'msg': msg, 'suppressed': count}
+        if backend is not None:
+            record['backend'] = backend
+        _enqueue(record)
+
+
+def _writer():
+    out = open(LOG_FILE, 'a', encoding='utf-8') if LOG_FILE else sys.stdout
+    next_flush = time.monotonic() + 1
+    while True:
+        try:
+            record = _queue.get(timeout=max(0.0, next_flush - time.monotonic()))
+            out.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+            _stats['emitted'] += 1
+            if _queue.empty():
+                out.flush()
+        except queue.Empty:
+            pass
+        except Exception:
+            pass
+        if time.monotonic() >= next_flush:
+            _flush_suppressed()
+            next_flush = time.monotonic() + 1
+
+
+threading.Thread(target=_writer, name='lablog-writer', daemon=True).start()
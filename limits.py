@@ -0,0 +1,98 @@
+"""
+请求大小限制
+- WSGI 中间件在 Flask 处理之前检查 Content-Length、查询字符串长度和参数个数，超限直接返回 413，不读取请求体；
+- 没有 Content-Length 的分块请求由 Flask 的 MAX_CONTENT_LENGTH 在读取过程中截断（见 configure()）；
+- JSON 嵌套深度在解析前检查，包括 get_input() 里对嵌套 data 字符串的二次解析。
+
+正常请求上的额外开销只有几次整数比较和 str.count()。
+"""
+
+import json
+import os
+
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.exceptions import RequestEntityTooLarge
+
+MAX_BODY_BYTES = int(os.environ.get('MAX_BODY_BYTES', str(1024 * 1024)))
+MAX_QUERY_STRING = int(os.environ.get('MAX_QUERY_STRING', str(64 * 1024)))
+MAX_PARAMS = int(os.environ.get('MAX_PARAMS', '100'))
+MAX_JSON_DEPTH = int(os.environ.get('MAX_JSON_DEPTH', '32'))
+# multipart 表单中单个非文件字段的最大字节数（urlencoded 表单由 MAX_BODY_BYTES 整体限制）
+MAX_PARAM_BYTES = int(os.environ.get('MAX_PARAM_BYTES', str(256 * 1024)))
+
+_TOO_LARGE = b'{"error": "Request too large"}'
+
+
+class BodyLimitMiddleware:
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def _reject(self, start_response):
+        start_response('413 Request Entity Too Large', [
+            ('Content-Type', 'application/json'),
+            ('Content-Length', str(len(_TOO_LARGE))),
+            ('Connection', 'close'),
+        ])
+        return [_TOO_LARGE]
+
+    def __call__(self, environ, start_response):
+        length = environ.get('CONTENT_LENGTH')
+        if length and length.isdigit() and int(length) > MAX_BODY_BYTES:
+            return self._reject(start_response)
+        query = environ.get('QUERY_STRING', '')
+        if len(query) > MAX_QUERY_STRING or query.count('&') >= MAX_PARAMS:
+            return self._reject(start_response)
+        return self.wsgi_app(environ, start_response)
+
+
+def check_json_depth(text):
+    """嵌套深度超过 MAX_JSON_DEPTH 时抛出 RequestEntityTooLarge。"""
+    if isinstance(text, bytes):
+        open_chars = text.count(b'[') + text.count(b'{')
+    else:
+        open_chars = text.count('[') + text.count('{')
+    # 括号总数不超过上限时深度不可能超限，绝大多数请求在这里返回
+    if open_chars <= MAX_JSON_DEPTH:
+        return
+    if isinstance(text, bytes):
+        text = text.decode('utf-8', 'replace')
+    depth = 0
+    in_string = False
+    escaped = False
+    for ch in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in '[{':
+            depth += 1
+            if depth > MAX_JSON_DEPTH:
+                raise RequestEntityTooLarge(f"JSON nesting deeper than {MAX_JSON_DEPTH}")
+        elif ch in ']}':
+            depth -= 1
+
+
+def loads(text):
+    check_json_depth(text)
+    return json.loads(text)
+
+
+class LimitedJSONProvider(DefaultJSONProvider):
+    """request.get_json() 使用的 JSON 解析，先检查嵌套深度。"""
+
+    def loads(self, s, **kwargs):
+        check_json_depth(s)
+        return super().loads(s, **kwargs)
+
+
+def configure(app):
+    app.config['MAX_CONTENT_LENGTH'] = MAX_BODY_BYTES
+    app.config['MAX_FORM_PARTS'] = MAX_PARAMS
+    app.config['MAX_FORM_MEMORY_SIZE'] = MAX_PARAM_BYTES
+    app.json = LimitedJSONProvider(app)
+    app.wsgi_app = BodyLimitMiddleware(app.wsgi_app)
@@ -0,0 +1,127 @@
+"""
+基于 tracemalloc 的按接口内存统计
+MEMTRACK=1 时开启。每个请求开始时重置 tracemalloc 的峰值，结束时记录峰值增量，按接口和后端汇总。
+tracemalloc 的计数和峰值都是整个进程的，并发请求会互相重置、互相计入峰值，所以开启后请求是串行处理的：
+begin_request() 取得进程内的请求锁，end_request() 释放。这是诊断模式，不要在需要吞吐的部署上开启。
+
+MEMTRACK_CEILING_MB > 0 时，游标结果按 MEMTRACK_FETCH_ROWS 行一批取回，每批之后检查本请求的内存增量，
+超过上限时请求被中止并返回错误，最多多分配一批。整个结果一次返回的驱动（psycopg2 的客户端游标、
+ClickHouse 客户端）在 execute 时已经分配完内存，只能在取回之后检查。
+"""
+
+import os
+import threading
+import time
+import tracemalloc
+
+MEMTRACK = os.environ.get('MEMTRACK', '0') == '1'
+MEMTRACK_FRAMES = int(os.environ.get('MEMTRACK_FRAMES', '1'))
+MEMTRACK_CEILING = int(float(os.environ.get('MEMTRACK_CEILING_MB', '0')) * 1024 * 1024)
+MEMTRACK_FETCH_ROWS = int(os.environ.get('MEMTRACK_FETCH_ROWS', '1000'))
+# 保留多少个历史快照用于对比
+MEMTRACK_SNAPSHOTS = int(os.environ.get('MEMTRACK_SNAPSHOTS', '5'))
+
+
+class MemoryCeilingExceeded(Exception):
+    def __init__(self, used):
+        super().__init__(f"请求内存超出上限: {used / 1048576:.1f}MB > {MEMTRACK_CEILING / 1048576:.1f}MB")
+        self.used = used
+
+
+_lock = threading.Lock()
+# (接口, 后端) -> 统计
+_routes = {}
+_snapshots = []
+# 同一时刻只统计一个请求；_baseline 是当前请求的基准，没有请求时为 None
+_request_lock = threading.Lock()
+_baseline = None
+
+
+def start():
+    tracemalloc.start(MEMTRACK_FRAMES)
+
+
+def begin_request():
+    """等待前一个请求结束，返回本请求的内存基准。之后必须调用 end_request()，即使请求失败。"""
+    global _baseline
+    _request_lock.acquire()
+    tracemalloc.reset_peak()
+    _baseline = tracemalloc.get_traced_memory()[0]
+    return _baseline
+
+
+def checking():
+    """当前是否需要在取结果时检查上限。"""
+    return MEMTRACK_CEILING > 0 and _baseline is not None
+
+
+def check():
+    """超过上限时抛出 MemoryCeilingExceeded；不在统计中的请求（或工作进程里）什么也不做。"""
+    baseline = _baseline
+    if MEMTRACK_CEILING and baseline is not None:
+        used = tracemalloc.get_traced_memory()[0] - baseline
+        if used > MEMTRACK_CEILING:
+            raise MemoryCeilingExceeded(used)
+
+
+def end_request(baseline, route, backend):
+    """记录本请求的峰值增量并释放请求锁。"""
+    global _baseline
+    try:
+        peak = max(0, tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        _baseline = None
+        _request_lock.release()
+    key = (route, backend)
+    with _lock:
+        stats = _routes.get(key)
+        if stats is None:
+            stats = _routes[key] = {'count': 0, 'total_peak': 0, 'max_peak': 0, 'last_peak': 0, 'exceeded': 0}
+        stats['count'] += 1
+        stats['total_peak'] += peak
+        stats['last_peak'] = peak
+        if peak > stats['max_peak']:
+            stats['max_peak'] = peak
+        if MEMTRACK_CEILING and peak > MEMTRACK_CEILING:
+            stats['exceeded'] += 1
+    return peak
+
+
+def route_stats():
+    with _lock:
+        items = [(key, dict(stats)) for key, stats in _routes.items()]
+    result = []
+    for (route, backend), stats in items:
+        stats['route'] = route
+        stats['backend'] = backend
+        stats['mean_peak'] = stats['total_peak'] // stats['count']
+        result.append(stats)
+    result.sort(key=lambda s: s['max_peak'], reverse=True)
+    return result
+
+
+def _format_stat(stat):
+    frame = stat.traceback[0]
+    return {'site': f"{frame.filename}:{frame.lineno}", 'size': stat.size, 'count': stat.count}
+
+
+def top_sites(limit=20, compare=False):
+    """返回当前分配最多的代码位置；compare=True 时同时返回与上一个快照相比的增量。"""
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    ))
+    report = {'taken_at': time.time(), 'top': [_format_stat(s) for s in snapshot.statistics('lineno')[:limit]]}
+    with _lock:
+        previous = _snapshots[-1] if _snapshots else None
+        if compare:
+            _snapshots.append((report['taken_at'], snapshot))
+            del _snapshots[:-MEMTRACK_SNAPSHOTS]
+    if compare and previous is not None:
+        taken_at, old = previous
+        report['compared_to'] = taken_at
+        report['diff'] = [
+            {'site': f"{d.traceback[0].filename}:{d.traceback[0].lineno}", 'size_diff': d.size_diff, 'size': d.size, 'count_diff': d.count_diff}
+            for d in snapshot.compare_to(old, 'lineno')[:limit]
+        ]
+    return report
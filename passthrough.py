@@ -0,0 +1,155 @@
+"""
+ClickHouse / PostgreSQL 结果直通
+大结果集的大部分 CPU 花在把驱动返回的行解码成 Python 元组、再编码成 JSON 上。
+PASSTHROUGH=clickhouse,postgres 时，这两个后端的接口改为让数据库自己输出每行一个 JSON 数组，
+应用只在行与行之间补逗号，把字节原样流式写进 HTTP 响应：
+    ClickHouse  HTTP 接口（CLICKHOUSE_HTTP_PORT，默认 8123），default_format=JSONCompactEachRow。
+                用 URL 参数而不是 FORMAT 子句指定格式，载荷末尾的注释不会把它注释掉。
+    PostgreSQL  COPY (SELECT json_agg(...) FROM (查询) t) TO STDOUT，用 CSV 格式并把引号和分隔符设成
+                不会出现在 JSON 里的控制字符，输出不做任何转义。copy_expert 在后台线程里写入有界队列。
+
+响应格式和普通接口相同（{"query": ..., "result": [[...], ...]}）。连接、发出查询和等待第一块数据在
+接口函数里同步完成，所以连接失败和 SQL 错误仍然返回普通的 500 JSON；开始流式输出之后出错只能截断响应。
+直通模式下不做 EXPLAIN、内存上限检查、慢查询调度、请求合并和自适应并发限制。
+准入控制和限流的名额一直占用到响应写完（或客户端断开）为止，而不是接口函数返回时。
+"""
+
+import http.client
+import json
+import os
+import queue
+import threading
+import urllib.parse
+
+import db
+
+PASSTHROUGH = {name.strip() for name in os.environ.get('PASSTHROUGH', '').split(',') if name.strip()}
+CLICKHOUSE_HTTP_PORT = int(os.environ.get('CLICKHOUSE_HTTP_PORT', '8123'))
+CHUNK_SIZE = 64 * 1024
+# HTTP 连接的套接字超时：后端设置了查询超时时在它之上留一点余量，没有设置时用这个值，不会无限等待
+CLICKHOUSE_HTTP_TIMEOUT = float(os.environ.get('CLICKHOUSE_HTTP_TIMEOUT', '30'))
+_TIMEOUT_MARGIN = 5
+
+
+class StreamError(Exception):
+    pass
+
+
+class Source:
+    """数据库输出的字节块；close() 在响应结束（包括客户端中途断开）时由 Flask 调用。"""
+
+    def __init__(self, chunks, close):
+        self.chunks = chunks
+        self.close = close
+
+
+def _open_clickhouse(query, timeout_ms):
+    target = (db.get_sandbox() or {}).get('clickhouse')
+    if target:
+        query = db.clickhouse_sandbox_query(query, target)
+    params = {'default_format': 'JSONCompactEachRow', 'output_format_json_quote_64bit_integers': 0}
+    if timeout_ms:
+        params['max_execution_time'] = timeout_ms / 1000
+    timeout = timeout_ms / 1000 + _TIMEOUT_MARGIN if timeout_ms else CLICKHOUSE_HTTP_TIMEOUT
+    conn = http.client.HTTPConnection(db.DB_CONFIG['clickhouse']['host'], CLICKHOUSE_HTTP_PORT, timeout=timeout)
+    try:
+        conn.request('POST', '/?' + urllib.parse.urlencode(params), body=query.encode('utf-8'))
+        resp = conn.getresponse()
+    except OSError as e:
+        conn.close()
+        raise StreamError(f"无法连接到 ClickHouse HTTP 接口: {e}")
+    if resp.status != 200:
+        message = resp.read().decode('utf-8', 'replace').strip()
+        conn.close()
+        raise StreamError(message)
+
+    def chunks():
+        while True:
+            data = resp.read1(CHUNK_SIZE)
+            if not data:
+                return
+            yield data
+    return Source(chunks(), conn.close)
+
+
+_END = object()
+
+
+class _QueueWriter:
+    """copy_expert 的输出文件；客户端断开后 write() 抛出异常，让 COPY 中止。"""
+
+    def __init__(self, chunks, cancelled):
+        self._chunks = chunks
+        self._cancelled = cancelled
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        while True:
+            try:
+                self._chunks.put(data, timeout=1)
+                return len(data)
+            except queue.Full:
+                if self._cancelled.is_set():
+                    raise StreamError("客户端已断开")
+
+
+def _open_postgres(query, timeout_ms):
+    conn = db.get_postgres_connection(timeout_ms=timeout_ms)
+    if conn is None:
+        raise StreamError("无法连接到 PostgreSQL 数据库")
+    sql = ("COPY (SELECT (SELECT json_agg(e.value) FROM json_each(row_to_json(t)) e) "
+           f"FROM ({query}) t) TO STDOUT WITH (FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')")
+    chunks = queue.Queue(maxsize=16)
+    cancelled = threading.Event()
+
+    def copy():
+        try:
+            cursor = conn.cursor()
+            cursor.copy_expert(sql, _QueueWriter(chunks, cancelled), size=CHUNK_SIZE)
+            chunks.put(_END)
+        except Exception as e:
+            chunks.put(e)
+        finally:
+            try:
+                conn.rollback()
+                conn.close()
+            except Exception:
+                pass
+    threading.Thread(target=copy, name='pg-copy', daemon=True).start()
+
+    first = chunks.get()
+    if isinstance(first, Exception):
+        raise StreamError(str(first))
+
+    def rest():
+        item = first
+        while item is not _END:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+            item = chunks.get()
+    return Source(rest(), cancelled.set)
+
+
+STREAMERS = {
+    'clickhouse': _open_clickhouse,
+    'postgres': _open_postgres,
+}
+
+
+def stream(query, chunks):
+    """把每行一个 JSON 数组的字节块拼成 {"query": ..., "result": [...]}。"""
+    yield b'{"query": ' + json.dumps(query).encode('utf-8') + b', "result": ['
+    # 每行以换行结尾：换行换成逗号，最后一个字节先留着，结束时丢掉多出来的逗号
+    held = b''
+    for chunk in chunks:
+        if not chunk:
+            continue
+        data = held + chunk.replace(b'\n', b',')
+        held = data[-1:]
+        if len(data) > 1:
+            yield data[:-1]
+    if held and held != b',':
+        yield held
+    yield b']}'
@@ -0,0 +1,107 @@
+"""
+单请求采样分析器
+对被选中的请求，后台线程按固定间隔采样处理该请求的线程的调用栈，
+请求结束后写成 collapsed-stack 格式（flamegraph.pl / speedscope 都能直接打开）。
+
+请求被选中的条件：客户端 IP 在 PROFILE_ALLOWLIST 中并带了 X-Lab-Profile: 1 请求头，
+或者按 PROFILE_SAMPLE_RATE 随机抽中。
+"""
+
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+
+PROFILE_ALLOWLIST = {ip.strip() for ip in os.environ.get('PROFILE_ALLOWLIST', '127.0.0.1,::1').split(',') if ip.strip()}
+PROFILE_HEADER = 'X-Lab-Profile'
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'sqli_lab_profiles'))
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', '50'))
+PROFILE_INTERVAL = float(os.environ.get('PROFILE_INTERVAL_MS', '1')) / 1000.0
+
+_UNSAFE = re.compile(r'[^A-Za-z0-9_.-]+')
+
+
+def should_profile(remote_addr, headers):
+    if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+        return True
+    return headers.get(PROFILE_HEADER) == '1' and remote_addr in PROFILE_ALLOWLIST
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """采样指定线程的调用栈，按 collapsed-stack 聚合。"""
+
+    def __init__(self, thread_id, interval=PROFILE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiler-sampler', daemon=True)
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def _sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        labels = []
+        while frame is not None:
+            labels.append(_frame_label(frame.f_code))
+            frame = frame.f_back
+        if labels:
+            key = ';'.join(reversed(labels))
+            self.stacks[key] = self.stacks.get(key, 0) + 1
+            self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+        return self
+
+    def write(self, route):
+        """写入 PROFILE_DIR 并轮转旧文件，返回文件名。"""
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{int(time.time() * 1000) % 1000:03d}" \
+               f"{_UNSAFE.sub('_', route)}-{self.elapsed * 1000:.0f}ms.collapsed"
+        with open(os.path.join(PROFILE_DIR, name), 'w', encoding='utf-8') as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+        _rotate()
+        return name
+
+
+def _rotate():
+    files = list_profiles()
+    for entry in files[PROFILE_KEEP:]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, entry['name']))
+        except OSError:
+            pass
+
+
+def list_profiles():
+    """按时间倒序列出已保存的分析文件。"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    entries = []
+    for name in os.listdir(PROFILE_DIR):
+        if name.endswith('.collapsed'):
+            stat = os.stat(os.path.join(PROFILE_DIR, name))
+            entries.append({'name': name, 'size': stat.st_size, 'mtime': stat.st_mtime})
+    entries.sort(key=lambda e: e['mtime'], reverse=True)
+    return entries
@@ -0,0 +1,121 @@
+"""
+查询指纹和按指纹的慢查询统计
+execute_query() 拼好的每条 SQL 先归一化成指纹：去掉注释，字符串和数字字面量换成 ?，
+IN 列表折叠成 (?+)，空白合并，转成小写。于是 id = 1 和 id = 2、不同的 union 载荷值
+都归到同一种查询形状下。
+
+统计按 (后端, 指纹) 汇总次数、总/平均/p99 耗时和错误率，保存在容量为 QUERY_STATS_TOP 的
+space-saving 结构里：满了以后新指纹替换计数最小的条目并继承它的计数（记为 overcount 误差上界），
+因此内存固定，而真正高频的查询形状一定留在表里。
+条目按计数分桶（stream-summary）并记住最小的计数，找替换对象和计数加一都是 O(1)，不随容量增长。
+"""
+
+import os
+import re
+import threading
+
+from stats import LogHistogram
+
+QUERY_STATS = os.environ.get('QUERY_STATS', '0') == '1'
+QUERY_STATS_TOP = int(os.environ.get('QUERY_STATS_TOP', '500'))
+# 指纹和样例 SQL 的最大长度，超长载荷截断
+MAX_FINGERPRINT = 1000
+
+_TOKENS = re.compile(r"""
+    (?P<comment>/\*.*?\*/|--[^\n]*|\#[^\n]*)
+  | (?P<string>'(?:[^'\\]|\\.|'')*')
+  | (?P<number>\b(?:0x[0-9a-fA-F]+|\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)\b)
+  | (?P<space>\s+)
+""", re.X | re.S)
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+
+_REPLACEMENTS = {'comment': ' ', 'string': '?', 'number': '?', 'space': ' '}
+
+
+def fingerprint(query):
+    text = _TOKENS.sub(lambda m: _REPLACEMENTS[m.lastgroup], query)
+    text = _IN_LIST.sub('(?+)', text)
+    return ' '.join(text.split()).lower()[:MAX_FINGERPRINT]
+
+
+class _Entry:
+    __slots__ = ('count', 'overcount', 'errors', 'latency', 'sample')
+
+    def __init__(self, overcount, sample):
+        self.count = overcount
+        self.overcount = overcount
+        self.errors = 0
+        self.latency = LogHistogram()
+        self.sample = sample
+
+
+class QueryStats:
+    def __init__(self, capacity=QUERY_STATS_TOP):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        # (后端, 指纹) -> _Entry
+        self._entries = {}
+        # 计数 -> {键: None}（按插入顺序，同计数时先替换最早进入的），以及当前最小的计数
+        self._buckets = {}
+        self._min = 0
+        self.evicted = 0
+
+    def _place(self, key, old, new):
+        """把键从计数 old 的桶移到计数 new 的桶；old 为 0 表示新键。调用方持有锁。"""
+        if old:
+            bucket = self._buckets[old]
+            del bucket[key]
+            if not bucket:
+                del self._buckets[old]
+        self._buckets.setdefault(new, {})[key] = None
+        if self._min not in self._buckets or new < self._min:
+            self._min = new
+
+    def record(self, backend, query, ms, error=False):
+        key = (backend, fingerprint(query))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                overcount = 0
+                if len(self._entries) >= self.capacity:
+                    bucket = self._buckets[self._min]
+                    victim = next(iter(bucket))
+                    del bucket[victim]
+                    if not bucket:
+                        del self._buckets[self._min]
+                    overcount = self._entries.pop(victim).count
+                    self.evicted += 1
+                entry = self._entries[key] = _Entry(overcount, query[:MAX_FINGERPRINT])
+                self._place(key, 0, overcount + 1)
+            else:
+                self._place(key, entry.count, entry.count + 1)
+            entry.count += 1
+            entry.latency.add(ms)
+            if error:
+                entry.errors += 1
+
+    def top(self, limit=20, sort='total'):
+        keys = {
+            'total': lambda item: item[1].latency.total,
+            'count': lambda item: item[1].count,
+            'p99': lambda item: item[1].latency.percentile(99),
+            'errors': lambda item: item[1].errors,
+        }
+        with self._lock:
+            items = sorted(self._entries.items(), key=keys.get(sort, keys['total']), reverse=True)[:limit]
+            return [{
+                'backend': backend,
+                'fingerprint': fp,
+                'sample': e.sample,
+                'count': e.count,
+                'overcount': e.overcount,
+                'total_ms': round(e.latency.total, 3),
+                'mean_ms': round(e.latency.mean(), 3),
+                'p99_ms': round(e.latency.percentile(99), 3),
+                'max_ms': round(e.latency.max, 3),
+                'error_rate': round(e.errors / e.latency.count, 4) if e.latency.count else 0.0,
+            } for (backend, fp), e in items]
+
+    def stats(self):
+        with self._lock:
+            return {'fingerprints': len(self._entries), 'capacity': self.capacity, 'evicted': self.evicted}
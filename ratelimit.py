@@ -0,0 +1,135 @@
+"""
+按客户端的公平限流
+每个客户端（IP 或会话 Cookie）在每条规则下有一个令牌桶（请求速率）和一个并发慢查询额度。
+令牌桶在请求开始时检查；并发额度只约束 scheduler.is_slow() 判定为慢查询（时间盲注等）的请求，
+在 execute_query() 拼好 SQL 之后占用，普通查询不占额度。
+规则按路径通配符匹配，可以按后端或单个接口分别配置。
+
+RATE_LIMIT_KEY=session 按服务端签发的沙箱会话 Cookie（见 sandbox.py）区分客户端，需要同时开启 SANDBOX_POOL_SIZE；
+没有 Cookie 或 Cookie 不是服务端签发的请求按 IP 计。
+状态放在一个 LRU 有序字典里，超过 RATE_LIMIT_MAX_KEYS 或空闲超过 RATE_LIMIT_IDLE 秒的客户端会被淘汰，
+每个请求的开销是常数时间。
+
+RATE_LIMITS 为 JSON 列表，第一条匹配的规则生效，例如：
+    [{"pattern": "/clickhouse/*", "rate": 5, "burst": 10, "concurrent": 2},
+     {"pattern": "*", "rate": 20, "burst": 40, "concurrent": 4}]
+"""
+
+import collections
+import fnmatch
+import json
+import math
+import os
+import threading
+import time
+
+RATE_LIMIT = os.environ.get('RATE_LIMIT', '0') == '1'
+# ip 或 session（服务端签发的沙箱会话 Cookie，没有有效 Cookie 时退回 IP）
+RATE_LIMIT_KEY = os.environ.get('RATE_LIMIT_KEY', 'ip')
+RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS', '10000'))
+RATE_LIMIT_IDLE = float(os.environ.get('RATE_LIMIT_IDLE', '600'))
+DEFAULT_RULES = [{"pattern": "*", "rate": 20, "burst": 40, "concurrent": 4}]
+RATE_LIMITS = json.loads(os.environ.get('RATE_LIMITS', '') or 'null') or DEFAULT_RULES
+
+
+class Limited(Exception):
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Bucket:
+    __slots__ = ('tokens', 'updated', 'concurrent')
+
+    def __init__(self, burst, now):
+        self.tokens = burst
+        self.updated = now
+        self.concurrent = 0
+
+
+class RateLimiter:
+    def __init__(self, rules=RATE_LIMITS, max_keys=RATE_LIMIT_MAX_KEYS, idle=RATE_LIMIT_IDLE):
+        self.rules = rules
+        self.max_keys = max_keys
+        self.idle = idle
+        self._lock = threading.Lock()
+        self._buckets = collections.OrderedDict()
+        # 路径 -> 规则下标，数据库接口数量有限，缓存不会无限增长
+        self._rule_cache = {}
+        self.counters = {'allowed': 0, 'limited_rate': 0, 'limited_concurrency': 0, 'evicted': 0}
+
+    def _rule_for(self, path):
+        index = self._rule_cache.get(path)
+        if index is None:
+            index = -1
+            for i, rule in enumerate(self.rules):
+                if fnmatch.fnmatchcase(path, rule['pattern']):
+                    index = i
+                    break
+            self._rule_cache[path] = index
+        return index
+
+    def _evict(self, now):
+        while self._buckets:
+            key, bucket = next(iter(self._buckets.items()))
+            if len(self._buckets) > self.max_keys or now - bucket.updated > self.idle:
+                self._buckets.popitem(last=False)
+                self.counters['evicted'] += 1
+            else:
+                break
+
+    def acquire(self, client, path):
+        """按请求速率准入一个请求，返回交给 acquire_slow() 的句柄；超限时抛出 Limited。"""
+        index = self._rule_for(path)
+        if index < 0:
+            return None
+        rule = self.rules[index]
+        key = (client, index)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = _Bucket(rule['burst'], now)
+            else:
+                self._buckets.move_to_end(key)
+                bucket.tokens = min(rule['burst'], bucket.tokens + (now - bucket.updated) * rule['rate'])
+            bucket.updated = now
+            self._evict(now)
+            if bucket.tokens < 1:
+                self.counters['limited_rate'] += 1
+                raise Limited('rate limit exceeded', max(1, math.ceil((1 - bucket.tokens) / rule['rate'])))
+            bucket.tokens -= 1
+            self.counters['allowed'] += 1
+        return key
+
+    def acquire_slow(self, key):
+        """为一条慢查询占用并发额度，之后必须调用 release(key)；额度用完时抛出 Limited。"""
+        rule = self.rules[key[1]]
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                # 桶刚被淘汰，重新建一个
+                bucket = self._buckets[key] = _Bucket(rule['burst'], time.monotonic())
+            if bucket.concurrent >= rule['concurrent']:
+                self.counters['limited_concurrency'] += 1
+                raise Limited('too many concurrent slow queries', 1)
+            bucket.concurrent += 1
+
+    def release(self, key):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None and bucket.concurrent > 0:
+                bucket.concurrent -= 1
+
+    def stats(self, top=20):
+        with self._lock:
+            stats = dict(self.counters)
+            stats['keys'] = len(self._buckets)
+            # 最近活跃的客户端排在有序字典末尾
+            recent = list(self._buckets.items())[-top:]
+        stats['recent'] = [
+            {'client': client, 'pattern': self.rules[index]['pattern'], 'tokens': round(b.tokens, 2), 'concurrent': b.concurrent}
+            for (client, index), b in reversed(recent)
+        ]
+        return stats
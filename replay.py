@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+回放 journal 文件中的请求，对比原始耗时和回放耗时
+
+journal 里的 total_ms 是服务端处理时间，回放时对比的是响应头 Server-Timing 里的服务端时间（app;dur=），
+两边口径相同；客户端测到的往返时间（含网络和排队）单独列出，不参与对比。
+目标服务没有返回 Server-Timing 时服务端列显示为 -。
+
+用法:
+    python replay.py journal/journal-*.bin --base http://localhost:8888 --speed 2
+    --speed 0 表示不等待原始间隔，尽可能快地发送
+"""
+
+import argparse
+import http.client
+import re
+import sys
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+import journal
+
+_SERVER_TIMING = re.compile(r'(?:^|,)\s*app;dur=([\d.]+)')
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))
+    return values[index]
+
+
+def connect(base_url, timeout):
+    parts = urllib.parse.urlsplit(base_url)
+    connection = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    return connection(parts.netloc, timeout=timeout), parts.path.rstrip('/')
+
+
+def send(conn, prefix, record):
+    """返回 (状态码, 客户端往返毫秒, 服务端毫秒或 None)；连接失败时状态码为 0。"""
+    path = prefix + record['route']
+    if record['query_string']:
+        path += '?' + record['query_string']
+    headers = {}
+    if record['content_type']:
+        headers['Content-Type'] = record['content_type']
+    start = time.perf_counter()
+    try:
+        conn.request(record['method'], path, body=record['body'] or None, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        status = response.status
+        match = _SERVER_TIMING.search(response.getheader('Server-Timing') or '')
+        server_ms = float(match.group(1)) if match else None
+    except Exception:
+        # 关闭后下一次 request() 会重新建连
+        conn.close()
+        status, server_ms = 0, None
+    return status, (time.perf_counter() - start) * 1000, server_ms
+
+
+def replay(paths, base_url, speed, concurrency, timeout):
+    records = []
+    for path in paths:
+        records.extend(journal.read_journal(path))
+    records.sort(key=lambda r: r['ts'])
+    if not records:
+        print("journal 中没有记录")
+        return {}
+
+    results = {}
+    lock = threading.Lock()
+    local = threading.local()
+
+    def run(record):
+        if not hasattr(local, 'conn'):
+            local.conn, local.prefix = connect(base_url, timeout)
+        status, rtt, server_ms = send(local.conn, local.prefix, record)
+        with lock:
+            entry = results.setdefault(record['route'], {'recorded': [], 'replayed': [], 'rtt': [], 'mismatch': 0})
+            entry['recorded'].append(record['total_ms'])
+            if server_ms is not None:
+                entry['replayed'].append(server_ms)
+            entry['rtt'].append(rtt)
+            if status != record['status']:
+                entry['mismatch'] += 1
+
+    first_ts = records[0]['ts']
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for record in records:
+            if speed > 0:
+                delay = (record['ts'] - first_ts) / speed - (time.monotonic() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            pool.submit(run, record)
+    print(f"回放 {len(records)} 个请求，用时 {time.monotonic() - start:.1f}s")
+    return results
+
+
+def _ms(values, p):
+    return f"{percentile(values, p):>10.1f}" if values else f"{'-':>10}"
+
+
+def report(results):
+    # srv 是服务端处理时间（journal 的 total_ms / 回放响应的 Server-Timing），rtt 是回放客户端测到的往返时间
+    print(f"{'route':<24}{'n':>6}{'rec srv50':>10}{'rep srv50':>10}{'rec srv99':>10}{'rep srv99':>10}"
+          f"{'Δsrv99':>10}{'rep rtt99':>10}{'status≠':>9}")
+    for route in sorted(results):
+        entry = results[route]
+        rec99 = percentile(entry['recorded'], 99)
+        delta = f"{percentile(entry['replayed'], 99) - rec99:>+10.1f}" if entry['replayed'] else f"{'-':>10}"
+        print(f"{route:<24}{len(entry['recorded']):>6}"
+              f"{_ms(entry['recorded'], 50)}{_ms(entry['replayed'], 50)}"
+              f"{_ms(entry['recorded'], 99)}{_ms(entry['replayed'], 99)}{delta}"
+              f"{_ms(entry['rtt'], 99)}{entry['mismatch']:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回放请求 journal 并对比延迟")
+    parser.add_argument('paths', nargs='+', help="journal 文件")
+    parser.add_argument('--base', default='http://localhost:8888', help="实验室地址")
+    parser.add_argument('--speed', type=float, default=1.0, help="回放倍速，0 表示不等待")
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--timeout', type=float, default=30.0)
+    args = parser.parse_args()
+    report(replay(args.paths, args.base.rstrip('/'), args.speed, args.concurrency, args.timeout))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,208 @@
+"""
+学生沙箱池
+预先建好一批独立的 MySQL 库、PostgreSQL schema 和 ClickHouse 库，
+每个会话第一次真正执行查询时直接分到一个现成的沙箱；会话过期后在后台重建并放回池中。
+
+会话 id 由服务端生成并用 HMAC 签名后放进 Cookie，客户端伪造或篡改的 Cookie 当作新会话处理。
+同一个客户端 IP 最多同时租用 SANDBOX_MAX_PER_IP 个沙箱，不保存 Cookie 的扫描器不会把池占满。
+"""
+
+import collections
+import hashlib
+import hmac
+import os
+import queue
+import threading
+import time
+import uuid
+
+import db
+
+SANDBOX_POOL_SIZE = int(os.environ.get('SANDBOX_POOL_SIZE', '0'))
+# 会话多久没有请求就回收沙箱（秒）
+SANDBOX_TTL = float(os.environ.get('SANDBOX_TTL', '1800'))
+SANDBOX_PREFIX = 'sqli_lab_sb'
+# 用来识别会话的 Cookie
+SANDBOX_COOKIE = 'lab_sandbox'
+SANDBOX_MAX_PER_IP = int(os.environ.get('SANDBOX_MAX_PER_IP', '3'))
+# Cookie 签名密钥；未设置时每次启动随机生成（租约只保存在内存里，重启后旧会话本来就失效）
+SANDBOX_SECRET = os.environ.get('SANDBOX_SECRET', '').encode('utf-8') or os.urandom(32)
+
+
+def _sign(session_id):
+    return hmac.new(SANDBOX_SECRET, session_id.encode('utf-8'), hashlib.sha256).hexdigest()[:32]
+
+
+def new_session():
+    """返回 (会话 id, Cookie 值)。"""
+    session_id = uuid.uuid4().hex
+    return session_id, f"{session_id}.{_sign(session_id)}"
+
+
+def verify_session(cookie):
+    """返回 Cookie 里由本服务签发的会话 id；没有 Cookie、伪造或篡改时返回 None。"""
+    session_id, _, signature = (cookie or '').partition('.')
+    if session_id and hmac.compare_digest(signature, _sign(session_id)):
+        return session_id
+    return None
+
+
+def _close(conn):
+    try:
+        if hasattr(conn, 'disconnect'):
+            conn.disconnect()
+        else:
+            conn.close()
+    except Exception:
+        pass
+
+
+def _provision_mysql(name):
+    conn = db.get_mysql_connection(db.SHARED_DATABASE)
+    if conn is None:
+        return False
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"DROP DATABASE IF EXISTS {name}")
+        cursor.execute(f"CREATE DATABASE {name}")
+        cursor.close()
+    finally:
+        _close(conn)
+    conn = db.get_mysql_connection(name)
+    if conn is None:
+        return False
+    try:
+        db.seed_mysql(conn)
+    finally:
+        _close(conn)
+    return True
+
+
+def _provision_postgres(name):
+    conn = db.get_postgres_connection()
+    if conn is None:
+        return False
+    try:
+        conn.autocommit = True
+        cursor = conn.cursor()
+        cursor.execute(f"DROP SCHEMA IF EXISTS {name} CASCADE")
+        cursor.execute(f"CREATE SCHEMA {name}")
+        cursor.close()
+    finally:
+        _close(conn)
+    conn = db.get_postgres_connection(name)
+    if conn is None:
+        return False
+    try:
+        db.seed_postgres(conn)
+    finally:
+        _close(conn)
+    return True
+
+
+def _provision_clickhouse(name):
+    client = db.get_clickhouse_connection(db.SHARED_DATABASE)
+    if client is None:
+        return False
+    try:
+        client.execute(f"DROP DATABASE IF EXISTS {name}")
+        db.seed_clickhouse(client, database=name)
+    finally:
+        _close(client)
+    return True
+
+
+PROVISIONERS = {
+    'mysql': _provision_mysql,
+    'postgres': _provision_postgres,
+    'clickhouse': _provision_clickhouse,
+}
+
+
+def provision(name):
+    """(重新)建立一个沙箱，返回 {后端名: 库名}，只包含建成功的后端。"""
+    targets = {}
+    for backend, provisioner in PROVISIONERS.items():
+        try:
+            if provisioner(name):
+                targets[backend] = name
+        except Exception as e:
+            print(f"沙箱 {name} 的 {backend} 初始化失败: {e}")
+    return targets
+
+
+class SandboxPool:
+    def __init__(self, size=SANDBOX_POOL_SIZE, ttl=SANDBOX_TTL, max_per_client=SANDBOX_MAX_PER_IP):
+        self.size = size
+        self.ttl = ttl
+        self.max_per_client = max_per_client
+        self._lock = threading.Lock()
+        self._free = collections.deque()
+        # 会话 id -> [沙箱名, 路由表, 最后访问时间, 客户端]
+        self._leases = {}
+        # 客户端 -> 租约数
+        self._per_client = collections.Counter()
+        self._dirty = queue.Queue()
+        self.misses = 0
+        self.refused = 0
+
+    def acquire(self, session_id, client):
+        """返回该会话的沙箱路由表；池空或该客户端的租约已满时返回 None，请求落到共享库。"""
+        now = time.monotonic()
+        with self._lock:
+            lease = self._leases.get(session_id)
+            if lease is not None:
+                lease[2] = now
+                return lease[1]
+            if self._per_client[client] >= self.max_per_client:
+                self.refused += 1
+                return None
+            if not self._free:
+                self.misses += 1
+                return None
+            name, targets = self._free.popleft()
+            self._leases[session_id] = [name, targets, now, client]
+            self._per_client[client] += 1
+            return targets
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": self.size,
+                "free": len(self._free),
+                "leased": len(self._leases),
+                "clients": len(self._per_client),
+                "recycling": self._dirty.qsize(),
+                "misses": self.misses,
+                "refused": self.refused,
+            }
+
+    def _reap(self):
+        deadline = time.monotonic() - self.ttl
+        with self._lock:
+            expired = [sid for sid, lease in self._leases.items() if lease[2] < deadline]
+            for sid in expired:
+                name, _, _, client = self._leases.pop(sid)
+                self._per_client[client] -= 1
+                if not self._per_client[client]:
+                    del self._per_client[client]
+                self._dirty.put(name)
+
+    def _recycle_loop(self):
+        for i in range(self.size):
+            self._dirty.put(f"{SANDBOX_PREFIX}{i + 1:02d}")
+        while True:
+            try:
+                name = self._dirty.get(timeout=min(self.ttl, 30))
+            except queue.Empty:
+                self._reap()
+                continue
+            # 上一个会话留在连接池里的连接不再复用，也不占数据库的连接数
+            db.close_idle(name)
+            targets = provision(name)
+            with self._lock:
+                self._free.append((name, targets))
+            self._reap()
+
+    def start(self):
+        threading.Thread(target=self._recycle_loop, name='sandbox-recycler', daemon=True).start()
@@ -0,0 +1,95 @@
+"""
+按延迟类别调度查询
+时间盲注的载荷（SLEEP、BENCHMARK、pg_sleep、ClickHouse 的 sleep/sleepEachRow 等）本来就慢，
+和报错注入、union 注入这类快查询共用连接时会把所有人的延迟拉高。
+
+LATENCY_CLASSES=1 时，execute_query() 拼好的 SQL 先经过一次词法扫描：
+    - 快查询在请求线程里执行，每个后端最多 FAST_SLOTS 个同时占用连接；
+    - 预计很慢的查询交给该后端独立的慢查询线程池（SLOW_WORKERS 个线程，也就是最多这么多个连接），
+      在池里排队，最多排 SLOW_QUEUE 个，超过直接报错。
+因此慢查询只和慢查询互相排队，快查询的 p99 不受影响。
+"""
+
+import concurrent.futures
+import math
+import os
+import time
+import re
+import threading
+
+import db
+
+LATENCY_CLASSES = os.environ.get('LATENCY_CLASSES', '0') == '1'
+FAST_SLOTS = int(os.environ.get('FAST_SLOTS', '32'))
+SLOW_WORKERS = int(os.environ.get('SLOW_WORKERS', '4'))
+SLOW_QUEUE = int(os.environ.get('SLOW_QUEUE', '64'))
+
+# 函数名和括号之间允许空白和 /**/ 注释，例如 SLEEP/**/(5)
+_SLOW = re.compile(r'''
+    \b(?:sleep|benchmark|pg_sleep|pg_sleep_for|pg_sleep_until|sleepeachrow|dbms_lock\.sleep|dbms_session\.sleep|randomblob)
+    \s*(?:/\*.*?\*/\s*)*\(
+  | \bwaitfor\s+delay\b
+''', re.I | re.X | re.S)
+
+
+def is_slow(query):
+    return _SLOW.search(query) is not None
+
+
+class QueueFull(Exception):
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _in_sandbox(targets, work):
+    # 沙箱路由是线程局部的，需要带到慢查询线程里
+    db.set_sandbox(targets)
+    try:
+        return work()
+    finally:
+        db.set_sandbox(None)
+
+
+class _Lane:
+    def __init__(self, name):
+        self.fast = threading.BoundedSemaphore(FAST_SLOTS)
+        self.slow = concurrent.futures.ThreadPoolExecutor(max_workers=SLOW_WORKERS, thread_name_prefix=f'slow-{name}')
+        self.slow_pending = 0
+        # 慢查询平均耗时（指数平均），用来估计 Retry-After
+        self.slow_seconds = 1.0
+        self.counters = {'fast': 0, 'slow': 0, 'slow_rejected': 0}
+
+
+class LatencyScheduler:
+    def __init__(self, backend_names):
+        self._lock = threading.Lock()
+        self._lanes = {name: _Lane(name) for name in backend_names}
+
+    def run(self, backend, query, work):
+        """按查询的延迟类别执行 work()，返回它的结果。"""
+        lane = self._lanes[backend.name]
+        if not is_slow(query):
+            with self._lock:
+                lane.counters['fast'] += 1
+            with lane.fast:
+                return work()
+        with self._lock:
+            if lane.slow_pending >= SLOW_WORKERS + SLOW_QUEUE:
+                lane.counters['slow_rejected'] += 1
+                retry_after = max(1, math.ceil(lane.slow_pending / SLOW_WORKERS * lane.slow_seconds))
+                raise QueueFull(f"{backend.label} 慢查询队列已满，请稍后重试", retry_after)
+            lane.slow_pending += 1
+            lane.counters['slow'] += 1
+        start = time.perf_counter()
+        try:
+            return lane.slow.submit(_in_sandbox, db.get_sandbox(), work).result()
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                lane.slow_pending -= 1
+                lane.slow_seconds += (elapsed - lane.slow_seconds) * 0.2
+
+    def stats(self):
+        with self._lock:
+            return {name: dict(lane.counters, slow_pending=lane.slow_pending) for name, lane in self._lanes.items()}
@@ -0,0 +1,80 @@
+"""
+相同查询的请求合并（single-flight）
+课堂上经常有几十个学生在同一秒向同一个接口发送同样的载荷。COALESCE_QUERIES=1 时，
+同一个 (后端, 沙箱, 最终 SQL) 已经在执行时，后来的请求不再查库，而是等待并共享第一个请求的结果或错误。
+
+只合并只读查询：以 SELECT/WITH 开头、不含分号和写操作关键字的语句。时间盲注载荷（见 scheduler.is_slow）
+也不合并，否则多个学生的计时会互相干扰。
+"""
+
+import os
+import re
+import threading
+
+import scheduler
+
+COALESCE_QUERIES = os.environ.get('COALESCE_QUERIES', '0') == '1'
+
+_READ_ONLY = re.compile(r'^\s*(?:select|with)\b', re.I)
+_SIDE_EFFECTS = re.compile(r';|\b(?:insert|update|delete|replace|merge|drop|create|alter|truncate|grant|revoke|'
+                           r'call|exec|execute|copy|lock|into\s+(?:out|dump)file|set|load_file|lo_import|nextval|setval)\b', re.I)
+
+
+def coalescable(query):
+    return (_READ_ONLY.match(query) is not None
+            and _SIDE_EFFECTS.search(query) is None
+            and not scheduler.is_slow(query))
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.counters = {'executed': 0, 'shared': 0, 'skipped': 0}
+
+    def skip(self):
+        with self._lock:
+            self.counters['skipped'] += 1
+
+    def do(self, key, func):
+        """返回 (结果, 是否共享了别人的结果)；func() 抛出的异常会同样抛给所有等待者。"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.counters['executed'] += 1
+            else:
+                self.counters['shared'] += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = func()
+            return call.result, False
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats['in_flight'] = len(self._calls)
+        # shared 即合并掉的数据库执行次数
+        stats['saved_executions'] = stats['shared']
+        return stats
@@ -0,0 +1,64 @@
+"""
+共享的统计小工具
+LogHistogram 把耗时（毫秒）记录到对数分桶里，每个桶宽约 9%，内存固定，
+可以在不保存原始样本的情况下给出 p50/p99 等分位数。
+"""
+
+import math
+
+# 每翻一倍分 8 个桶
+_BUCKETS_PER_DOUBLING = 8
+# 最小可区分 1 微秒，最大约 2^24 毫秒（4.6 小时），更大的值落在最后一个桶
+_MIN_MS = 0.001
+_NUM_BUCKETS = 34 * _BUCKETS_PER_DOUBLING
+
+
+def _bucket(ms):
+    if ms <= _MIN_MS:
+        return 0
+    index = int(math.log2(ms / _MIN_MS) * _BUCKETS_PER_DOUBLING) + 1
+    return min(index, _NUM_BUCKETS - 1)
+
+
+def _upper_bound(index):
+    return _MIN_MS * 2 ** (index / _BUCKETS_PER_DOUBLING)
+
+
+class LogHistogram:
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms):
+        index = _bucket(ms)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def merge(self, other):
+        for index, n in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p):
+        """返回第 p 百分位所在桶的上界，没有样本时返回 0。"""
+        if not self.count:
+            return 0.0
+        rank = math.ceil(self.count * p / 100)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(_upper_bound(index), self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
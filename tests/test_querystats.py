@@ -0,0 +1,44 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import querystats  # noqa: E402
+
+
+def test_fingerprint_folds_literals():
+    assert querystats.fingerprint("SELECT * FROM users WHERE id = 1") == \
+        querystats.fingerprint("select *  from users where id = 2 /* x */")
+
+
+def test_eviction_keeps_space_saving_bounds():
+    rng = random.Random(7)
+    queries = [f"SELECT * FROM t{int(rng.paretovariate(1.2))} WHERE id = {rng.randint(0, 40)}" for _ in range(5000)]
+    capacity = 16
+    stats = querystats.QueryStats(capacity=capacity)
+    for query in queries:
+        stats.record('MySQL', query, 1.0)
+    true_counts = {}
+    for query in queries:
+        fp = querystats.fingerprint(query)
+        true_counts[fp] = true_counts.get(fp, 0) + 1
+
+    tracked = {e['fingerprint']: e for e in stats.top(limit=capacity, sort='count')}
+    assert len(tracked) == capacity
+    for fp, e in tracked.items():
+        assert e['count'] - e['overcount'] <= true_counts[fp] <= e['count']
+    # 出现次数超过 N/容量 的查询形状一定在表里
+    for fp, count in true_counts.items():
+        if count > len(queries) / capacity:
+            assert fp in tracked
+    assert sum(len(b) for b in stats._buckets.values()) == capacity
+    assert stats._min == min(e['count'] for e in tracked.values())
+
+
+def test_counts_sum_to_records():
+    stats = querystats.QueryStats(capacity=3)
+    for i in range(100):
+        stats.record('MySQL', f"SELECT * FROM t{i % 7}", 1.0)
+    assert sum(e['count'] for e in stats.top(limit=3, sort='count')) == 100
+    assert stats.stats()['evicted'] > 0
@@ -0,0 +1,34 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+import waf  # noqa: E402
+
+
+@pytest.fixture
+def rules():
+    return waf.RuleSet({'decode': ['url', 'comments', 'whitespace'], 'block': ['union select']})
+
+
+@pytest.mark.parametrize('payload', [
+    '1 union/**/select 1',
+    '1 union /**/ select 1',
+    '1 UNION/*x*/SELECT 1',
+    '1 union/*!50000select*/ 1',
+    '1 union%2f%2a%2a%2fselect 1',
+])
+def test_comment_bypass_is_blocked(rules, payload):
+    with pytest.raises(waf.Blocked):
+        rules.apply('id', payload)
+
+
+def test_comments_become_single_space():
+    assert waf.DECODERS['comments']('union/**/select') == 'union select'
+    assert waf.DECODERS['comments']('a /* x */ b') == 'a b'
+
+
+def test_clean_value_passes(rules):
+    assert rules.apply('id', '1') == '1'
@@ -0,0 +1,251 @@
+"""
+请求链路追踪
+TRACE_SAMPLE 是请求开始时的采样比例（0～1，默认 0 即关闭）。被采样的请求记录一组 OpenTelemetry 风格的 span：
+    GET /mysql/int            请求本身：路由、后端、输入方式、查询指纹、行数、状态码、准入排队时间
+      input                   get_input()
+      query                   从调度/排队到拿到结果（请求合并时记录是否共享了别人的结果）
+        db.checkout           取连接
+        db.execute / db.fetch cursor.execute() / fetchall()（ClickHouse 只有 db.execute）
+      serialize               jsonify()
+请求头带有 W3C traceparent 时沿用上游的 trace id 和采样决定。
+TRACE_SQL_COMMENT=1（默认）时，发往数据库的 SQL 前面加上 /*traceparent='...'*/ 注释，
+在 MySQL processlist/慢日志、pg_stat_activity、ClickHouse system.query_log 里能找到对应的请求。
+响应和日志里显示的 SQL 不带这个注释。
+
+span 放进有界队列，由后台线程攒批导出（TRACE_BATCH_SIZE 个或 TRACE_FLUSH_MS 毫秒一批），队列满时丢弃：
+    TRACE_FILE      每批一行 OTLP/JSON 追加写入文件
+    TRACE_OTLP_URL  POST 到 OTLP/HTTP 接收端，例如 http://127.0.0.1:4318/v1/traces
+没有采样的请求只拿到 NOOP，所有 span 操作都是空方法。
+
+本地没有 collector 时可以用 python tracing.py [端口] 起一个最小的 OTLP/HTTP 接收端，把收到的 span 打印出来。
+"""
+
+import http.server
+import json
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+import urllib.request
+
+TRACE_SAMPLE = float(os.environ.get('TRACE_SAMPLE', '0'))
+TRACE_FILE = os.environ.get('TRACE_FILE', '')
+TRACE_OTLP_URL = os.environ.get('TRACE_OTLP_URL', '')
+TRACE_SQL_COMMENT = os.environ.get('TRACE_SQL_COMMENT', '1') == '1'
+TRACE_BATCH_SIZE = int(os.environ.get('TRACE_BATCH_SIZE', '512'))
+TRACE_FLUSH_MS = int(os.environ.get('TRACE_FLUSH_MS', '1000'))
+TRACE_QUEUE_SIZE = int(os.environ.get('TRACE_QUEUE_SIZE', '8192'))
+SERVICE_NAME = os.environ.get('TRACE_SERVICE_NAME', 'sqli-lab')
+
+_TRACEPARENT = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+
+class _NoopSpan:
+    """没有采样的请求使用的 span，所有操作都不做任何事。"""
+    sampled = False
+
+    def child(self, name, **attributes):
+        return self
+
+    def set(self, key, value):
+        pass
+
+    def end(self, error=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP = _NoopSpan()
+
+
+class Span:
+    __slots__ = ('tracer', 'trace_id', 'span_id', 'parent_id', 'name', 'kind', 'start_ns', 'attributes', 'error')
+    sampled = True
+
+    def __init__(self, tracer, trace_id, parent_id, name, kind='internal', attributes=None):
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.span_id = '%016x' % random.getrandbits(64)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.attributes = attributes or {}
+        self.error = None
+
+    def child(self, name, kind='internal', **attributes):
+        return Span(self.tracer, self.trace_id, self.span_id, name, kind, attributes)
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def end(self, error=None):
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        self.tracer.export(self, time.time_ns())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end(exc)
+        return False
+
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+
+def sql_comment(span):
+    """发往数据库的 SQL 前缀；没有采样或关闭了 TRACE_SQL_COMMENT 时为空串。"""
+    if not span.sampled or not TRACE_SQL_COMMENT:
+        return ''
+    return f"/*traceparent='{span.traceparent()}'*/ "
+
+
+# --- OTLP/JSON 编码 ---
+
+_KINDS = {'internal': 1, 'server': 2, 'client': 3}
+
+
+def _value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def _encode_span(span, end_ns):
+    encoded = {
+        'traceId': span.trace_id,
+        'spanId': span.span_id,
+        'name': span.name,
+        'kind': _KINDS[span.kind],
+        'startTimeUnixNano': str(span.start_ns),
+        'endTimeUnixNano': str(end_ns),
+        'attributes': [{'key': k, 'value': _value(v)} for k, v in span.attributes.items()],
+        'status': {'code': 2, 'message': span.error} if span.error else {'code': 0},
+    }
+    if span.parent_id:
+        encoded['parentSpanId'] = span.parent_id
+    return encoded
+
+
+def encode_batch(spans):
+    return {'resourceSpans': [{
+        'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': SERVICE_NAME}}]},
+        'scopeSpans': [{'scope': {'name': 'sqli_lab'}, 'spans': spans}],
+    }]}
+
+
+class Tracer:
+    def __init__(self, sample=TRACE_SAMPLE, path=TRACE_FILE, url=TRACE_OTLP_URL,
+                 batch_size=TRACE_BATCH_SIZE, flush_ms=TRACE_FLUSH_MS, queue_size=TRACE_QUEUE_SIZE):
+        self.sample = sample
+        self.path = path
+        self.url = url
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000
+        self._queue = queue.Queue(maxsize=queue_size)
+        self.counters = {'traces': 0, 'spans': 0, 'exported': 0, 'dropped': 0, 'export_errors': 0}
+
+    def start_request(self, name, traceparent=None, **attributes):
+        """请求开始时做采样决定：返回根 span，没有采样时返回 NOOP。"""
+        parent_id = None
+        match = _TRACEPARENT.match(traceparent or '')
+        if match:
+            # 上游已经做了采样决定
+            if not int(match.group(3), 16) & 1:
+                return NOOP
+            trace_id, parent_id = match.group(1), match.group(2)
+        elif random.random() < self.sample:
+            trace_id = '%032x' % random.getrandbits(128)
+        else:
+            return NOOP
+        self.counters['traces'] += 1
+        return Span(self, trace_id, parent_id, name, 'server', attributes)
+
+    def export(self, span, end_ns):
+        """span 结束时调用；编码在后台线程完成，队列满时直接丢弃，绝不阻塞请求。"""
+        try:
+            self._queue.put_nowait((span, end_ns))
+            self.counters['spans'] += 1
+        except queue.Full:
+            self.counters['dropped'] += 1
+
+    def _write(self, batch):
+        payload = json.dumps(encode_batch([_encode_span(span, end_ns) for span, end_ns in batch]))
+        if self.path:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(payload + '\n')
+        if self.url:
+            req = urllib.request.Request(self.url, data=payload.encode('utf-8'),
+                                         headers={'Content-Type': 'application/json'}, method='POST')
+            urllib.request.urlopen(req, timeout=5).close()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+                self.counters['exported'] += len(batch)
+            except Exception as e:
+                self.counters['export_errors'] += 1
+                print(f"trace 导出失败: {e}")
+
+    def start(self):
+        threading.Thread(target=self._run, name='trace-exporter', daemon=True).start()
+        return self
+
+    def stats(self):
+        return dict(self.counters, queued=self._queue.qsize(), sample=self.sample)
+
+
+# --- 最小的 OTLP/HTTP 接收端（collector 替身） ---
+
+class _CollectorHandler(http.server.BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        try:
+            for resource in json.loads(body)['resourceSpans']:
+                for scope in resource['scopeSpans']:
+                    for span in scope['spans']:
+                        ms = (int(span['endTimeUnixNano']) - int(span['startTimeUnixNano'])) / 1e6
+                        attrs = {a['key']: next(iter(a['value'].values())) for a in span['attributes']}
+                        print(f"{span['traceId'][:8]} {span.get('parentSpanId', '-' * 16)[:8]} "
+                              f"{span['spanId'][:8]} {span['name']:<24}{ms:>9.3f}ms {attrs}")
+            self.send_response(200)
+        except (ValueError, KeyError) as e:
+            print(f"无法解析的 OTLP 请求: {e}")
+            self.send_response(400)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 4318
+    print(f"OTLP/HTTP 接收端监听 127.0.0.1:{port}，把 TRACE_OTLP_URL 设为 http://127.0.0.1:{port}/v1/traces")
+    http.server.ThreadingHTTPServer(('127.0.0.1', port), _CollectorHandler).serve_forever()
@@ -0,0 +1,163 @@
+"""
+WAF 模拟层
+在 get_input() 取到参数之后、拼进查询模板之前，按接口对参数做解码、拦截和替换，用于绕过类练习。
+所有关键字在加载时编译进一个 Aho-Corasick 自动机，正则规则合并成一个带命名分组的正则，替换规则也合并成一个正则，
+因此无论配置多少条规则，每个参数都只扫描固定几遍。
+
+WAF_RULES 指向一个 JSON 文件，键是接口路径通配符，第一条匹配的规则集生效，例如：
+    {
+      "/mysql/*": {
+        "decode": ["url", "html", "comments", "whitespace"],
+        "case_fold": true,
+        "block": ["union select", "sleep(", "benchmark("],
+        "block_regex": ["\\\\bor\\\\s+\\\\d+\\\\s*=\\\\s*\\\\d+"],
+        "replace": {"select": "", "union": ""}
+      }
+    }
+decode 中的解码只用于匹配；replace 作用在原始参数上，只替换一遍（所以 selselectect 可以绕过）。
+"""
+
+import fnmatch
+import html
+import json
+import os
+import re
+import urllib.parse
+
+WAF_RULES = os.environ.get('WAF_RULES', '')
+
+
+class Blocked(Exception):
+    def __init__(self, rule, param):
+        super().__init__(f"参数 {param} 命中规则 {rule}")
+        self.rule = rule
+        self.param = param
+
+
+class AhoCorasick:
+    """多关键字匹配自动机，匹配代价与输入长度成线性关系。"""
+
+    def __init__(self, keywords):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [None]
+        for keyword in keywords:
+            state = 0
+            for ch in keyword:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(None)
+                state = nxt
+            self.output[state] = keyword
+        # 广度优先计算失败指针，并把失败链上的输出合并到当前状态
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                if self.output[nxt] is None:
+                    self.output[nxt] = self.output[self.fail[nxt]]
+
+    def search(self, text):
+        """返回第一个命中的关键字，没有命中返回 None。"""
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state] is not None:
+                return output[state]
+        return None
+
+
+# 注释在 SQL 里等同于空白（union/**/select 就是 union select），换成一个空格，连同两侧的空白一起；
+# MySQL 的 /*!50000 select*/ 会被执行，保留其中的内容
+_COMMENTS = re.compile(r'\s*/\*(?:!\d*(.*?)|.*?)\*/\s*', re.S)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def _url_decode(value):
+    # 多重编码时反复解码，最多三层
+    for _ in range(3):
+        decoded = urllib.parse.unquote_plus(value)
+        if decoded == value:
+            break
+        value = decoded
+    return value
+
+
+DECODERS = {
+    'url': _url_decode,
+    'html': html.unescape,
+    'comments': lambda v: _COMMENTS.sub(lambda m: f" {m.group(1).strip()} " if m.group(1) else ' ', v),
+    'whitespace': lambda v: _WHITESPACE.sub(' ', v),
+}
+
+
+class RuleSet:
+    def __init__(self, spec):
+        self.decoders = [DECODERS[name] for name in spec.get('decode', [])]
+        self.case_fold = spec.get('case_fold', True)
+        fold = str.lower if self.case_fold else (lambda s: s)
+        keywords = [fold(k) for k in spec.get('block', [])]
+        self.keywords = AhoCorasick(keywords) if keywords else None
+        flags = re.I if self.case_fold else 0
+        patterns = spec.get('block_regex', [])
+        self.patterns = patterns
+        self.block_regex = re.compile('|'.join(f'(?P<r{i}>{p})' for i, p in enumerate(patterns)), flags) if patterns else None
+        replacements = spec.get('replace', {})
+        self.replacements = {fold(k): v for k, v in replacements.items()}
+        self.replace_regex = re.compile('|'.join(re.escape(k) for k in sorted(replacements, key=len, reverse=True)), flags) if replacements else None
+
+    def apply(self, param, value):
+        normalized = value
+        for decode in self.decoders:
+            normalized = decode(normalized)
+        if self.case_fold:
+            normalized = normalized.lower()
+        if self.keywords is not None:
+            hit = self.keywords.search(normalized)
+            if hit is not None:
+                raise Blocked(hit, param)
+        if self.block_regex is not None:
+            match = self.block_regex.search(normalized)
+            if match:
+                raise Blocked(self.patterns[int(match.lastgroup[1:])], param)
+        if self.replace_regex is not None:
+            fold = str.lower if self.case_fold else (lambda s: s)
+            value = self.replace_regex.sub(lambda m: self.replacements[fold(m.group(0))], value)
+        return value
+
+
+class Waf:
+    def __init__(self, config):
+        self.rules = [(pattern, RuleSet(spec)) for pattern, spec in config.items()]
+        # 路径 -> 规则集，数据库接口数量有限
+        self._cache = {}
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def rule_for(self, path):
+        if path not in self._cache:
+            self._cache[path] = next((rules for pattern, rules in self.rules if fnmatch.fnmatchcase(path, pattern)), None)
+        return self._cache[path]
+
+    def filter(self, path, param, value):
+        """返回过滤后的参数值，命中拦截规则时抛出 Blocked。"""
+        if not isinstance(value, str):
+            return value
+        rules = self.rule_for(path)
+        if rules is None:
+            return value
+        return rules.apply(param, value)
@@ -0,0 +1,257 @@
+"""
+后端驱动进程隔离
+ISOLATE_DRIVERS=1 时，每个后端实验接口的查询（包括 _explain 的计划查询）交给一组独立的工作进程执行。
+主进程仍然直接使用驱动做这些事：启动时的 init_databases()、漂移检查和修复、沙箱建库、
+实时面板的健康探测，以及 PostgreSQL 直通模式的 COPY。
+驱动卡死、长时间持有 GIL 或者直接崩溃时，只影响一个工作进程：
+    - 超过 WORKER_TIMEOUT_MS 没有返回的进程被杀掉，请求返回错误；
+    - 进程退出（段错误等）时请求返回错误；
+两种情况下监督线程都会在后台重新拉起一个工作进程补回池中。
+
+工作进程用 subprocess 启动（python workers.py <后端名>），不会重新执行 app.py 的初始化。
+请求和结果经 stdin/stdout 管道传递，每帧是 4 字节大端长度加 pickle 数据；
+工作进程把 fd 1 重定向到 stderr，驱动的打印输出不会破坏帧。
+"""
+
+import os
+import pickle
+import queue
+import select
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+ISOLATE_DRIVERS = os.environ.get('ISOLATE_DRIVERS', '0') == '1'
+WORKERS_PER_BACKEND = int(os.environ.get('WORKERS_PER_BACKEND', '2'))
+# 单个查询在工作进程里最多执行多久，超过即认为卡死
+WORKER_TIMEOUT_MS = int(os.environ.get('WORKER_TIMEOUT_MS', '30000'))
+# 只隔离使用外部 C 驱动的后端；SQLite 在进程内，隔离没有意义
+ISOLATE_BACKENDS = [name.strip() for name in os.environ.get('ISOLATE_BACKENDS', 'mysql,postgres,clickhouse,oracle').split(',') if name.strip()]
+
+_HEADER = struct.Struct('>I')
+_PROTOCOL = pickle.HIGHEST_PROTOCOL
+
+
+class WorkerError(Exception):
+    pass
+
+
+class WorkerHung(WorkerError):
+    pass
+
+
+class WorkerDied(WorkerError):
+    pass
+
+
+class WorkerNoConnection(WorkerError):
+    """工作进程连不上数据库，和主进程里 connect() 返回 None 是同一种情况。"""
+
+
+def _read_exact(read, n):
+    chunks = []
+    while n:
+        chunk = read(n)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        n -= len(chunk)
+    return b''.join(chunks)
+
+
+# --- 主进程一侧 ---
+
+class _Worker:
+    def __init__(self, backend_name):
+        self.proc = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), backend_name],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        self._out = self.proc.stdout.fileno()
+
+    def _read(self, n, deadline, timeout):
+        def read(size):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([self._out], [], [], remaining)[0]:
+                raise WorkerHung(f"工作进程 {self.proc.pid} 超过 {timeout * 1000:.0f}ms 没有返回")
+            return os.read(self._out, size)
+        data = _read_exact(read, n)
+        if data is None:
+            raise WorkerDied(f"工作进程 {self.proc.pid} 已退出 (code={self.proc.poll()})")
+        return data
+
+    def call(self, payload, timeout):
+        data = pickle.dumps(payload, _PROTOCOL)
+        try:
+            self.proc.stdin.write(_HEADER.pack(len(data)) + data)
+            self.proc.stdin.flush()
+        except (BrokenPipeError, OSError):
+            raise WorkerDied(f"工作进程 {self.proc.pid} 已退出 (code={self.proc.poll()})")
+        deadline = time.monotonic() + timeout
+        (length,) = _HEADER.unpack(self._read(_HEADER.size, deadline, timeout))
+        return pickle.loads(self._read(length, deadline, timeout))
+
+    def kill(self):
+        try:
+            self.proc.kill()
+            self.proc.wait(timeout=5)
+        except Exception:
+            pass
+
+
+class WorkerPool:
+    def __init__(self, backend, size=WORKERS_PER_BACKEND, timeout_ms=WORKER_TIMEOUT_MS):
+        self.backend = backend
+        self.size = size
+        self.timeout = timeout_ms / 1000
+        self._idle = queue.Queue()
+        self.counters = {'calls': 0, 'hung': 0, 'died': 0, 'restarts': 0, 'busy': 0}
+
+    def start(self):
+        for _ in range(self.size):
+            self._spawn_async()
+
+    def _spawn(self):
+        delay = 0.5
+        while True:
+            try:
+                self._idle.put(_Worker(self.backend.name))
+                return
+            except Exception as e:
+                print(f"{self.backend.label} 工作进程启动失败: {e}")
+                time.sleep(delay)
+                delay = min(delay * 2, 30)
+
+    def _spawn_async(self):
+        threading.Thread(target=self._spawn, name=f'worker-spawn-{self.backend.name}', daemon=True).start()
+
+    def run(self, query, targets):
+        try:
+            worker = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            self.counters['busy'] += 1
+            raise WorkerError(f"{self.backend.label} 没有空闲的工作进程")
+        self.counters['calls'] += 1
+        try:
+            status, value = worker.call((query, targets), self.timeout)
+        except WorkerError as e:
+            self.counters['hung' if isinstance(e, WorkerHung) else 'died'] += 1
+            self.counters['restarts'] += 1
+            worker.kill()
+            self._spawn_async()
+            raise
+        self._idle.put(worker)
+        if status == 'no_connection':
+            raise WorkerNoConnection(value)
+        if status != 'ok':
+            raise WorkerError(value)
+        return value
+
+    def stats(self):
+        stats = dict(self.counters)
+        stats['idle'] = self._idle.qsize()
+        stats['size'] = self.size
+        return stats
+
+
+class _RemoteCursor:
+    def __init__(self, pool, targets):
+        self._pool = pool
+        self._targets = targets
+        self._rows = []
+
+    def execute(self, query, params=None):
+        self._rows = self._pool.run(query, self._targets)
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchmany(self, size=1):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def close(self):
+        self._rows = []
+
+
+class _RemoteConnection:
+    """
+    代替驱动连接交给 execute_query() / explain.capture()：cursor().execute() 和 execute() 都转发到工作进程。
+    真正的连接、事务回滚和连接池都在工作进程里，这里的 commit/rollback/close 什么也不做。
+    """
+    def __init__(self, pool, targets):
+        self._pool = pool
+        self._targets = targets
+
+    def cursor(self):
+        return _RemoteCursor(self._pool, self._targets)
+
+    def execute(self, query, params=None, **kwargs):
+        return self._pool.run(query, self._targets)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+    disconnect = close
+
+
+def isolate(backend):
+    """把注册表中的一个后端改为经工作进程执行，返回它的 WorkerPool。"""
+    import db
+    pool = WorkerPool(backend, timeout_ms=max(WORKER_TIMEOUT_MS, backend.timeout_ms * 2))
+    pool.start()
+    backend.connect = lambda: _RemoteConnection(pool, db.get_sandbox())
+    backend.workers = pool
+    return pool
+
+
+# --- 工作进程一侧 ---
+
+def _serve(backend_name):
+    out = os.fdopen(os.dup(1), 'wb')
+    os.dup2(2, 1)
+    inp = sys.stdin.buffer
+
+    import backends
+    import db
+    backend = backends.REGISTRY[backend_name]
+    if db.FAKE_DB:
+        # 假驱动的内存库在每个进程里是独立的，需要各自初始化
+        db.init_databases()
+
+    while True:
+        header = _read_exact(inp.read, _HEADER.size)
+        if header is None:
+            return
+        (length,) = _HEADER.unpack(header)
+        query, targets = pickle.loads(_read_exact(inp.read, length))
+        db.set_sandbox(targets)
+        try:
+            conn = backend.connect()
+            if conn is None:
+                reply = ('no_connection', f"无法连接到 {backend.label} 数据库")
+            else:
+                try:
+                    reply = ('ok', list(backend.fetch(conn, query)))
+                finally:
+                    if hasattr(conn, 'close'):
+                        conn.close()
+            data = pickle.dumps(reply, _PROTOCOL)
+        except Exception as e:
+            data = pickle.dumps(('error', str(e)), _PROTOCOL)
+        out.write(_HEADER.pack(len(data)) + data)
+        out.flush()
+
+
+if __name__ == '__main__':
+    _serve(sys.argv[1])